@@ -0,0 +1,205 @@
+# app/admission.py
+import asyncio
+import json
+import logging
+import math
+import random
+import time
+from typing import Dict, Optional, Tuple
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_PATH = "/upload/audio"
+
+
+class RateLimited(Exception):
+    """A client exceeded its token bucket; answered with 429 and Retry-After."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Overloaded(Exception):
+    """No upload slot freed up within the queue timeout; answered with 503 and Retry-After."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucketLimiter:
+    """
+    One token bucket per key (client IP or participant code): `burst` requests
+    at once, refilled at `per_minute` per minute. Idle buckets are full again,
+    so they are dropped once the map grows past `max_keys`.
+    """
+
+    def __init__(self, name: str, per_minute: int, burst: int, max_keys: int = 50000):
+        self.name = name
+        self.rate = per_minute / 60.0
+        self.burst = max(burst, 1)
+        self.max_keys = max_keys
+        self._buckets: Dict[str, Tuple[float, float]] = {}  # key -> (tokens, last refill time)
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _prune(self, now: float) -> None:
+        full_after = self.burst / self.rate
+        self._buckets = {key: value for key, value in self._buckets.items() if now - value[1] < full_after}
+        if len(self._buckets) >= self.max_keys:
+            self._buckets.clear()
+
+    def check(self, key: str) -> None:
+        """Takes one token for `key`, or raises RateLimited with the seconds until one is available."""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        if key not in self._buckets and len(self._buckets) >= self.max_keys:
+            self._prune(now)
+        tokens, last = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            self.rejected += 1
+            raise RateLimited(
+                f"Too many uploads for this {self.name}; slow down.",
+                retry_after=math.ceil((1 - tokens) / self.rate)
+            )
+        self._buckets[key] = (tokens - 1, now)
+
+
+class AdmissionController:
+    """
+    Bounds the uploads a worker processes at once. Requests beyond `max_in_flight`
+    wait in a queue of at most `max_queued` for up to `queue_timeout` seconds;
+    after that, or when the queue is full, they are refused with a jittered
+    Retry-After so retrying clients spread out instead of returning together.
+    """
+
+    def __init__(self, max_in_flight: int, max_queued: int, queue_timeout: float):
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_in_flight > 0
+
+    def _retry_after(self) -> int:
+        return max(1, round(max(self.queue_timeout, 1) * random.uniform(0.5, 1.5)))
+
+    async def acquire(self) -> None:
+        if not self.enabled:
+            return
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        if self._semaphore.locked():
+            if self.queued >= self.max_queued:
+                self.rejected += 1
+                raise Overloaded("Upload queue is full; retry later.", self._retry_after())
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise Overloaded("Timed out waiting for an upload slot; retry later.", self._retry_after())
+            finally:
+                self.queued -= 1
+        else:
+            await self._semaphore.acquire()
+        self.in_flight += 1
+        self.admitted += 1
+
+    def release(self) -> None:
+        if not self.enabled:
+            return
+        self.in_flight -= 1
+        self._semaphore.release()
+
+
+upload_admission = AdmissionController(
+    max_in_flight=settings.UPLOAD_MAX_IN_FLIGHT,
+    max_queued=settings.UPLOAD_MAX_QUEUED,
+    queue_timeout=settings.UPLOAD_QUEUE_TIMEOUT_SECONDS
+)
+ip_limiter = TokenBucketLimiter("client IP", settings.UPLOAD_RATE_PER_IP_PER_MINUTE, settings.UPLOAD_BURST_PER_IP)
+participant_limiter = TokenBucketLimiter(
+    "participant", settings.UPLOAD_RATE_PER_PARTICIPANT_PER_MINUTE, settings.UPLOAD_BURST_PER_PARTICIPANT
+)
+
+
+def _client_ip(scope) -> str:
+    if settings.UPLOAD_TRUST_PROXY_HEADERS:
+        for name, value in scope.get("headers", []):
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+async def _reject(send, status_code: int, detail: str, retry_after: int) -> None:
+    body = json.dumps({"detail": detail}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(retry_after).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class UploadAdmissionMiddleware:
+    """
+    ASGI middleware in front of POST /upload/audio. The per-IP limit and the
+    in-flight bound are applied before the request body is read, so rejected
+    retries cost neither memory nor an R2 connection. The per-participant limit
+    needs the form data and is checked in the endpoint.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] != UPLOAD_PATH:
+            await self.app(scope, receive, send)
+            return
+        try:
+            ip_limiter.check(_client_ip(scope))
+        except RateLimited as e:
+            await _reject(send, 429, str(e), e.retry_after)
+            return
+        try:
+            await upload_admission.acquire()
+        except Overloaded as e:
+            logger.warning(f"Upload refused: {e} ({upload_admission.in_flight} in flight, {upload_admission.queued} queued)")
+            await _reject(send, 503, str(e), e.retry_after)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            upload_admission.release()
+
+
+def admission_stats() -> Dict[str, int]:
+    return {
+        "in_flight": upload_admission.in_flight,
+        "queued": upload_admission.queued,
+        "admitted": upload_admission.admitted,
+        "rejected_overloaded": upload_admission.rejected,
+        "rejected_ip_rate": ip_limiter.rejected,
+        "rejected_participant_rate": participant_limiter.rejected,
+    }
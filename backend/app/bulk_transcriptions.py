@@ -0,0 +1,233 @@
+# app/bulk_transcriptions.py
+import csv
+import io
+import logging
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId, errors
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pydantic import ValidationError
+from pymongo import UpdateOne
+import pytz
+
+from . import stats
+from .crud import LEASE_FIELDS, make_revision, version_filter
+from .database import NOT_DELETED
+from .search import search_fields
+from .models import BulkTranscriptionItem, BulkTranscriptionResponse, BulkTranscriptionRowResult
+
+logger = logging.getLogger(__name__)
+
+try:
+    ghana_tz = pytz.timezone('Africa/Accra')
+except pytz.UnknownTimeZoneError:
+    ghana_tz = pytz.utc
+
+BULK_CHUNK_SIZE = 1000
+
+
+def _to_stored_timestamp(value: Optional[datetime]) -> Optional[datetime]:
+    """Normalizes a datetime to what MongoDB stores and returns: naive UTC, millisecond precision."""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(pytz.utc).replace(tzinfo=None)
+    return value.replace(microsecond=(value.microsecond // 1000) * 1000)
+
+
+def parse_transcription_file(filename: str, content: bytes) -> List[Dict[str, Any]]:
+    """
+    Reads rows from a CSV or Excel file. Accepts the layout of the recordings
+    export: `id`, `transcription`, and optionally `transcribed_by`,
+    `transcription_updated_at` and `transcription_version`.
+    """
+    if filename.lower().endswith(('.xlsx', '.xls')):
+        import pandas as pd  # Only needed for Excel uploads
+
+        df = pd.read_excel(io.BytesIO(content), dtype=str, keep_default_na=False, engine='openpyxl')
+        rows = df.to_dict(orient='records')
+    else:
+        rows = list(csv.DictReader(io.StringIO(content.decode('utf-8-sig'))))
+    return [{str(k).strip(): (v.strip() if isinstance(v, str) else v) for k, v in row.items()} for row in rows]
+
+
+def rows_to_items(rows: List[Dict[str, Any]]) -> List[Any]:
+    """Converts file rows to BulkTranscriptionItems; invalid rows become row results."""
+    items: List[Any] = []
+    for index, row in enumerate(rows, start=1):
+        data = {
+            "recording_id": row.get("recording_id") or row.get("id") or "",
+            "transcription": row.get("transcription") or "",
+            "transcribed_by": row.get("transcribed_by") or None,
+            "transcription_updated_at": row.get("transcription_updated_at") or None,
+            "expected_version": row.get("transcription_version") if row.get("transcription_version") not in (None, "") else None,
+        }
+        try:
+            items.append(BulkTranscriptionItem(**data))
+        except ValidationError as e:
+            items.append(BulkTranscriptionRowResult(
+                row=index, recording_id=data["recording_id"] or None, status="invalid",
+                detail="; ".join(err["msg"] for err in e.errors())
+            ))
+    return items
+
+
+async def bulk_update_transcriptions(
+    collection: AsyncIOMotorCollection,
+    items: List[Any],
+    default_transcribed_by: Optional[str] = None,
+    check_concurrency: bool = False,
+    stats_collection: Optional[AsyncIOMotorCollection] = None,
+    revisions_collection: Optional[AsyncIOMotorCollection] = None,
+    chunk_size: int = BULK_CHUNK_SIZE
+) -> BulkTranscriptionResponse:
+    """
+    Applies many transcription updates with one unordered bulk_write per chunk.
+    Each chunk costs one prefetch query (to classify rows and learn old statuses
+    and versions), one bulk_write and one insert_many into the revision log; a
+    follow-up lookup only happens if some writes lost a race.
+    """
+    results: Dict[int, BulkTranscriptionRowResult] = {}
+    pending: Dict[int, tuple] = {}  # row -> (ObjectId, item)
+    last_row_for_id: Dict[ObjectId, int] = {}
+
+    for row, item in enumerate(items, start=1):
+        if isinstance(item, BulkTranscriptionRowResult):
+            results[row] = item
+            continue
+        if not item.transcription.strip():
+            results[row] = BulkTranscriptionRowResult(row=row, recording_id=item.recording_id, status="skipped", detail="Empty transcription")
+            continue
+        try:
+            obj_id = ObjectId(item.recording_id)
+        except (errors.InvalidId, TypeError):
+            results[row] = BulkTranscriptionRowResult(row=row, recording_id=item.recording_id, status="invalid", detail="Invalid recording ID format")
+            continue
+        if obj_id in last_row_for_id:
+            # The same recording appears twice: the later row wins
+            earlier = last_row_for_id[obj_id]
+            pending.pop(earlier, None)
+            results[earlier] = BulkTranscriptionRowResult(row=earlier, recording_id=item.recording_id, status="skipped", detail=f"Superseded by row {row}")
+        last_row_for_id[obj_id] = row
+        pending[row] = (obj_id, item)
+
+    pending_rows = list(pending.keys())
+    for start in range(0, len(pending_rows), chunk_size):
+        chunk = [(row, *pending[row]) for row in pending_rows[start:start + chunk_size]]
+        await _apply_chunk(collection, chunk, default_transcribed_by, check_concurrency, stats_collection, revisions_collection, results)
+
+    ordered = [results[row] for row in sorted(results)]
+    updated = sum(1 for r in ordered if r.status == "updated")
+    return BulkTranscriptionResponse(
+        total=len(items),
+        updated=updated,
+        failed=sum(1 for r in ordered if r.status in ("not_found", "conflict", "invalid")),
+        results=ordered,
+    )
+
+
+async def _apply_chunk(
+    collection: AsyncIOMotorCollection,
+    chunk: List[tuple],
+    default_transcribed_by: Optional[str],
+    check_concurrency: bool,
+    stats_collection: Optional[AsyncIOMotorCollection],
+    revisions_collection: Optional[AsyncIOMotorCollection],
+    results: Dict[int, BulkTranscriptionRowResult]
+) -> None:
+    ids = [obj_id for _, obj_id, _ in chunk]
+    existing = {
+        doc["_id"]: doc
+        async for doc in collection.find(
+            {"_id": {"$in": ids}, **NOT_DELETED},  # Tombstoned recordings are reported as not found
+            {"transcription_status": 1, "transcription_updated_at": 1, "transcription_version": 1, "lease_owner": 1, "lease_expires_at": 1}
+        )
+    }
+
+    now = datetime.now(ghana_tz)
+    stamp = _to_stored_timestamp(now)  # The exact value written, used to verify which writes landed
+    operations = []
+    written: List[tuple] = []
+    for row, obj_id, item in chunk:
+        doc = existing.get(obj_id)
+        if doc is None:
+            results[row] = BulkTranscriptionRowResult(row=row, recording_id=item.recording_id, status="not_found")
+            continue
+        transcriber = item.transcribed_by or default_transcribed_by
+        lease_owner, lease_expires_at = doc.get("lease_owner"), doc.get("lease_expires_at")
+        if lease_owner and lease_owner != transcriber and lease_expires_at and lease_expires_at >= stamp:
+            results[row] = BulkTranscriptionRowResult(row=row, recording_id=item.recording_id, status="conflict", detail=f"Claimed by {lease_owner}")
+            continue
+
+        # Same lease rule as the single-row PATCH, re-checked atomically by the write
+        lease_conditions: List[Dict[str, Any]] = [{"lease_owner": None}, {"lease_expires_at": {"$lt": stamp}}]
+        if transcriber:
+            lease_conditions.append({"lease_owner": transcriber})
+        # Always conditioned on the prefetched version, so a concurrent edit is reported, never overwritten
+        current_version = doc.get("transcription_version") or 0
+        if item.expected_version is not None and item.expected_version != current_version:
+            results[row] = BulkTranscriptionRowResult(row=row, recording_id=item.recording_id, status="conflict", detail=f"Edited since version {item.expected_version} (now {current_version})")
+            continue
+        update_filter: Dict[str, Any] = {"_id": obj_id, "$or": lease_conditions, **NOT_DELETED, **version_filter(current_version)}
+        if check_concurrency:
+            expected = _to_stored_timestamp(item.transcription_updated_at)
+            if _to_stored_timestamp(doc.get("transcription_updated_at")) != expected:
+                results[row] = BulkTranscriptionRowResult(row=row, recording_id=item.recording_id, status="conflict", detail="Transcription changed since export")
+                continue
+            update_filter["transcription_updated_at"] = expected
+        update_fields = {
+            "transcription": item.transcription,
+            "transcription_status": "transcribed",
+            "transcription_updated_at": stamp,
+            **search_fields(transcription=item.transcription),
+        }
+        if transcriber:
+            update_fields["transcribed_by"] = transcriber
+        operations.append(UpdateOne(update_filter, {
+            "$set": update_fields,
+            "$unset": {field: "" for field in LEASE_FIELDS},
+            "$inc": {"transcription_version": 1},
+        }))
+        written.append((row, obj_id, item, transcriber, current_version + 1))
+
+    if not operations:
+        return
+    bulk_result = await collection.bulk_write(operations, ordered=False)
+
+    lost = set()
+    deleted = set()
+    if bulk_result.matched_count < len(operations):
+        # Some documents were claimed, re-transcribed or deleted between the prefetch and the write
+        expected_versions = {obj_id: version for _, obj_id, _, _, version in written}
+        deleted.update(expected_versions)
+        async for doc in collection.find({"_id": {"$in": list(expected_versions)}, **NOT_DELETED}, {"transcription_updated_at": 1, "transcription_version": 1}):
+            deleted.discard(doc["_id"])
+            if (_to_stored_timestamp(doc.get("transcription_updated_at")) != stamp
+                    or doc.get("transcription_version") != expected_versions[doc["_id"]]):
+                lost.add(doc["_id"])
+    status_changes: Counter = Counter()
+    revisions: List[Dict[str, Any]] = []
+    for row, obj_id, item, transcriber, version in written:
+        if obj_id in deleted:
+            results[row] = BulkTranscriptionRowResult(row=row, recording_id=item.recording_id, status="not_found")
+        elif obj_id in lost:
+            results[row] = BulkTranscriptionRowResult(row=row, recording_id=item.recording_id, status="conflict", detail="Transcription changed during update")
+        else:
+            results[row] = BulkTranscriptionRowResult(row=row, recording_id=item.recording_id, status="updated")
+            status_changes[existing[obj_id].get("transcription_status")] += 1
+            revisions.append(make_revision(obj_id, version, item.transcription, transcriber, now))
+    logger.info(f"Bulk transcription chunk: {len(written) - len(lost) - len(deleted)} updated, {len(lost)} lost to concurrent edits.")
+
+    if revisions_collection is not None and revisions:
+        try:
+            await revisions_collection.insert_many(revisions, ordered=False)
+        except Exception as e:
+            logger.error(f"Failed to record {len(revisions)} transcription revisions: {e}")
+    if stats_collection is not None:
+        try:
+            for old_status, count in status_changes.items():
+                await stats.record_transcription_status_change(stats_collection, old_status, "transcribed", count)
+        except Exception as e:
+            logger.error(f"Failed to update dataset stats after bulk transcription: {e}")
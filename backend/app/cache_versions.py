@@ -0,0 +1,65 @@
+# app/cache_versions.py
+import logging
+import time
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+
+async def get_version(versions_collection: AsyncIOMotorCollection, name: str) -> int:
+    doc = await versions_collection.find_one({"_id": name}, {"version": 1})
+    return doc["version"] if doc else 0
+
+
+async def bump_version(versions_collection: AsyncIOMotorCollection, name: str) -> int:
+    """Increments a cache's version stamp and returns the new value."""
+    doc = await versions_collection.find_one_and_update(
+        {"_id": name}, {"$inc": {"version": 1}}, upsert=True, return_document=ReturnDocument.AFTER
+    )
+    return doc["version"]
+
+
+class VersionStamp:
+    """
+    Tracks the version of shared data that an in-process cache was built from.
+    Each worker process holds its own cache; whenever one of them changes the
+    underlying data it bumps the stamp in MongoDB, and the others notice the new
+    version on their next check (at most every `check_seconds`) and rebuild.
+    """
+
+    def __init__(self, name: str, check_seconds: float):
+        self.name = name
+        self.check_seconds = check_seconds
+        self.version: Optional[int] = None  # Version the cache was built from
+        self._latest: Optional[int] = None  # Version last read from MongoDB
+        self._checked_at = 0.0
+
+    async def read(self, versions_collection: AsyncIOMotorCollection) -> int:
+        """Reads the current stamp; call before rebuilding and pass the result to built_from()."""
+        self._latest = await get_version(versions_collection, self.name)
+        self._checked_at = time.monotonic()
+        return self._latest
+
+    def built_from(self, version: int) -> None:
+        self.version = version
+
+    async def is_outdated(self, versions_collection: AsyncIOMotorCollection) -> bool:
+        """True if another worker bumped the stamp since the cache was built (checked at most every check_seconds)."""
+        if self.version is None:
+            return True
+        if time.monotonic() - self._checked_at >= self.check_seconds:
+            await self.read(versions_collection)
+        return self._latest != self.version
+
+    async def bump(self, versions_collection: AsyncIOMotorCollection, applied_locally: bool = True) -> None:
+        """
+        Records a change to the shared data. If this worker already applied the
+        change to its own cache and nobody else changed it meanwhile, the cache
+        stays current; otherwise it will be rebuilt on the next check.
+        """
+        new_version = await bump_version(versions_collection, self.name)
+        if applied_locally and self.version is not None and new_version == self.version + 1:
+            self.version = self._latest = new_version
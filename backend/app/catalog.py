@@ -0,0 +1,162 @@
+# app/catalog.py
+import os
+import json
+import time
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Catalog produced by `twi_speech_app/scripts/convert_script.py to_json`
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(__file__), "data", "prompt_catalog.json")
+
+PROMPT_TYPES = ("scripted", "spontaneous")
+
+@dataclass(frozen=True)
+class PromptInfo:
+    prompt_id: str
+    section_id: str
+    type: str  # 'scripted' | 'spontaneous'
+    text: str
+    order: int  # Position in the script, used to keep listings in script order
+
+@dataclass
+class PromptCatalog:
+    """
+    In-memory index of the recording script.
+    All lookups (prompt -> section/kind, required counts per kind) are O(1).
+    """
+    prompts: Dict[str, PromptInfo] = field(default_factory=dict)
+    sections: Dict[str, List[str]] = field(default_factory=dict)
+    ids_by_type: Dict[str, FrozenSet[str]] = field(default_factory=dict)
+    source_path: Optional[str] = None
+    source_mtime: Optional[float] = None
+    version: int = 0
+
+    @property
+    def ordered_prompt_ids(self) -> List[str]:
+        return [pid for ids in self.sections.values() for pid in ids]
+
+    def __contains__(self, prompt_id: str) -> bool:
+        return prompt_id in self.prompts
+
+    def __len__(self) -> int:
+        return len(self.prompts)
+
+    def get(self, prompt_id: str) -> Optional[PromptInfo]:
+        return self.prompts.get(prompt_id)
+
+    def section_of(self, prompt_id: str) -> Optional[str]:
+        info = self.prompts.get(prompt_id)
+        return info.section_id if info else None
+
+    def kind_of(self, prompt_id: str) -> Optional[str]:
+        info = self.prompts.get(prompt_id)
+        return info.type if info else None
+
+    def ids_of_type(self, prompt_type: str) -> FrozenSet[str]:
+        return self.ids_by_type.get(prompt_type, frozenset())
+
+    def count_of_type(self, prompt_type: str) -> int:
+        return len(self.ids_of_type(prompt_type))
+
+
+def _build_catalog(sections: List[Dict], source_path: str) -> PromptCatalog:
+    """Indexes a list of {id, prompts: [{id, type, text}]} sections."""
+    catalog = PromptCatalog(source_path=source_path)
+    ids_by_type: Dict[str, set] = {prompt_type: set() for prompt_type in PROMPT_TYPES}
+    order = 0
+    for section in sections:
+        section_id = str(section['id'])
+        section_ids: List[str] = []
+        for prompt in section.get('prompts', []):
+            prompt_id = str(prompt['id'])
+            if prompt_id in catalog.prompts:
+                raise ValueError(f"Duplicate prompt id in catalog: {prompt_id}")
+            prompt_type = str(prompt.get('type') or 'scripted')
+            catalog.prompts[prompt_id] = PromptInfo(
+                prompt_id=prompt_id,
+                section_id=section_id,
+                type=prompt_type,
+                text=str(prompt.get('text') or ''),
+                order=order,
+            )
+            ids_by_type.setdefault(prompt_type, set()).add(prompt_id)
+            section_ids.append(prompt_id)
+            order += 1
+        catalog.sections[section_id] = section_ids
+    catalog.ids_by_type = {k: frozenset(v) for k, v in ids_by_type.items()}
+    return catalog
+
+
+def _read_json_sections(filepath: str) -> List[Dict]:
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return json.load(f)['sections']
+
+
+def _read_excel_sections(filepath: str) -> List[Dict]:
+    """Reads the Excel layout written by ScriptConverter.sections_to_excel."""
+    import pandas as pd  # Only needed for Excel catalogs
+
+    df = pd.read_excel(filepath, engine='openpyxl')
+    sections: Dict[str, Dict] = {}
+    for _, row in df.iterrows():
+        section_id = str(row['section_id'])
+        section = sections.setdefault(section_id, {'id': section_id, 'prompts': []})
+        section['prompts'].append({'id': row['id'], 'type': row['type'], 'text': row['text']})
+    return list(sections.values())
+
+
+def read_catalog(filepath: str) -> PromptCatalog:
+    """Reads a JSON or Excel prompt catalog produced by ScriptConverter."""
+    if filepath.endswith(('.xlsx', '.xls')):
+        sections = _read_excel_sections(filepath)
+    else:
+        sections = _read_json_sections(filepath)
+    catalog = _build_catalog(sections, filepath)
+    catalog.source_mtime = os.path.getmtime(filepath)
+    return catalog
+
+
+_catalog: Optional[PromptCatalog] = None
+_last_checked: float = 0.0
+
+def _catalog_path() -> str:
+    return settings.PROMPT_CATALOG_PATH or DEFAULT_CATALOG_PATH
+
+def load_catalog(path: Optional[str] = None) -> PromptCatalog:
+    """Loads (or reloads) the prompt catalog into memory."""
+    global _catalog, _last_checked
+    catalog_path = path or _catalog_path()
+    logger.info(f"Loading prompt catalog from {catalog_path}...")
+    catalog = read_catalog(catalog_path)
+    catalog.version = (_catalog.version + 1) if _catalog else 1
+    _catalog = catalog
+    _last_checked = time.monotonic()
+    logger.info(
+        f"Prompt catalog v{catalog.version} loaded: {len(catalog)} prompts in {len(catalog.sections)} sections "
+        f"({catalog.count_of_type('scripted')} scripted, {catalog.count_of_type('spontaneous')} spontaneous)."
+    )
+    return catalog
+
+def get_catalog() -> PromptCatalog:
+    """
+    Returns the loaded prompt catalog, loading it on first use.
+    At most every PROMPT_CATALOG_RELOAD_SECONDS the file's mtime is checked and
+    the catalog is hot-reloaded if it changed; a broken file keeps the old catalog.
+    """
+    global _last_checked
+    if _catalog is None:
+        return load_catalog()
+    interval = settings.PROMPT_CATALOG_RELOAD_SECONDS
+    if interval > 0 and time.monotonic() - _last_checked >= interval:
+        _last_checked = time.monotonic()
+        try:
+            if os.path.getmtime(_catalog.source_path) != _catalog.source_mtime:
+                return load_catalog(_catalog.source_path)
+        except Exception as e:
+            logger.error(f"Failed to hot-reload prompt catalog, keeping v{_catalog.version}: {e}")
+    return _catalog
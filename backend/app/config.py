@@ -1,23 +1,150 @@
 import os
+from functools import lru_cache
 # Import field_validator instead of validator
 from pydantic import Field, AnyHttpUrl, field_validator
 from pydantic_settings import BaseSettings
-from typing import List, Union, Any
+from typing import Dict, List, Optional, Union, Any
 
 class Settings(BaseSettings):
-    CLOUDFLARE_ACCOUNT_ID: str = Field(...)
-    CLOUDFLARE_ACCESS_KEY_ID: str = Field(...)
-    CLOUDFLARE_SECRET_ACCESS_KEY: str = Field(...)
-    R2_BUCKET_NAME: str = Field(...)
+    # Optional so the app can be imported (tests, scripts, docs) without R2 access;
+    # checked by require_r2() when a storage client is first needed
+    CLOUDFLARE_ACCOUNT_ID: Optional[str] = Field(None)
+    CLOUDFLARE_ACCESS_KEY_ID: Optional[str] = Field(None)
+    CLOUDFLARE_SECRET_ACCESS_KEY: Optional[str] = Field(None)
+    R2_BUCKET_NAME: Optional[str] = Field(None)
 
-    MONGODB_URI: str = Field(...)
-    MONGO_DB_NAME: str = Field(...)
+    # Optional for the same reason; checked by require_mongo() when connecting
+    MONGODB_URI: Optional[str] = Field(None)
+    MONGO_DB_NAME: Optional[str] = Field(None)
 
     # The field type remains the target Python type
     FRONTEND_ORIGIN: str = Field("*")
 
+    # MongoDB connection pool, timeouts and wire compression (unavailable compressors are skipped)
+    MONGO_MAX_POOL_SIZE: int = Field(50)
+    MONGO_MIN_POOL_SIZE: int = Field(0)
+    MONGO_MAX_IDLE_TIME_MS: int = Field(300000)
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = Field(10000)
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = Field(5000)
+    MONGO_CONNECT_TIMEOUT_MS: int = Field(10000)
+    MONGO_COMPRESSORS: str = Field("zstd,snappy,zlib")
+    # Operation profiles (see database.py): write concern for the upload path,
+    # read preference for exports and statistics
+    MONGO_INGEST_WRITE_CONCERN: str = Field("majority")
+    MONGO_INGEST_JOURNAL: bool = Field(True)
+    MONGO_ANALYTICS_READ_PREFERENCE: str = Field("secondaryPreferred")
+
+    # Prompt catalog (JSON or Excel from convert_script.py); defaults to app/data/prompt_catalog.json
+    PROMPT_CATALOG_PATH: Optional[str] = Field(None)
+    # How often the catalog file is checked for changes (0 disables hot-reload)
+    PROMPT_CATALOG_RELOAD_SECONDS: int = Field(30)
+    # Reject uploads whose prompt_id is not in the catalog (otherwise only logged)
+    REJECT_UNKNOWN_PROMPTS: bool = Field(False)
+
+    # Transcription work-queue leases
+    TRANSCRIPTION_LEASE_SECONDS: int = Field(900)
+    LEASE_REAPER_INTERVAL_SECONDS: int = Field(60)
+    # How often takes left current by a failed supersede step are resolved (0 disables)
+    SUPERSEDE_REPAIR_INTERVAL_SECONDS: int = Field(300)
+    # How long aggregated prompt coverage counts are served before being recomputed
+    COVERAGE_CACHE_TTL_SECONDS: int = Field(300)
+    # How often each worker checks whether another worker changed the coverage counts
+    COVERAGE_VERSION_CHECK_SECONDS: int = Field(5)
+
+    # Connections boto3 keeps open to R2 (bounds concurrent GETs/PUTs from this process)
+    R2_MAX_POOL_CONNECTIONS: int = Field(32)
+    # Local disk cache for audio read back from R2 (0 disables it)
+    R2_CACHE_DIR: str = Field("cache/r2")
+    R2_CACHE_MAX_BYTES: int = Field(1024 * 1024 * 1024)
+    # Audio playback (/recordings/{id}/audio): "redirect" to a presigned URL or "stream" through the API
+    AUDIO_PLAYBACK_MODE: str = Field("redirect")
+    R2_PRESIGNED_URL_TTL_SECONDS: int = Field(3600)
+    R2_PRESIGNED_URL_REFRESH_SECONDS: int = Field(300)
+
+    # Upload admission control (per worker; 0 disables a limit)
+    UPLOAD_MAX_IN_FLIGHT: int = Field(8)
+    UPLOAD_MAX_QUEUED: int = Field(32)
+    UPLOAD_QUEUE_TIMEOUT_SECONDS: float = Field(10)
+    UPLOAD_RATE_PER_IP_PER_MINUTE: int = Field(120)
+    UPLOAD_BURST_PER_IP: int = Field(30)
+    UPLOAD_RATE_PER_PARTICIPANT_PER_MINUTE: int = Field(30)
+    UPLOAD_BURST_PER_PARTICIPANT: int = Field(10)
+    # Upload size limits, enforced while the body streams in (bytes; 0 disables).
+    # UPLOAD_MAX_BYTES_BY_TYPE overrides per content type, as JSON in the environment.
+    UPLOAD_MAX_BYTES: int = Field(25 * 1024 * 1024)
+    UPLOAD_MAX_BYTES_BY_TYPE: Dict[str, int] = Field(default_factory=lambda: {
+        "audio/wav": 100 * 1024 * 1024,
+        "audio/wave": 100 * 1024 * 1024,
+        "audio/x-wav": 100 * 1024 * 1024,
+        "audio/flac": 100 * 1024 * 1024,
+        "audio/x-flac": 100 * 1024 * 1024,
+    })
+    # Reject uploads whose first bytes are not a known audio container (HTTP 415)
+    UPLOAD_SNIFF_AUDIO: bool = Field(True)
+    # Take the client IP from X-Forwarded-For (only behind a trusted proxy, e.g. Render)
+    UPLOAD_TRUST_PROXY_HEADERS: bool = Field(False)
+    # Coalesce recording inserts from concurrent uploads into insert_many batches
+    # (at most RECORDING_INSERT_BATCH_SIZE, waiting at most RECORDING_INSERT_BATCH_DELAY_MS)
+    RECORDING_INSERT_BATCHING: bool = Field(False)
+    RECORDING_INSERT_BATCH_SIZE: int = Field(100)
+    RECORDING_INSERT_BATCH_DELAY_MS: float = Field(5)
+    # How long shutdown waits for in-flight uploads before closing clients
+    SHUTDOWN_DRAIN_SECONDS: int = Field(25)
+
+    # Dataset exports (WebDataset shards)
+    EXPORT_DOWNLOAD_CONCURRENCY: int = Field(16)
+    EXPORT_LOCAL_DIR: str = Field("exports")
+
+    # R2 / MongoDB reconciliation: unreferenced objects younger than this may be uploads in progress
+    RECONCILE_GRACE_HOURS: float = Field(24)
+
+    # Running background jobs refresh updated_at this often; a running job whose heartbeat
+    # is older than the timeout (its process was killed) can be resumed by any worker
+    JOB_HEARTBEAT_SECONDS: int = Field(30)
+    JOB_HEARTBEAT_TIMEOUT_SECONDS: int = Field(300)
+
+    # Cascading deletes (speakers with their recordings and R2 objects): recordings per
+    # batch (at most 1000, the R2 delete_objects limit) and a pause between batches
+    DELETE_BATCH_SIZE: int = Field(500)
+    DELETE_BATCH_PAUSE_SECONDS: float = Field(0.1)
+    # Soft-deleted recordings (tombstones) can be restored for this long; afterwards the
+    # purger removes them with their R2 objects, in the batches above (0 interval = off)
+    SOFT_DELETE_RETENTION_HOURS: float = Field(72)
+    TOMBSTONE_PURGE_INTERVAL_SECONDS: int = Field(600)
+
+    # Change-stream event pipeline (app/events.py); needs a replica set (Atlas, or a
+    # single-node replica set locally). One worker per stream holds a lease and tails it.
+    EVENT_PIPELINE_ENABLED: bool = Field(False)
+    # False: stats and prompt coverage are updated only by the event consumers, off the
+    # request path (requires EVENT_PIPELINE_ENABLED)
+    DERIVED_UPDATES_INLINE: bool = Field(True)
+    EVENT_BATCH_SIZE: int = Field(500)
+    EVENT_BATCH_WAIT_MS: int = Field(200)
+    EVENT_LEASE_SECONDS: int = Field(30)
+    # Events without a pre-image (MongoDB < 6.0) make the stats consumer recompute, at most this often
+    EVENT_STATS_RECOMPUTE_MIN_SECONDS: int = Field(60)
+
+    # Check of filtered recording queries against the index definitions: 'off', 'warn' (log
+    # shapes no index narrows) or 'reject' (HTTP 400)
+    QUERY_INDEX_GUARD: str = Field("warn")
+
     # Use field_validator with mode='before'
 
+    def require_r2(self) -> None:
+        """Raises RuntimeError naming any R2 setting that is missing."""
+        missing = [
+            name for name in ("CLOUDFLARE_ACCOUNT_ID", "CLOUDFLARE_ACCESS_KEY_ID", "CLOUDFLARE_SECRET_ACCESS_KEY", "R2_BUCKET_NAME")
+            if not getattr(self, name)
+        ]
+        if missing:
+            raise RuntimeError(f"R2 storage is not configured: missing {', '.join(missing)}")
+
+    def require_mongo(self) -> None:
+        """Raises RuntimeError naming any MongoDB setting that is missing."""
+        missing = [name for name in ("MONGODB_URI", "MONGO_DB_NAME") if not getattr(self, name)]
+        if missing:
+            raise RuntimeError(f"MongoDB is not configured: missing {', '.join(missing)}")
+
     @property
     def r2_endpoint_url(self) -> str:
         return f"https://{self.CLOUDFLARE_ACCOUNT_ID}.r2.cloudflarestorage.com"
@@ -40,15 +167,20 @@ class Settings(BaseSettings):
         env_file_encoding = 'utf-8'
 
 
+@lru_cache()
+def get_settings() -> Settings:
+    """The process-wide settings, read from the environment / .env once."""
+    return Settings()
+
 # Create a single instance to be imported elsewhere
-settings = Settings()
+settings = get_settings()
 
 # --- Example Usage (for testing config loading) ---
 if __name__ == "__main__":
     print("Loaded Settings:")
     print(f"R2 Endpoint: {settings.r2_endpoint_url}")
     print(f"R2 Bucket: {settings.R2_BUCKET_NAME}")
-    print(f"MongoDB URI (masked): {settings.MONGODB_URI[:15]}...{settings.MONGODB_URI[-5:]}")
+    print(f"MongoDB URI (masked): {settings.MONGODB_URI[:15]}...{settings.MONGODB_URI[-5:]}" if settings.MONGODB_URI else "MongoDB URI: not set")
     print(f"MongoDB DB Name: {settings.MONGO_DB_NAME}")
     # Update to use the new field name
     print(f"Allowed Origins: {settings.FRONTEND_ORIGIN}")
@@ -0,0 +1,158 @@
+# app/coverage.py
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+import pytz
+
+from .cache_versions import VersionStamp
+from .catalog import get_catalog
+from .config import settings
+from .crud import check_recording_completion
+from .database import NOT_DELETED, get_cache_versions_collection
+from .models import PromptCoverage, PromptCoverageResponse, SpeakerMissingPrompts
+
+logger = logging.getLogger(__name__)
+
+try:
+    ghana_tz = pytz.timezone('Africa/Accra')
+except pytz.UnknownTimeZoneError:
+    ghana_tz = pytz.utc
+
+
+class PromptCoverageCache:
+    """
+    Per-prompt count of distinct speakers, computed by one aggregation and kept
+    in memory. Counts are bumped in place when a speaker records a prompt for
+    the first time, and fully recomputed once the TTL expires.
+
+    With several worker processes, each holds its own copy. Every change bumps
+    the "prompt_coverage" version stamp in MongoDB, and a worker that sees a
+    version it did not build from recomputes, so workers never serve counts
+    missing another worker's uploads for longer than `check_seconds`.
+    """
+
+    def __init__(self, ttl_seconds: int, check_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._counts: Dict[str, int] = {}
+        self._loaded_at: Optional[float] = None
+        self.computed_at: Optional[datetime] = None
+        self._lock = asyncio.Lock()
+        self.stamp = VersionStamp("prompt_coverage", check_seconds)
+
+    def _expired(self) -> bool:
+        return self._loaded_at is None or (time.monotonic() - self._loaded_at) > self.ttl_seconds
+
+    async def _is_stale(self) -> bool:
+        return self._expired() or await self.stamp.is_outdated(get_cache_versions_collection())
+
+    async def refresh(self, rec_collection: AsyncIOMotorCollection) -> Dict[str, int]:
+        """Recomputes speakers-per-prompt counts with a single aggregation."""
+        pipeline = [
+            {"$match": NOT_DELETED},
+            {"$group": {"_id": {"prompt_id": "$prompt_id", "speaker_id": "$speaker_id"}}},
+            {"$group": {"_id": "$_id.prompt_id", "speakers": {"$sum": 1}}},
+        ]
+        # Read before aggregating: a change landing meanwhile leaves the cache marked outdated
+        version = await self.stamp.read(get_cache_versions_collection())
+        rows = await rec_collection.aggregate(pipeline, allowDiskUse=True).to_list(length=None)
+        self._counts = {row["_id"]: row["speakers"] for row in rows if row["_id"]}
+        self._loaded_at = time.monotonic()
+        self.stamp.built_from(version)
+        self.computed_at = datetime.now(ghana_tz)
+        logger.info(f"Prompt coverage recomputed for {len(self._counts)} prompts.")
+        return self._counts
+
+    async def get_counts(self, rec_collection: AsyncIOMotorCollection) -> Dict[str, int]:
+        """Returns cached counts, recomputing at most once per TTL across concurrent callers."""
+        if await self._is_stale():
+            async with self._lock:
+                if await self._is_stale():
+                    await self.refresh(rec_collection)
+        return self._counts
+
+    async def note_first_take(self, prompt_id: str) -> None:
+        """Counts a speaker's first recording of a prompt without waiting for the next refresh."""
+        applied = self._loaded_at is not None
+        if applied:
+            self._counts[prompt_id] = self._counts.get(prompt_id, 0) + 1
+        await self.stamp.bump(get_cache_versions_collection(), applied_locally=applied)
+
+    async def invalidate(self) -> None:
+        """Drops the counts in this worker and, through the version stamp, in every other one."""
+        self._loaded_at = None
+        await self.stamp.bump(get_cache_versions_collection(), applied_locally=False)
+
+
+coverage_cache = PromptCoverageCache(
+    ttl_seconds=settings.COVERAGE_CACHE_TTL_SECONDS,
+    check_seconds=settings.COVERAGE_VERSION_CHECK_SECONDS
+)
+
+
+async def note_recording(
+    rec_collection: AsyncIOMotorCollection,
+    speaker_id: ObjectId,
+    prompt_id: str,
+    from_events: bool = False
+) -> None:
+    """Updates cached coverage after an insert; uses the (speaker_id, prompt_id) index."""
+    if not settings.DERIVED_UPDATES_INLINE and not from_events:
+        return  # Applied by the change-stream consumer (app/events.py)
+    takes = await rec_collection.count_documents({"speaker_id": speaker_id, "prompt_id": prompt_id, **NOT_DELETED}, limit=2)
+    if takes == 1:
+        await coverage_cache.note_first_take(prompt_id)
+
+
+async def get_prompt_coverage(
+    rec_collection: AsyncIOMotorCollection,
+    spk_collection: AsyncIOMotorCollection,
+    section_id: Optional[str] = None,
+    max_speakers: Optional[int] = None
+) -> PromptCoverageResponse:
+    """Builds the coverage matrix for every catalog prompt, in script order."""
+    catalog = get_catalog()
+    counts = await coverage_cache.get_counts(rec_collection)
+    total_speakers = await spk_collection.estimated_document_count()
+
+    prompts: List[PromptCoverage] = []
+    for prompt_id in catalog.ordered_prompt_ids:
+        info = catalog.prompts[prompt_id]
+        if section_id and info.section_id != section_id:
+            continue
+        speaker_count = counts.get(prompt_id, 0)
+        if max_speakers is not None and speaker_count > max_speakers:
+            continue
+        prompts.append(PromptCoverage(
+            prompt_id=prompt_id,
+            section_id=info.section_id,
+            type=info.type,
+            speaker_count=speaker_count,
+            missing_speaker_count=max(total_speakers - speaker_count, 0),
+            coverage_ratio=round(speaker_count / total_speakers, 4) if total_speakers else 0.0,
+        ))
+    return PromptCoverageResponse(
+        total_speakers=total_speakers,
+        total_prompts=len(catalog),
+        computed_at=coverage_cache.computed_at,
+        prompts=prompts,
+    )
+
+
+async def get_missing_prompts(
+    rec_collection: AsyncIOMotorCollection,
+    participant_code: str,
+    speaker_id: ObjectId
+) -> SpeakerMissingPrompts:
+    """Lists catalog prompts the speaker has not recorded yet, in script order."""
+    progress = await check_recording_completion(rec_collection, speaker_id)
+    return SpeakerMissingPrompts(
+        participant_code=participant_code,
+        total_required=progress.total_required,
+        recorded_count=progress.total_recordings,
+        missing_prompt_ids=progress.missing_prompt_ids,
+    )
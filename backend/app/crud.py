@@ -1,17 +1,26 @@
 from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorCursor
-from pymongo import ReturnDocument
+from pymongo import ReturnDocument, UpdateMany, UpdateOne
 from pydantic import ValidationError
-from .models import RecordingDocument, RecordingProgress, TranscriptionInput, SpeakerDocument
+from .models import (
+    RecordingDocument, RecordingProgress, TranscriptionInput, SpeakerDocument, TranscriptionRevision, TranscriptionHistoryResponse,
+    RecordingSearchResult, RecordingSearchResponse, RecordingFilter
+)
 from bson import ObjectId, errors # Keep ObjectId import here
+import asyncio
 import logging
-from typing import List, Dict, Any, Optional, Tuple
-from datetime import datetime
+import re
+from typing import List, Dict, Any, Optional, Set, Tuple
+from datetime import datetime, timedelta
 from .config import settings
+from .database import NOT_DELETED
+from . import stats
+from .search import SEARCH_FIELDS, normalize_twi_text, search_fields
+from .catalog import get_catalog
+from .query_guard import query_guard
+from .r2 import delete_multiple_files_from_r2
+from .insert_batcher import recording_inserts
 import pytz
 
-EXPECTED_TOTAL_RECORDINGS = 176 # Or import
-SPONTANEOUS_PROMPTS_COUNT = 12
-
 # Get timezone from config or define directly
 try:
     ghana_tz = pytz.timezone('Africa/Accra')
@@ -20,6 +29,39 @@ except pytz.UnknownTimeZoneError:
 
 logger = logging.getLogger(__name__)
 
+LEASE_FIELDS = ("lease_owner", "lease_expires_at")
+
+# Set on a new take until its older takes have been superseded (see repair_pending_supersedes)
+SUPERSEDE_PENDING = "supersede_pending"
+
+# Recording field holding each speaker demographic (denormalized at upload)
+SPEAKER_SNAPSHOT_FIELDS = {
+    "dialect": "speaker_dialect",
+    "gender": "speaker_gender",
+    "age_range": "speaker_age_range",
+}
+
+# Maintenance writes that run after the request returns; awaited at shutdown
+_background_writes: Set[asyncio.Task] = set()
+
+
+def run_in_background(coro) -> asyncio.Task:
+    """Schedules a write that should not delay the response, keeping a reference until it finishes."""
+    task = asyncio.create_task(coro)
+    _background_writes.add(task)
+    task.add_done_callback(_background_writes.discard)
+    return task
+
+
+async def drain_background_writes() -> None:
+    """Waits for pending background writes (called before the DB connection closes)."""
+    if _background_writes:
+        await asyncio.gather(*list(_background_writes), return_exceptions=True)
+
+
+class TranscriptionConflictError(Exception):
+    """Raised when a transcription update conflicts with another transcriber's work."""
+
 
 def _convert_objectid_to_str(doc: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
     """Helper to convert _id and speaker_id in a fetched dict to strings."""
@@ -32,35 +74,78 @@ def _convert_objectid_to_str(doc: Optional[Dict[str, Any]]) -> Optional[Dict[str
         result['speaker_id'] = str(result['speaker_id'])
     return result
 
+def _progress_from_prompt_ids(prompt_ids: List[str], total_takes: int) -> RecordingProgress:
+    """Builds completion from the distinct prompt ids a speaker has recorded."""
+    catalog = get_catalog()
+    recorded = set(prompt_ids)
+    missing = [pid for pid in catalog.ordered_prompt_ids if pid not in recorded]
+    scripted_ids = catalog.ids_of_type("scripted")
+    spontaneous_ids = catalog.ids_of_type("spontaneous")
+    return RecordingProgress(
+        total_recordings=len(catalog) - len(missing),
+        total_required=len(catalog),
+        is_complete=not missing,
+        total_takes=total_takes,
+        scripted_completed=len(recorded & scripted_ids),
+        scripted_required=len(scripted_ids),
+        spontaneous_completed=len(recorded & spontaneous_ids),
+        spontaneous_required=len(spontaneous_ids),
+        missing_prompt_ids=missing,
+    )
+
+def _completion_pipeline(match: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Distinct prompt ids (and raw take count) per speaker in one $group, skipping tombstones.
+    Only speaker_id, prompt_id and deleted_at are touched, so the
+    (speaker_id, prompt_id, deleted_at) index covers it. Tombstones are skipped
+    in the $group rather than matched out: a {deleted_at: null} match cannot be
+    answered from the index alone.
+    """
+    deleted = {"$gt": ["$deleted_at", None]}
+    return [
+        {"$match": match},
+        {"$group": {
+            "_id": "$speaker_id",
+            "total_takes": {"$sum": {"$cond": [deleted, 0, 1]}},
+            "prompt_ids": {"$addToSet": {"$cond": [deleted, "$$REMOVE", "$prompt_id"]}},
+        }},
+    ]
+
 async def check_recording_completion(
     rec_collection: AsyncIOMotorCollection,
-    speaker_id: ObjectId,
-    required_total: int = EXPECTED_TOTAL_RECORDINGS
+    speaker_id: ObjectId
 ) -> RecordingProgress:
-    """Check if a participant has completed all required recordings based on DB entries."""
+    """
+    Check if a participant has recorded every prompt in the catalog.
+    Re-recording a prompt does not count twice: completion is based on distinct prompt ids.
+    Counts and missing prompts come back from a single aggregation round trip.
+    """
     try:
-        total_recordings = await rec_collection.count_documents({
-            "speaker_id": speaker_id,
-        })
-        scripted_count = await rec_collection.count_documents({
-            "speaker_id": speaker_id,
-            "prompt_id": {"$not": {"$regex": "^Spontaneous_"}}
-        })
-        spontaneous_count = await rec_collection.count_documents({
-            "speaker_id": speaker_id,
-            "prompt_id": {"$regex": "^Spontaneous_"}
-        })
-        is_complete = (total_recordings >= required_total and
-                       spontaneous_count >= SPONTANEOUS_PROMPTS_COUNT and
-                       scripted_count >= (required_total - SPONTANEOUS_PROMPTS_COUNT))
-        return RecordingProgress(
-            total_recordings=total_recordings,
-            total_required=required_total,
-            is_complete=is_complete
-        )
+        rows = await rec_collection.aggregate(_completion_pipeline({"speaker_id": speaker_id})).to_list(length=1)
+        row = rows[0] if rows else {}
+        return _progress_from_prompt_ids(row.get("prompt_ids", []), row.get("total_takes", 0))
     except Exception as e:
         logger.error(f"Error checking recording completion for speaker {speaker_id}: {e}")
-        return RecordingProgress(total_recordings=0, total_required=required_total, is_complete=False)
+        return RecordingProgress(total_recordings=0, total_required=len(get_catalog()), is_complete=False)
+
+async def check_recording_completion_many(
+    rec_collection: AsyncIOMotorCollection,
+    speaker_ids: List[ObjectId]
+) -> Dict[ObjectId, RecordingProgress]:
+    """Completion for several speakers with one aggregation (used by listings and exports)."""
+    if not speaker_ids:
+        return {}
+    rows = await rec_collection.aggregate(
+        _completion_pipeline({"speaker_id": {"$in": speaker_ids}})
+    ).to_list(length=None)
+    by_speaker = {row["_id"]: row for row in rows}
+    return {
+        speaker_id: _progress_from_prompt_ids(
+            by_speaker.get(speaker_id, {}).get("prompt_ids", []),
+            by_speaker.get(speaker_id, {}).get("total_takes", 0)
+        )
+        for speaker_id in speaker_ids
+    }
 
 # --- Speaker CRUD ---
 
@@ -70,10 +155,14 @@ async def get_or_create_speaker(
     dialect: Optional[str] = None,
     age_range: Optional[str] = None,
     gender: Optional[str] = None,
+    rec_collection: Optional[AsyncIOMotorCollection] = None,
+    stats_collection: Optional[AsyncIOMotorCollection] = None,
 ) -> Tuple[SpeakerDocument, bool, ObjectId]: # Return speaker model, created flag, AND the actual ObjectId
     """
     Finds speaker or creates new. If speaker exists and provided details
     (dialect, age_range, gender) are different and not None, updates the speaker record.
+    If a recordings collection is given, changed details are then copied onto the
+    speaker's recordings in the background (see propagate_speaker_snapshot).
     Returns Pydantic model (with str ID), created flag, and ObjectId.
     """
     try:
@@ -114,6 +203,13 @@ async def get_or_create_speaker(
                 # Use the updated document for the rest of the process
                 speaker_dict_to_process = updated_speaker_dict_raw
                 logger.info(f"Speaker {participant_code} updated successfully.")
+
+                changes = {
+                    field: (existing_speaker_dict.get(field), fields_to_update[field])
+                    for field in SPEAKER_SNAPSHOT_FIELDS if field in fields_to_update
+                }
+                if rec_collection is not None and changes:
+                    run_in_background(propagate_speaker_snapshot(rec_collection, speaker_id_obj, changes, stats_collection))
             else:
                 # No updates needed, use the originally fetched document
                 speaker_dict_to_process = existing_speaker_dict
@@ -173,6 +269,39 @@ async def get_or_create_speaker(
 
 # --- Rest of the crud.py functions remain the same ---
 
+async def propagate_speaker_snapshot(
+    rec_collection: AsyncIOMotorCollection,
+    speaker_id: ObjectId,
+    changes: Dict[str, Tuple[Optional[str], Optional[str]]],
+    stats_collection: Optional[AsyncIOMotorCollection] = None
+) -> int:
+    """
+    Copies changed speaker demographics ({field: (old, new)}) onto the speaker's
+    recordings, one update_many per changed field, and moves the affected
+    recordings between the dataset stats buckets they were actually counted in.
+    """
+    modified = 0
+    try:
+        for field, (_, new_value) in changes.items():
+            snapshot_field = SPEAKER_SNAPSHOT_FIELDS[field]
+            stale_filter = {"speaker_id": speaker_id, snapshot_field: {"$ne": new_value}}
+            # A speaker has at most a few hundred recordings (served by the speaker_id_prompt_id_deleted_at index)
+            previous_values = await rec_collection.aggregate([
+                {"$match": {**stale_filter, **NOT_DELETED}},  # Tombstones are no longer counted in the stats
+                {"$group": {"_id": f"${snapshot_field}", "count": {"$sum": 1}}},
+            ]).to_list(length=None)
+            result = await rec_collection.update_many(stale_filter, {"$set": {snapshot_field: new_value}})
+            modified += result.modified_count
+            if stats_collection is not None:
+                for row in previous_values:
+                    await stats.record_breakdown_change(stats_collection, field, row["_id"], new_value, row["count"])
+        logger.info(f"Propagated speaker {speaker_id} changes {list(changes)} to recordings ({modified} field updates).")
+    except Exception as e:
+        # resync_speaker_snapshots() repairs recordings left behind
+        logger.error(f"Failed to propagate speaker {speaker_id} changes to recordings: {e}")
+    return modified
+
+
 async def get_speaker_by_code(
     collection: AsyncIOMotorCollection,
     participant_code: str
@@ -208,6 +337,9 @@ async def get_all_speakers(
     speakers_cursor = spk_collection.find({}).skip(skip).limit(limit).sort("created_at", -1)
     db_speakers_raw = await speakers_cursor.to_list(length=limit)
 
+    speaker_ids = [spk.get('_id') for spk in db_speakers_raw if isinstance(spk.get('_id'), ObjectId)]
+    progress_by_speaker = await check_recording_completion_many(rec_collection, speaker_ids)
+
     validated_speakers = []
     for spk_dict_raw in db_speakers_raw:
         spk_dict_converted = _convert_objectid_to_str(spk_dict_raw)
@@ -217,7 +349,7 @@ async def get_all_speakers(
             validated_doc = SpeakerDocument(**spk_dict_converted)
             speaker_id_obj = spk_dict_raw.get('_id')
             if speaker_id_obj and isinstance(speaker_id_obj, ObjectId):
-                progress = await check_recording_completion(rec_collection, speaker_id_obj)
+                progress = progress_by_speaker[speaker_id_obj]
                 validated_doc.total_recordings = progress.total_recordings
                 validated_doc.recordings_complete = progress.is_complete
             else:
@@ -246,6 +378,9 @@ async def get_all_speakers_for_export(
     all_speakers_cursor = spk_collection.find({})
     speakers_list_raw = await all_speakers_cursor.to_list(length=None)
 
+    speaker_ids = [spk.get('_id') for spk in speakers_list_raw if isinstance(spk.get('_id'), ObjectId)]
+    progress_by_speaker = await check_recording_completion_many(rec_collection, speaker_ids)
+
     processed_list = []
     for spk_raw in speakers_list_raw:
         spk = _convert_objectid_to_str(spk_raw)
@@ -253,7 +388,7 @@ async def get_all_speakers_for_export(
 
         speaker_id_obj = spk_raw.get('_id')
         if speaker_id_obj and isinstance(speaker_id_obj, ObjectId):
-            progress = await check_recording_completion(rec_collection, speaker_id_obj)
+            progress = progress_by_speaker[speaker_id_obj]
             spk['total_recordings'] = progress.total_recordings
             spk['recordings_complete'] = progress.is_complete
         else:
@@ -305,16 +440,35 @@ async def create_recording_entry(
         recording_dict['uploaded_at'] = recording_data.uploaded_at
         # Ensure default status is included
         recording_dict['transcription_status'] = recording_data.transcription_status
+        # Demographic snapshot is always written (even as null) so backfills can tell old documents apart
+        for snapshot_field in SPEAKER_SNAPSHOT_FIELDS.values():
+            recording_dict[snapshot_field] = getattr(recording_data, snapshot_field)
+        # Normalized copies for the text index
+        recording_dict.update(search_fields(recording_data.prompt_text, recording_data.transcription or ""))
 
+        # Written with the insert itself and cleared once older takes are superseded;
+        # repair_pending_supersedes() finishes the job for takes that still carry it
+        recording_dict[SUPERSEDE_PENDING] = True
 
         logger.debug(f"Attempting to insert recording metadata: {recording_dict}")
-        insert_result = await collection.insert_one(recording_dict)
-
-        if not insert_result.acknowledged:
-            raise Exception("MongoDB insertion not acknowledged.")
+        if settings.RECORDING_INSERT_BATCHING:
+            # Shares an insert_many with concurrent uploads; errors are still this document's own
+            inserted_obj_id = await recording_inserts.insert(collection, recording_dict)
+        else:
+            insert_result = await collection.insert_one(recording_dict)
+            if not insert_result.acknowledged:
+                raise Exception("MongoDB insertion not acknowledged.")
+            inserted_obj_id = insert_result.inserted_id
 
-        inserted_id = str(insert_result.inserted_id)
+        inserted_id = str(inserted_obj_id)
         logger.info(f"Successfully inserted recording metadata with ID: {inserted_id}")
+
+        try:
+            await supersede_previous_takes(collection, recording_dict['speaker_id'], recording_dict['prompt_id'], inserted_obj_id)
+        except Exception as e:
+            # The insert itself succeeded and still carries supersede_pending, so the
+            # supersede repair loop resolves the current take within SUPERSEDE_REPAIR_INTERVAL_SECONDS
+            logger.error(f"Failed to supersede previous takes for recording {inserted_id}, left for the repair loop: {e}")
         return inserted_id
 
     except ValueError as e:
@@ -324,18 +478,236 @@ async def create_recording_entry(
         logger.error(f"Failed to insert recording metadata into MongoDB: {e}")
         raise
 
+# --- Re-recorded prompts ("latest take wins") ---
+
+async def supersede_previous_takes(
+    collection: AsyncIOMotorCollection,
+    speaker_id: ObjectId,
+    prompt_id: str,
+    new_recording_id: ObjectId
+) -> int:
+    """
+    Marks older takes of the same (speaker, prompt) as superseded, then clears the
+    new take's supersede_pending marker. The take with the highest _id wins, so
+    concurrent uploads of the same prompt converge on one current take whichever
+    request finishes last.
+    """
+    now = datetime.now(ghana_tz)
+    take_filter = {"speaker_id": speaker_id, "prompt_id": prompt_id, "is_current": True}
+    update_result = await collection.update_many(
+        {**take_filter, "_id": {"$lt": new_recording_id}},
+        {"$set": {"is_current": False, "superseded_at": now}}
+    )
+    # A newer take may have been inserted while this one was in flight
+    newer = await collection.find_one({**take_filter, "_id": {"$gt": new_recording_id}}, {"_id": 1})
+    done: Dict[str, Any] = {"$unset": {SUPERSEDE_PENDING: ""}}
+    if newer:
+        done["$set"] = {"is_current": False, "superseded_at": now}
+    await collection.update_one({"_id": new_recording_id}, done)
+    if update_result.modified_count:
+        logger.info(f"Superseded {update_result.modified_count} earlier take(s) of {prompt_id} for speaker {speaker_id}.")
+    return update_result.modified_count
+
+async def resolve_current_takes(collection: AsyncIOMotorCollection, pairs: List[Tuple[Any, Any]]) -> int:
+    """
+    Keeps one current take per (speaker, prompt) among `pairs`: the highest _id,
+    as at upload. Returns how many extra current takes were superseded.
+    """
+    if not pairs:
+        return 0
+    rows = await collection.aggregate([
+        {"$match": {"is_current": True, "$or": [{"speaker_id": speaker_id, "prompt_id": prompt_id} for speaker_id, prompt_id in pairs]}},
+        {"$group": {"_id": {"speaker_id": "$speaker_id", "prompt_id": "$prompt_id"}, "latest_id": {"$max": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ]).to_list(length=None)
+    if not rows:
+        return 0
+    now = datetime.now(ghana_tz)
+    result = await collection.bulk_write([
+        UpdateMany(
+            {"speaker_id": row["_id"]["speaker_id"], "prompt_id": row["_id"]["prompt_id"], "is_current": True, "_id": {"$lt": row["latest_id"]}},
+            {"$set": {"is_current": False, "superseded_at": now}}
+        )
+        for row in rows
+    ], ordered=False)
+    return result.modified_count
+
+async def repair_pending_supersedes(
+    collection: AsyncIOMotorCollection,
+    grace_seconds: float = 60,
+    batch_size: int = 500
+) -> int:
+    """
+    Finishes supersede_previous_takes() for takes whose upload failed after the
+    insert: their (speaker, prompt) is resolved to one current take and the
+    marker is cleared. Takes younger than `grace_seconds` are left to their
+    upload request. Returns how many extra current takes were superseded.
+    """
+    cutoff = datetime.now(ghana_tz) - timedelta(seconds=grace_seconds)
+    repaired = 0
+    while True:
+        batch = await collection.find(
+            {SUPERSEDE_PENDING: True, "uploaded_at": {"$lt": cutoff}}, {"speaker_id": 1, "prompt_id": 1}
+        ).limit(batch_size).to_list(length=batch_size)
+        if not batch:
+            break
+        repaired += await resolve_current_takes(collection, list({(doc["speaker_id"], doc.get("prompt_id")) for doc in batch}))
+        await collection.update_many({"_id": {"$in": [doc["_id"] for doc in batch]}}, {"$unset": {SUPERSEDE_PENDING: ""}})
+    if repaired:
+        logger.warning(f"Superseded {repaired} take(s) left current by failed uploads.")
+    return repaired
+
+async def run_supersede_repair(collection_getter, interval_seconds: Optional[int] = None) -> None:
+    """Background loop running repair_pending_supersedes(); cancelled at shutdown."""
+    interval = interval_seconds or settings.SUPERSEDE_REPAIR_INTERVAL_SECONDS
+    while True:
+        try:
+            await repair_pending_supersedes(collection_getter())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Supersede repair iteration failed: {e}")
+        await asyncio.sleep(interval)
+
+async def backfill_current_flags(
+    collection: AsyncIOMotorCollection,
+    batch_size: int = 1000
+) -> int:
+    """
+    Sets is_current on documents written before the flag existed: the latest
+    take of each (speaker, prompt) becomes current, older ones superseded.
+    Only groups that contain unflagged documents are rewritten.
+    """
+    pipeline = [
+        {"$group": {
+            "_id": {"speaker_id": "$speaker_id", "prompt_id": "$prompt_id"},
+            "latest_id": {"$max": "$_id"},
+            "unflagged": {"$sum": {"$cond": [{"$eq": [{"$type": "$is_current"}, "missing"]}, 1, 0]}},
+        }},
+        {"$match": {"unflagged": {"$gt": 0}}},
+    ]
+    now = datetime.now(ghana_tz)
+    operations = []
+    groups_fixed = 0
+    async for group in collection.aggregate(pipeline, allowDiskUse=True):
+        key = group["_id"]
+        operations.append(UpdateMany(
+            {"speaker_id": key["speaker_id"], "prompt_id": key["prompt_id"], "_id": {"$ne": group["latest_id"]}},
+            {"$set": {"is_current": False, "superseded_at": now}}
+        ))
+        operations.append(UpdateOne({"_id": group["latest_id"]}, {"$set": {"is_current": True}}))
+        groups_fixed += 1
+        if len(operations) >= batch_size:
+            await collection.bulk_write(operations, ordered=False)
+            operations = []
+    if operations:
+        await collection.bulk_write(operations, ordered=False)
+    logger.info(f"Backfilled is_current flags for {groups_fixed} (speaker, prompt) groups.")
+    return groups_fixed
+
+async def purge_superseded_recordings(
+    collection: AsyncIOMotorCollection,
+    batch_size: int = 500,
+    min_age_hours: float = 24,
+    max_batches: Optional[int] = None,
+    revisions_collection: Optional[AsyncIOMotorCollection] = None
+) -> Tuple[int, int, List[str]]:
+    """
+    Garbage-collects superseded takes in batches: R2 objects are batch-deleted
+    first, then only the documents whose objects were removed (and their
+    transcription history, if a revisions collection is given).
+    Returns (documents deleted, objects attempted, failed object keys).
+    """
+    cutoff = datetime.now(ghana_tz) - timedelta(hours=min_age_hours)
+    db_deleted = 0
+    r2_attempted = 0
+    failed_keys: List[str] = []
+    batches = 0
+    last_id: Optional[ObjectId] = None
+    while max_batches is None or batches < max_batches:
+        query: Dict[str, Any] = {"is_current": False, "superseded_at": {"$lt": cutoff}, **NOT_DELETED}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}  # Skip past documents whose R2 delete failed
+        batch = await collection.find(query, {"_id": 1, "object_key": 1}).sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+        if not batch:
+            break
+        batches += 1
+        last_id = batch[-1]["_id"]
+        keys = [doc.get("object_key") for doc in batch if doc.get("object_key")]
+        r2_attempted += len(keys)
+        results = await delete_multiple_files_from_r2(keys) if keys else {}
+        batch_failed = {key for key, ok in results.items() if not ok}
+        failed_keys.extend(batch_failed)
+        ids_to_delete = [doc["_id"] for doc in batch if doc.get("object_key") not in batch_failed]
+        if ids_to_delete:
+            delete_result = await collection.delete_many({"_id": {"$in": ids_to_delete}})
+            db_deleted += delete_result.deleted_count
+            if revisions_collection is not None:
+                await revisions_collection.delete_many({"recording_id": {"$in": ids_to_delete}})
+        logger.info(f"Superseded purge batch {batches}: {len(ids_to_delete)} documents removed, {len(batch_failed)} R2 failures.")
+    return db_deleted, r2_attempted, failed_keys
+
+
+def section_prompt_filter(section_id: str) -> Dict[str, Any]:
+    """Matches the prompts of a catalog section; unknown sections match by id prefix (older scripts)."""
+    prompt_ids = get_catalog().sections.get(section_id)
+    if prompt_ids:
+        return {"$in": list(prompt_ids)}
+    return {"$regex": f"^{re.escape(section_id)}_"}
+
+def build_recording_query(
+    filters: Optional[RecordingFilter] = None,
+    include_superseded: bool = False
+) -> Dict[str, Any]:
+    """Translates a RecordingFilter into a MongoDB query on audio_recordings."""
+    query_filter: Dict[str, Any] = dict(NOT_DELETED) if include_superseded else {"is_current": True}
+    if filters is None:
+        return query_filter
+    for field in ("participant_code", "transcription_status", "session_id", "prompt_id"):
+        value = getattr(filters, field)
+        if value is not None:
+            query_filter[field] = value
+    for field, snapshot_field in SPEAKER_SNAPSHOT_FIELDS.items():
+        value = getattr(filters, field)
+        if value is not None:
+            query_filter[snapshot_field] = value
+    if filters.section_id and not filters.prompt_id:
+        query_filter["prompt_id"] = section_prompt_filter(filters.section_id)
+    uploaded_at: Dict[str, Any] = {}
+    if filters.uploaded_from:
+        uploaded_at["$gte"] = filters.uploaded_from
+    if filters.uploaded_to:
+        uploaded_at["$lt"] = filters.uploaded_to
+    if uploaded_at:
+        query_filter["uploaded_at"] = uploaded_at
+    duration: Dict[str, Any] = {}
+    if filters.min_duration_ms is not None:
+        duration["$gte"] = filters.min_duration_ms
+    if filters.max_duration_ms is not None:
+        duration["$lte"] = filters.max_duration_ms
+    if duration:
+        query_filter["recording_duration"] = duration
+    return query_filter
+
 async def get_recordings_basic(
     collection: AsyncIOMotorCollection,
     skip: int = 0,
     limit: int = 50,
-    participant_code: Optional[str] = None
+    participant_code: Optional[str] = None,
+    include_superseded: bool = False,
+    filters: Optional[RecordingFilter] = None
 ) -> List[RecordingDocument]:
-    """Retrieves recording documents, converting ObjectIds to strings."""
-    query_filter = {}
+    """
+    Retrieves recording documents, newest first, converting ObjectIds to strings.
+    Filtered queries pass through the index guard (see query_guard.py) first.
+    """
     if participant_code:
-        query_filter["participant_code"] = participant_code
+        filters = (filters or RecordingFilter()).model_copy(update={"participant_code": participant_code})
+    query_filter = build_recording_query(filters, include_superseded)
+    sort = [("uploaded_at", -1)]
+    await query_guard.check(collection, query_filter, sort)
 
-    recordings_cursor = collection.find(query_filter).skip(skip).limit(limit).sort("uploaded_at", -1)
+    recordings_cursor = collection.find(query_filter).skip(skip).limit(limit).sort(sort)
     db_records_raw = await recordings_cursor.to_list(length=limit)
 
     validated_recordings = []
@@ -359,68 +731,89 @@ async def get_recordings_basic(
 
 
 # --- Recording Export ---
+# Columns of the recordings export; the bulk transcription import reads the same layout back
+EXPORT_COLUMNS = [
+    'id', 'speaker_id', 'participant_code', 'prompt_id', 'prompt_text',
+    'speaker_dialect', 'speaker_age_range', 'speaker_gender',
+    'file_url', 'object_key', 'filename_original', 'content_type',
+    'size_bytes', 'recording_duration', 'uploaded_at', 'session_id',
+    'transcription', 'transcription_status', 'transcribed_by',
+    'transcription_updated_at', 'transcription_version', 'is_current'
+]
+
+def export_row(rec_raw: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Projects a raw recording document onto EXPORT_COLUMNS, with string ids and ISO timestamps."""
+    rec = _convert_objectid_to_str(rec_raw)
+    if not rec:
+        return None
+    rec['id'] = rec.pop('_id', None)
+
+    for dt_field in ['uploaded_at', 'transcription_updated_at', 'superseded_at']:
+        if dt_field in rec and isinstance(rec[dt_field], datetime):
+            dt_obj = rec[dt_field]
+            if dt_obj.tzinfo is None:
+                dt_obj = ghana_tz.localize(dt_obj) # Or UTC if needed
+            rec[dt_field] = dt_obj.isoformat()
+
+    rec.setdefault('prompt_text', 'Missing Prompt Text')
+    rec.setdefault('transcription', None)
+    rec.setdefault('transcription_status', 'pending')
+    rec['transcription_version'] = rec.get('transcription_version') or 0
+    return {col: rec.get(col) for col in EXPORT_COLUMNS}
+
 async def get_all_recordings_for_export(
     rec_collection: AsyncIOMotorCollection,
-    spk_collection: AsyncIOMotorCollection
+    include_superseded: bool = False
 ) -> List[Dict[str, Any]]:
-    """Retrieves all recordings, converts IDs, merges speaker details."""
-    all_recordings_cursor = rec_collection.find()
+    """Retrieves all recordings (latest takes only by default) with their speaker demographics snapshot, converting IDs."""
+    all_recordings_cursor = rec_collection.find(NOT_DELETED if include_superseded else {"is_current": True})
     recordings_list_raw = await all_recordings_cursor.to_list(length=None)
 
-    all_speakers_cursor = spk_collection.find()
-    speakers_list_raw = await all_speakers_cursor.to_list(length=None)
-    speakers_dict = {}
-    for spk_raw in speakers_list_raw:
-        spk_converted = _convert_objectid_to_str(spk_raw)
-        if spk_converted and spk_converted.get('id'):
-            speakers_dict[spk_converted['id']] = spk_converted
-
     processed_list = []
     for rec_raw in recordings_list_raw:
-        rec = _convert_objectid_to_str(rec_raw)
-        if not rec: continue
-
-        speaker_id_str = rec.get('speaker_id')
-        speaker_info = speakers_dict.get(speaker_id_str, {})
-
-        rec['speaker_dialect'] = speaker_info.get('dialect')
-        rec['speaker_age_range'] = speaker_info.get('age_range')
-        rec['speaker_gender'] = speaker_info.get('gender')
-
-        for dt_field in ['uploaded_at', 'transcription_updated_at']:
-            if dt_field in rec and isinstance(rec[dt_field], datetime):
-                dt_obj = rec[dt_field]
-                if dt_obj.tzinfo is None:
-                    dt_obj = ghana_tz.localize(dt_obj) # Or UTC if needed
-                rec[dt_field] = dt_obj.isoformat()
-
-        rec.setdefault('prompt_text', 'Missing Prompt Text')
-        rec.setdefault('transcription', None)
-        rec.setdefault('transcription_status', 'pending')
-        # ... other defaults ...
-
-        export_columns = [
-            'id', 'speaker_id', 'participant_code', 'prompt_id', 'prompt_text',
-            'speaker_dialect', 'speaker_age_range', 'speaker_gender',
-            'file_url', 'object_key', 'filename_original', 'content_type',
-            'size_bytes', 'recording_duration', 'uploaded_at', 'session_id',
-            'transcription', 'transcription_status', 'transcribed_by',
-            'transcription_updated_at'
-        ]
-        export_rec = {col: rec.get(col) for col in export_columns}
-        processed_list.append(export_rec)
+        export_rec = export_row(rec_raw)
+        if export_rec is not None:
+            processed_list.append(export_rec)
 
     return processed_list
 
 
 # --- Transcription & Spontaneous ---
 
+def version_filter(version: int) -> Dict[str, Any]:
+    """Matches documents at a transcription version; documents written before versioning count as 0."""
+    if version:
+        return {"transcription_version": version}
+    return {"transcription_version": {"$in": [0, None]}}
+
+
+def make_revision(obj_id: ObjectId, version: int, transcription: str, transcribed_by: Optional[str], created_at: datetime) -> Dict[str, Any]:
+    """Builds a transcription_revisions entry; only the edited fields are kept."""
+    return {
+        "recording_id": obj_id,
+        "version": version,
+        "transcription": transcription,
+        "transcribed_by": transcribed_by,
+        "created_at": created_at,
+    }
+
+
 async def update_transcription(
     collection: AsyncIOMotorCollection,
     recording_id_str: str,
     transcription_data: TranscriptionInput,
+    stats_collection: Optional[AsyncIOMotorCollection] = None,
+    revisions_collection: Optional[AsyncIOMotorCollection] = None,
 ) -> Optional[RecordingDocument]:
-    """Updates transcription, converting IDs as needed."""
+    """
+    Updates transcription, converting IDs as needed.
+    Every update bumps transcription_version; if expected_version is given the
+    update only applies at that version. Recordings leased to another transcriber
+    through the work queue or edited since expected_version are not overwritten
+    (TranscriptionConflictError); a successful update releases the lease.
+    If a stats collection is given, the status transition is counted there; if a
+    revisions collection is given, the new text is appended to the history.
+    """
     try:
         obj_id = ObjectId(recording_id_str)
     except errors.InvalidId:
@@ -430,21 +823,59 @@ async def update_transcription(
     update_fields = {
         "transcription": transcription_data.transcription,
         "transcription_status": "transcribed",
-        "transcription_updated_at": datetime.now(ghana_tz)
+        "transcription_updated_at": datetime.now(ghana_tz),
+        **search_fields(transcription=transcription_data.transcription),
     }
     if transcription_data.transcribed_by: # Optionally update who transcribed it
         update_fields["transcribed_by"] = transcription_data.transcribed_by
 
+    # Unleased, leased to this transcriber, or the lease has expired
+    lease_conditions: List[Dict[str, Any]] = [
+        {"lease_owner": None},
+        {"lease_expires_at": {"$lt": update_fields["transcription_updated_at"]}},
+    ]
+    if transcription_data.transcribed_by:
+        lease_conditions.append({"lease_owner": transcription_data.transcribed_by})
+    update_filter: Dict[str, Any] = {"_id": obj_id, "$or": lease_conditions, **NOT_DELETED}
+    if transcription_data.expected_version is not None:
+        update_filter.update(version_filter(transcription_data.expected_version))
+
     try:
         logger.info(f"Attempting to update transcription for recording ObjectId: {obj_id}")
-        updated_document_dict_raw = await collection.find_one_and_update(
-            {"_id": obj_id},
-            {"$set": update_fields},
-            return_document=ReturnDocument.AFTER
+        # Fetch the pre-update document so the old status and version are known
+        previous_document_dict_raw = await collection.find_one_and_update(
+            update_filter,
+            {
+                "$set": update_fields,
+                "$unset": {field: "" for field in LEASE_FIELDS},
+                "$inc": {"transcription_version": 1},
+            },
+            return_document=ReturnDocument.BEFORE
         )
 
-        if updated_document_dict_raw:
-            logger.info(f"Successfully updated transcription for ID: {recording_id_str}")
+        if previous_document_dict_raw:
+            new_version = (previous_document_dict_raw.get("transcription_version") or 0) + 1
+            logger.info(f"Successfully updated transcription for ID: {recording_id_str} (version {new_version})")
+            if revisions_collection is not None:
+                try:
+                    await revisions_collection.insert_one(make_revision(
+                        obj_id, new_version, transcription_data.transcription,
+                        transcription_data.transcribed_by, update_fields["transcription_updated_at"]
+                    ))
+                except Exception as e:
+                    logger.error(f"Failed to record transcription revision {new_version} of {recording_id_str}: {e}")
+            if stats_collection is not None:
+                try:
+                    await stats.record_transcription_status_change(
+                        stats_collection,
+                        previous_document_dict_raw.get("transcription_status"),
+                        update_fields["transcription_status"]
+                    )
+                except Exception as e:
+                    logger.error(f"Failed to update dataset stats after transcription of {recording_id_str}: {e}")
+            updated_document_dict_raw = {**previous_document_dict_raw, **update_fields, "transcription_version": new_version}
+            for field in LEASE_FIELDS:
+                updated_document_dict_raw.pop(field, None)
             updated_document_dict_converted = _convert_objectid_to_str(updated_document_dict_raw)
             if not updated_document_dict_converted:
                  logger.error(f"Failed to convert updated document after transcription update for ID {recording_id_str}")
@@ -455,21 +886,192 @@ async def update_transcription(
                  logger.error(f"Pydantic validation failed AFTER update for document ID {recording_id_str}: {e}")
                  return None
         else:
+            existing = await collection.find_one({"_id": obj_id, **NOT_DELETED}, {"lease_owner": 1, "transcription_version": 1})
+            if existing:
+                current_version = existing.get("transcription_version") or 0
+                expected_version = transcription_data.expected_version
+                if expected_version is not None and current_version != expected_version:
+                    logger.warning(f"Transcription update for {recording_id_str} rejected: version {current_version}, expected {expected_version}")
+                    raise TranscriptionConflictError(
+                        f"Recording {recording_id_str} was edited since version {expected_version} (now at version {current_version})."
+                    )
+                logger.warning(f"Transcription update for {recording_id_str} rejected: leased to {existing.get('lease_owner')}")
+                raise TranscriptionConflictError(f"Recording {recording_id_str} is currently claimed by another transcriber.")
             logger.warning(f"Recording ID not found during transcription update: {recording_id_str}")
             return None
 
+    except TranscriptionConflictError:
+        raise
     except Exception as e:
         logger.error(f"Failed to update transcription in MongoDB for ID {recording_id_str}: {e}")
         raise
 
 
+async def get_transcription_history(
+    collection: AsyncIOMotorCollection,
+    revisions_collection: AsyncIOMotorCollection,
+    recording_id_str: str,
+    limit: int = 100
+) -> Optional[TranscriptionHistoryResponse]:
+    """Returns the newest `limit` revisions of a recording's transcription, or None if the recording does not exist."""
+    try:
+        obj_id = ObjectId(recording_id_str)
+    except errors.InvalidId:
+        raise ValueError(f"Invalid recording ID format: {recording_id_str}")
+
+    recording = await collection.find_one({"_id": obj_id, **NOT_DELETED}, {"transcription_version": 1})
+    if not recording:
+        return None
+    cursor = revisions_collection.find({"recording_id": obj_id}).sort("version", -1).limit(limit)
+    revisions = []
+    async for doc in cursor:
+        doc["_id"] = str(doc["_id"])
+        doc["recording_id"] = str(doc["recording_id"])
+        revisions.append(TranscriptionRevision(**doc))
+    return TranscriptionHistoryResponse(
+        recording_id=recording_id_str,
+        current_version=recording.get("transcription_version") or 0,
+        revisions=revisions,
+    )
+
+
+async def get_recording_audio_source(collection: AsyncIOMotorCollection, recording_id_str: str) -> Optional[Dict[str, Any]]:
+    """Returns the object key and content type of a recording's audio, or None if the recording does not exist."""
+    try:
+        obj_id = ObjectId(recording_id_str)
+    except errors.InvalidId:
+        raise ValueError(f"Invalid recording ID format: {recording_id_str}")
+    return await collection.find_one({"_id": obj_id, **NOT_DELETED}, {"object_key": 1, "content_type": 1})
+
+
+async def resync_speaker_snapshots(
+    rec_collection: AsyncIOMotorCollection,
+    spk_collection: AsyncIOMotorCollection,
+    only_missing: bool = True,
+    batch_size: int = 500
+) -> int:
+    """
+    Copies speaker demographics onto recordings. By default only recordings that
+    predate the denormalized fields are touched; with only_missing=False every
+    recording whose snapshot differs from its speaker is rewritten.
+    """
+    if only_missing:
+        speaker_ids = await rec_collection.distinct("speaker_id", {"speaker_dialect": {"$exists": False}})
+    else:
+        speaker_ids = await spk_collection.distinct("_id")
+    updated = 0
+    for start in range(0, len(speaker_ids), batch_size):
+        batch_ids = speaker_ids[start:start + batch_size]
+        operations = []
+        async for speaker in spk_collection.find({"_id": {"$in": batch_ids}}):
+            snapshot = {snapshot_field: speaker.get(field) for field, snapshot_field in SPEAKER_SNAPSHOT_FIELDS.items()}
+            operations.append(UpdateMany(
+                {"speaker_id": speaker["_id"], "$or": [
+                    {"speaker_dialect": {"$exists": False}},
+                    *({field: {"$ne": value}} for field, value in snapshot.items()),
+                ]},
+                {"$set": snapshot}
+            ))
+        if operations:
+            result = await rec_collection.bulk_write(operations, ordered=False)
+            updated += result.modified_count
+    logger.info(f"Synchronized speaker demographics on {updated} recordings.")
+    return updated
+
+
+# --- Search ---
+
+async def search_recordings(
+    collection: AsyncIOMotorCollection,
+    query: str,
+    page: int = 1,
+    page_size: int = 20,
+    transcription_only: bool = False,
+    include_superseded: bool = False
+) -> RecordingSearchResponse:
+    """
+    Full-text search over prompt text and transcriptions using the `search_text`
+    index, ranked by text score. Query and stored text share normalize_twi_text,
+    so matching ignores case, diacritics and ɛ/ɔ vs e/o. Quoted phrases and
+    -negated terms follow MongoDB $text syntax.
+    """
+    normalized_query = normalize_twi_text(query)
+    query_filter: Dict[str, Any] = {"$text": {"$search": normalized_query}}
+    query_filter.update({"is_current": True} if not include_superseded else NOT_DELETED)
+    if transcription_only:
+        query_filter["transcription_status"] = "transcribed"
+
+    projection: Dict[str, Any] = {"score": {"$meta": "textScore"}}
+    projection.update({field: 0 for field in SEARCH_FIELDS})
+    # One extra row tells whether another page exists without counting every match
+    cursor = (
+        collection.find(query_filter, projection)
+        .sort([("score", {"$meta": "textScore"})])
+        .skip((page - 1) * page_size)
+        .limit(page_size + 1)
+    )
+    docs = await cursor.to_list(length=page_size + 1)
+
+    results: List[RecordingSearchResult] = []
+    for doc in docs[:page_size]:
+        try:
+            results.append(RecordingSearchResult(**_convert_objectid_to_str(doc)))
+        except ValidationError as e:
+            logger.error(f"Pydantic validation failed for search hit {doc.get('_id')}: {e}")
+    return RecordingSearchResponse(
+        query=query,
+        normalized_query=normalized_query,
+        page=page,
+        page_size=page_size,
+        has_more=len(docs) > page_size,
+        results=results,
+    )
+
+async def backfill_search_fields(
+    collection: AsyncIOMotorCollection,
+    batch_size: int = 1000
+) -> int:
+    """Computes the normalized search fields for documents written before search existed."""
+    updated = 0
+    cursor = collection.find(
+        {"search_prompt": {"$exists": False}},
+        {"_id": 1, "prompt_text": 1, "transcription": 1}
+    )
+    operations = []
+    async for doc in cursor:
+        operations.append(UpdateOne(
+            {"_id": doc["_id"]},
+            {"$set": search_fields(doc.get("prompt_text") or "", doc.get("transcription") or "")}
+        ))
+        if len(operations) >= batch_size:
+            result = await collection.bulk_write(operations, ordered=False)
+            updated += result.modified_count
+            operations = []
+    if operations:
+        result = await collection.bulk_write(operations, ordered=False)
+        updated += result.modified_count
+    logger.info(f"Backfilled search fields for {updated} recordings.")
+    return updated
+
+
+def spontaneous_prompt_filter() -> Dict[str, Any]:
+    """Query filter matching recordings of spontaneous prompts."""
+    spontaneous_ids = list(get_catalog().ids_of_type("spontaneous"))
+    # Recordings made with the previous script use 'Spontaneous_N' ids, which are not in the catalog
+    return {"$or": [
+        {"prompt_id": {"$in": spontaneous_ids}},
+        {"prompt_id": {"$regex": "^Spontaneous_"}},
+    ]}
+
 async def get_spontaneous_recordings(
     collection: AsyncIOMotorCollection,
     skip: int = 0,
-    limit: int = 50
+    limit: int = 50,
+    include_superseded: bool = False
 ) -> List[RecordingDocument]:
     """Retrieves spontaneous recordings (already converted)."""
-    query_filter = {"prompt_id": {"$regex": "^Spontaneous_"}}
+    query_filter = spontaneous_prompt_filter()
+    query_filter.update({"is_current": True} if not include_superseded else NOT_DELETED)
     recordings_cursor = collection.find(query_filter).skip(skip).limit(limit).sort("uploaded_at", -1)
     db_records_raw = await recordings_cursor.to_list(length=limit)
     validated_recordings = []
@@ -1,4 +1,10 @@
+import importlib.util
 import motor.motor_asyncio
+from pymongo import ASCENDING, DESCENDING, TEXT
+from pymongo.errors import OperationFailure
+from pymongo.read_preferences import read_pref_mode_from_name, make_read_preference
+from pymongo.write_concern import WriteConcern
+from typing import Any, Dict, List
 from .config import settings
 import logging
 
@@ -7,20 +13,72 @@ logger = logging.getLogger(__name__)
 client = None
 db = None
 
+# Python packages that pymongo needs for each wire compressor (zlib is built in)
+COMPRESSOR_PACKAGES = {"zstd": "zstandard", "snappy": "snappy", "zlib": None}
+
+# Operation profiles: collection options per class of work.
+# - default: the client's settings (primary reads, URI write concern)
+# - ingest: uploads and transcription writes; primary reads and MONGO_INGEST_WRITE_CONCERN
+# - analytics: exports, statistics and coverage; reads go to MONGO_ANALYTICS_READ_PREFERENCE
+#   (secondaries by default) so large scans do not compete with the ingest path on the primary
+OPERATION_PROFILES = ("default", "ingest", "analytics")
+
+# Recordings that have not been soft-deleted (see app/tombstones.py). Tombstones also
+# have is_current False, so reads of current takes skip them through the partial
+# indexes without this filter; reads that include superseded takes add it.
+NOT_DELETED = {"deleted_at": None}
+
+
+def _compressors() -> List[str]:
+    """The configured compressors whose Python package is installed, in preference order."""
+    available = []
+    for name in (c.strip().lower() for c in settings.MONGO_COMPRESSORS.split(",") if c.strip()):
+        if name not in COMPRESSOR_PACKAGES:
+            logger.warning(f"Ignoring unknown MongoDB compressor '{name}'.")
+        elif COMPRESSOR_PACKAGES[name] and importlib.util.find_spec(COMPRESSOR_PACKAGES[name]) is None:
+            logger.info(f"MongoDB compressor '{name}' skipped: package '{COMPRESSOR_PACKAGES[name]}' is not installed.")
+        else:
+            available.append(name)
+    return available
+
+
+def _profile_options(profile: str) -> Dict[str, Any]:
+    if profile not in OPERATION_PROFILES:
+        raise ValueError(f"Unknown operation profile: {profile}")
+    if profile == "ingest":
+        w = settings.MONGO_INGEST_WRITE_CONCERN
+        return {
+            "read_preference": make_read_preference(read_pref_mode_from_name("primary"), None),
+            "write_concern": WriteConcern(w=int(w) if w.isdigit() else w, j=settings.MONGO_INGEST_JOURNAL),
+        }
+    if profile == "analytics":
+        mode = read_pref_mode_from_name(settings.MONGO_ANALYTICS_READ_PREFERENCE)
+        return {"read_preference": make_read_preference(mode, None)}
+    return {}
+
 async def connect_to_mongo():
     """Connects to MongoDB using Motor."""
     global client, db
     logger.info("Connecting to MongoDB...")
     try:
-        client = motor.motor_asyncio.AsyncIOMotorClient(
-            settings.MONGODB_URI,
-            # Optional: Add server selection timeout if needed
-            # serverSelectionTimeoutMS=5000
-        )
+        settings.require_mongo()
+        # These settings override the same options if they also appear in MONGODB_URI
+        options: Dict[str, Any] = {
+            "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+            "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+            "maxIdleTimeMS": settings.MONGO_MAX_IDLE_TIME_MS,
+            "waitQueueTimeoutMS": settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+        }
+        compressors = _compressors()
+        if compressors:
+            options["compressors"] = ",".join(compressors)
+        client = motor.motor_asyncio.AsyncIOMotorClient(settings.MONGODB_URI, **options)
         # Verify connection
         await client.admin.command('ping')
         db = client[settings.MONGO_DB_NAME]
-        logger.info("MongoDB connection successful.")
+        logger.info(f"MongoDB connection successful (pool {settings.MONGO_MIN_POOL_SIZE}-{settings.MONGO_MAX_POOL_SIZE}, compressors: {', '.join(compressors) or 'none'}).")
     except Exception as e:
         logger.error(f"Failed to connect to MongoDB: {e}")
         # Depending on your strategy, you might want to raise the exception
@@ -44,12 +102,145 @@ def get_database() -> motor.motor_asyncio.AsyncIOMotorDatabase:
         raise RuntimeError("Database not connected. Ensure connect_to_mongo() is called at application startup.")
     return db
 
-def get_recordings_collection() -> motor.motor_asyncio.AsyncIOMotorCollection:
+def get_recordings_collection(profile: str = "default") -> motor.motor_asyncio.AsyncIOMotorCollection:
     """Returns the specific collection for recordings."""
     database = get_database()
-    return database.get_collection("audio_recordings") # Collection name
+    return database.get_collection("audio_recordings", **_profile_options(profile)) # Collection name
 
-def get_speakers_collection() -> motor.motor_asyncio.AsyncIOMotorCollection:
+def get_speakers_collection(profile: str = "default") -> motor.motor_asyncio.AsyncIOMotorCollection:
     """Returns the specific collection for speakers."""
     database = get_database()
-    return database.get_collection("speakers") # New collection name
+    return database.get_collection("speakers", **_profile_options(profile)) # New collection name
+
+def get_stats_collection(profile: str = "default") -> motor.motor_asyncio.AsyncIOMotorCollection:
+    """Returns the collection holding precomputed dataset statistics."""
+    database = get_database()
+    return database.get_collection("dataset_stats", **_profile_options(profile))
+
+def get_revisions_collection(profile: str = "default") -> motor.motor_asyncio.AsyncIOMotorCollection:
+    """Returns the append-only log of transcription revisions."""
+    database = get_database()
+    return database.get_collection("transcription_revisions", **_profile_options(profile))
+
+def get_jobs_collection(profile: str = "default") -> motor.motor_asyncio.AsyncIOMotorCollection:
+    """Returns the collection tracking long-running background jobs (exports, cleanups)."""
+    database = get_database()
+    return database.get_collection("jobs", **_profile_options(profile))
+
+def get_cache_versions_collection() -> motor.motor_asyncio.AsyncIOMotorCollection:
+    """Returns the version stamps that keep per-worker caches coherent (see cache_versions.py)."""
+    database = get_database()
+    return database.get_collection("cache_versions")
+
+def get_event_checkpoints_collection() -> motor.motor_asyncio.AsyncIOMotorCollection:
+    """Returns the change-stream resume tokens and leader leases (see events.py)."""
+    database = get_database()
+    return database.get_collection("event_checkpoints")
+
+async def ensure_indexes():
+    """Creates the indexes that the query paths rely on. Safe to run on every startup."""
+    recordings = get_recordings_collection()
+    # Serves per-speaker prompt lookups (coverage, missing prompts, completion).
+    # deleted_at is included so the completion aggregation stays covered while skipping tombstones.
+    await recordings.create_index(
+        [("speaker_id", ASCENDING), ("prompt_id", ASCENDING), ("deleted_at", ASCENDING)],
+        name="speaker_id_prompt_id_deleted_at"
+    )
+    # Superseded by the index above
+    try:
+        await recordings.drop_index("speaker_id_prompt_id")
+    except OperationFailure:
+        pass  # Already dropped, or never created
+    # Sorted object_key scan for the R2 reconciliation merge-join (app/reconcile.py)
+    await recordings.create_index([("object_key", ASCENDING)], name="object_key")
+    # Per-speaker session summaries (app/sessions.py): match on both, sort by upload time
+    await recordings.create_index(
+        [("speaker_id", ASCENDING), ("session_id", ASCENDING), ("uploaded_at", ASCENDING)],
+        name="speaker_id_session_id_uploaded_at"
+    )
+    # Single-session summary (GET /sessions/{session_id}), superseded takes included
+    await recordings.create_index(
+        [("session_id", ASCENDING), ("uploaded_at", ASCENDING)],
+        name="session_id_uploaded_at"
+    )
+    # Partial indexes over current takes only: listings and exports skip superseded rows
+    current_only = {"is_current": True}
+    await recordings.create_index(
+        [("uploaded_at", DESCENDING)],
+        name="current_uploaded_at",
+        partialFilterExpression=current_only
+    )
+    await recordings.create_index(
+        [("participant_code", ASCENDING), ("uploaded_at", DESCENDING)],
+        name="current_participant_code_uploaded_at",
+        partialFilterExpression=current_only
+    )
+    # Transcription work-queue: oldest pending current takes first, and the lease reaper
+    await recordings.create_index(
+        [("transcription_status", ASCENDING), ("uploaded_at", ASCENDING)],
+        name="current_transcription_status_uploaded_at",
+        partialFilterExpression=current_only
+    )
+    # Planned indexes for the filtered listing (RecordingFilter), newest first.
+    # Equality fields lead, uploaded_at follows for the sort / date range.
+    # Filter shapes not covered here are flagged by query_guard.py.
+    filter_indexes = {
+        "current_dialect_status_uploaded_at": [("speaker_dialect", ASCENDING), ("transcription_status", ASCENDING), ("uploaded_at", DESCENDING)],
+        "current_gender_age_range_uploaded_at": [("speaker_gender", ASCENDING), ("speaker_age_range", ASCENDING), ("uploaded_at", DESCENDING)],
+        "current_session_id_uploaded_at": [("session_id", ASCENDING), ("uploaded_at", DESCENDING)],
+        "current_prompt_id_uploaded_at": [("prompt_id", ASCENDING), ("uploaded_at", DESCENDING)],
+        "current_recording_duration": [("recording_duration", ASCENDING)],
+    }
+    for name, keys in filter_indexes.items():
+        await recordings.create_index(keys, name=name, partialFilterExpression=current_only)
+    # All takes (include_superseded listings): newest first, overall or per participant.
+    # Other filters are only indexed for current takes; the guard refuses them here.
+    await recordings.create_index([("uploaded_at", DESCENDING)], name="uploaded_at")
+    await recordings.create_index(
+        [("participant_code", ASCENDING), ("uploaded_at", DESCENDING)],
+        name="participant_code_uploaded_at"
+    )
+    # Takes whose upload has not finished superseding older takes (crud.repair_pending_supersedes)
+    await recordings.create_index(
+        [("uploaded_at", ASCENDING)],
+        name="supersede_pending_uploaded_at",
+        partialFilterExpression={"supersede_pending": True}
+    )
+    await recordings.create_index(
+        [("lease_expires_at", ASCENDING)],
+        name="lease_expires_at",
+        partialFilterExpression={"lease_expires_at": {"$exists": True}}
+    )
+    # Garbage collection of superseded takes
+    await recordings.create_index(
+        [("superseded_at", ASCENDING)],
+        name="superseded_at",
+        partialFilterExpression={"is_current": False}
+    )
+    # Tombstones only (soft-deleted recordings): the purger's scan by age and restores by deletion
+    await recordings.create_index(
+        [("deleted_at", ASCENDING), ("_id", ASCENDING)],
+        name="tombstone_deleted_at",
+        partialFilterExpression={"deleted_at": {"$exists": True}}
+    )
+    await recordings.create_index(
+        [("deletion_id", ASCENDING)],
+        name="tombstone_deletion_id",
+        partialFilterExpression={"deletion_id": {"$exists": True}}
+    )
+    # Full-text search over normalized prompt/transcription copies (app/search.py).
+    # Stemming is off: there is no Twi analyzer, and normalization already folds case and diacritics.
+    await recordings.create_index(
+        [("search_prompt", TEXT), ("search_transcription", TEXT)],
+        name="search_text",
+        weights={"search_transcription": 2, "search_prompt": 1},
+        default_language="none",
+        language_override="search_language"
+    )
+    # Transcription history, read per recording newest first; one revision per version
+    await get_revisions_collection().create_index(
+        [("recording_id", ASCENDING), ("version", DESCENDING)],
+        name="recording_id_version",
+        unique=True
+    )
+    logger.info("MongoDB indexes ensured.")
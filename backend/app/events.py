@@ -0,0 +1,366 @@
+# app/events.py
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
+import pytz
+
+from . import coverage, stats
+from .config import settings
+from .database import (
+    get_database, get_event_checkpoints_collection, get_recordings_collection, get_speakers_collection, get_stats_collection
+)
+
+logger = logging.getLogger(__name__)
+
+try:
+    ghana_tz = pytz.timezone('Africa/Accra')
+except pytz.UnknownTimeZoneError:
+    ghana_tz = pytz.utc
+
+RECORDINGS = "audio_recordings"
+SPEAKERS = "speakers"
+STREAMS = (RECORDINGS, SPEAKERS)
+
+# Server error codes: change streams need a replica set; the resume point has left the oplog
+NOT_REPLICA_SET = 40573
+HISTORY_LOST_CODES = (280, 286)
+
+# Identifies this process in the leader leases
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+EventHandler = Callable[[List[Dict[str, Any]]], Awaitable[None]]
+ResyncHandler = Callable[[], Awaitable[None]]
+
+
+class Consumer:
+    """
+    An in-process consumer of one stream. `handle` receives each batch of change
+    events in oplog order. `resync`, if given, rebuilds the consumer's derived
+    data from scratch; it runs when `handle` fails or events were lost.
+    """
+
+    def __init__(self, name: str, handle: EventHandler, resync: Optional[ResyncHandler] = None):
+        self.name = name
+        self.handle = handle
+        self.resync = resync
+
+
+# Stream -> consumers; registered by the modules owning each derived view
+CONSUMERS: Dict[str, List[Consumer]] = {stream: [] for stream in STREAMS}
+
+# Tailers and pending recomputes started in this process; cancelled at shutdown
+_tasks: Set[asyncio.Task] = set()
+
+
+def register_consumer(stream: str, name: str, handle: EventHandler, resync: Optional[ResyncHandler] = None) -> None:
+    CONSUMERS[stream].append(Consumer(name, handle, resync))
+
+
+def _spawn(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return task
+
+
+async def _resync(stream: str, consumer: Consumer) -> None:
+    if consumer.resync is None:
+        return
+    try:
+        await consumer.resync()
+        logger.info(f"Event consumer {stream}/{consumer.name} resynchronized.")
+    except Exception as e:
+        logger.error(f"Event consumer {stream}/{consumer.name} failed to resynchronize: {e}")
+
+
+async def _dispatch(stream: str, events: List[Dict[str, Any]]) -> None:
+    for consumer in CONSUMERS[stream]:
+        try:
+            await consumer.handle(events)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # The batch is not replayed: rebuilding is cheaper than blocking the stream
+            logger.error(f"Event consumer {stream}/{consumer.name} failed on a batch of {len(events)}: {e}")
+            await _resync(stream, consumer)
+
+
+class ChangeStreamTailer:
+    """
+    Tails one collection's change stream in the worker holding its lease. The
+    lease and the resume token live in one event_checkpoints document per
+    stream; the token is saved after each batch has been dispatched, so a
+    restart or a new leader continues after the last processed batch. Events of
+    a batch in flight when a leader dies are delivered again (at least once).
+    """
+
+    def __init__(self, stream: str):
+        self.stream = stream
+        self.leader = False
+        self.processed = 0
+        self.last_batch_at: Optional[datetime] = None
+
+    async def _acquire_lease(self, checkpoints: AsyncIOMotorCollection) -> Optional[Dict[str, Any]]:
+        """Takes or renews the lease; returns the checkpoint document, or None if another worker holds it."""
+        now = datetime.now(ghana_tz)
+        try:
+            return await checkpoints.find_one_and_update(
+                {"_id": self.stream, "$or": [
+                    {"lease_owner": WORKER_ID},
+                    {"lease_owner": None},
+                    {"lease_expires_at": {"$lt": now}},
+                ]},
+                {"$set": {"lease_owner": WORKER_ID, "lease_expires_at": now + timedelta(seconds=settings.EVENT_LEASE_SECONDS)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            return None  # The document exists and its lease is held elsewhere
+
+    async def _checkpoint(self, checkpoints: AsyncIOMotorCollection, resume_token: Optional[Dict[str, Any]]) -> bool:
+        """Saves the resume token and renews the lease; False if the lease has passed to another worker."""
+        now = datetime.now(ghana_tz)
+        update: Dict[str, Any] = {"lease_expires_at": now + timedelta(seconds=settings.EVENT_LEASE_SECONDS), "updated_at": now}
+        if resume_token is not None:
+            update["resume_token"] = resume_token
+        result = await checkpoints.update_one({"_id": self.stream, "lease_owner": WORKER_ID}, {"$set": update})
+        return result.matched_count == 1
+
+    async def _next_batch(self, change_stream) -> List[Dict[str, Any]]:
+        """Events until EVENT_BATCH_SIZE, EVENT_BATCH_WAIT_MS after the first one, or an idle wait."""
+        batch: List[Dict[str, Any]] = []
+        deadline = 0.0
+        while len(batch) < settings.EVENT_BATCH_SIZE:
+            event = await change_stream.try_next()  # None after max_await_time_ms without events
+            if event is None:
+                break
+            if not batch:
+                deadline = time.monotonic() + settings.EVENT_BATCH_WAIT_MS / 1000
+            batch.append(event)
+            if time.monotonic() >= deadline:
+                break
+        return batch
+
+    async def _tail(self, checkpoints: AsyncIOMotorCollection, resume_token: Optional[Dict[str, Any]]) -> None:
+        options: Dict[str, Any] = {
+            "batch_size": settings.EVENT_BATCH_SIZE,
+            "max_await_time_ms": settings.EVENT_BATCH_WAIT_MS,
+        }
+        if self.stream == RECORDINGS:
+            options["full_document_before_change"] = "whenAvailable"  # Exact stats deltas on MongoDB 6.0+
+        if resume_token:
+            options["resume_after"] = resume_token
+        renew_every = settings.EVENT_LEASE_SECONDS / 3
+        async with get_database().get_collection(self.stream).watch(**options) as change_stream:
+            logger.info(f"Tailing {self.stream} change stream ({'resumed' if resume_token else 'from now'}).")
+            renewed_at = time.monotonic()
+            while True:
+                batch = await self._next_batch(change_stream)
+                if batch:
+                    await _dispatch(self.stream, batch)
+                    self.processed += len(batch)
+                    self.last_batch_at = datetime.now(ghana_tz)
+                if batch or time.monotonic() - renewed_at > renew_every:
+                    if not await self._checkpoint(checkpoints, change_stream.resume_token):
+                        logger.warning(f"Lost the {self.stream} change stream lease; another worker continues.")
+                        return
+                    renewed_at = time.monotonic()
+
+    async def run(self) -> None:
+        """Background loop: wait for the lease, tail while holding it; cancelled at shutdown."""
+        checkpoints = get_event_checkpoints_collection()
+        while True:
+            try:
+                checkpoint = await self._acquire_lease(checkpoints)
+                if checkpoint is None:
+                    self.leader = False
+                    await asyncio.sleep(settings.EVENT_LEASE_SECONDS / 2)
+                    continue
+                self.leader = True
+                await self._tail(checkpoints, checkpoint.get("resume_token"))
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code == NOT_REPLICA_SET:
+                    logger.error(f"Change streams are unavailable ({e}); the event pipeline needs MongoDB to run as a replica set.")
+                    self.leader = False
+                    return
+                if e.code in HISTORY_LOST_CODES:
+                    logger.warning(f"{self.stream} resume token is no longer in the oplog; restarting from now and resynchronizing consumers.")
+                    await checkpoints.update_one({"_id": self.stream, "lease_owner": WORKER_ID}, {"$unset": {"resume_token": ""}})
+                    for consumer in CONSUMERS[self.stream]:
+                        await _resync(self.stream, consumer)
+                    continue
+                logger.error(f"{self.stream} change stream failed: {e}")
+                await asyncio.sleep(5)
+            except Exception as e:
+                logger.error(f"{self.stream} change stream failed: {e}")
+                await asyncio.sleep(5)
+            self.leader = False
+
+
+_tailers: Dict[str, ChangeStreamTailer] = {}
+
+
+async def start_pipeline() -> None:
+    """Starts one tailer per stream in this worker; only the lease holder actually consumes."""
+    if not settings.DERIVED_UPDATES_INLINE:
+        try:
+            # Pre-images let the stats consumer subtract exactly what an update or delete removed
+            await get_database().command("collMod", RECORDINGS, changeStreamPreAndPostImages={"enabled": True})
+        except OperationFailure as e:
+            logger.warning(f"Could not enable change stream pre-images on {RECORDINGS} ({e}); stats will be recomputed instead.")
+    for stream in STREAMS:
+        _tailers[stream] = ChangeStreamTailer(stream)
+        _spawn(_tailers[stream].run())
+    logger.info(f"Event pipeline started (worker {WORKER_ID}, inline derived updates: {settings.DERIVED_UPDATES_INLINE}).")
+
+
+async def stop_pipeline() -> None:
+    tasks = list(_tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if _tailers:
+        try:
+            # Hand the streams over now rather than when the leases expire
+            await get_event_checkpoints_collection().update_many({"lease_owner": WORKER_ID}, {"$set": {"lease_owner": None}})
+        except Exception as e:
+            logger.error(f"Failed to release change stream leases: {e}")
+    _tailers.clear()
+
+
+def pipeline_status() -> Dict[str, Any]:
+    return {
+        "enabled": bool(_tailers),
+        "worker_id": WORKER_ID,
+        "inline_derived_updates": settings.DERIVED_UPDATES_INLINE,
+        "streams": {
+            stream: {"leader": tailer.leader, "processed": tailer.processed, "last_batch_at": tailer.last_batch_at}
+            for stream, tailer in _tailers.items()
+        },
+    }
+
+
+# --- Derived data consumers (active when DERIVED_UPDATES_INLINE is off) ---
+
+# Recording fields the stats document and the coverage counts are derived from
+STATS_FIELDS = frozenset({
+    "speaker_dialect", "speaker_gender", "speaker_age_range", "prompt_id",
+    "transcription_status", "recording_duration", "size_bytes", "deleted_at",
+})
+COVERAGE_FIELDS = frozenset({"speaker_id", "prompt_id", "deleted_at"})
+
+
+def _changed_fields(event: Dict[str, Any]) -> Set[str]:
+    description = event.get("updateDescription") or {}
+    fields = [*description.get("updatedFields", {}), *description.get("removedFields", [])]
+    return {field.split(".", 1)[0] for field in fields}
+
+
+def _apply_update(before: Dict[str, Any], event: Dict[str, Any]) -> Dict[str, Any]:
+    """The document right after this update event, built from its pre-image."""
+    description = event.get("updateDescription") or {}
+    after = {**before, **{key: value for key, value in description.get("updatedFields", {}).items() if "." not in key}}
+    for field in description.get("removedFields", []):
+        after.pop(field, None)
+    return after
+
+
+class _StatsConsumer:
+    """
+    Keeps the dataset stats document current from recording and speaker events:
+    each batch becomes one $inc. Updates and deletes without a pre-image (older
+    servers) fall back to a full recompute, at most every EVENT_STATS_RECOMPUTE_MIN_SECONDS.
+    """
+
+    def __init__(self):
+        self._recompute_task: Optional[asyncio.Task] = None
+        self._last_recompute = float("-inf")
+
+    async def recordings(self, events: List[Dict[str, Any]]) -> None:
+        if settings.DERIVED_UPDATES_INLINE:
+            return
+        changes: List[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]] = []
+        needs_recompute = False
+        for event in events:
+            operation = event["operationType"]
+            before = event.get("fullDocumentBeforeChange")
+            if operation == "insert":
+                changes.append((None, event.get("fullDocument")))
+            elif operation == "update":
+                if not _changed_fields(event) & STATS_FIELDS:
+                    continue  # e.g. transcription leases, search fields
+                if before is None:
+                    needs_recompute = True
+                else:
+                    changes.append((before, _apply_update(before, event)))
+            elif operation in ("replace", "delete") and before is not None:
+                changes.append((before, event.get("fullDocument")))
+            else:
+                needs_recompute = True  # No pre-image, or drop / rename / invalidate
+        if changes:
+            await stats.record_document_changes(get_stats_collection(), changes)
+        if needs_recompute:
+            self._schedule_recompute()
+
+    async def speakers(self, events: List[Dict[str, Any]]) -> None:
+        if settings.DERIVED_UPDATES_INLINE:
+            return
+        delta = sum(1 if event["operationType"] == "insert" else -1 for event in events if event["operationType"] in ("insert", "delete"))
+        if delta:
+            await stats.record_document_changes(get_stats_collection(), [], speaker_delta=delta)
+
+    async def resync(self) -> None:
+        if settings.DERIVED_UPDATES_INLINE:
+            return
+        self._last_recompute = time.monotonic()
+        await stats.recompute_stats(get_stats_collection(), get_recordings_collection(), get_speakers_collection())
+
+    def _schedule_recompute(self) -> None:
+        if self._recompute_task is not None and not self._recompute_task.done():
+            return  # One is already pending and will see these changes
+
+        async def recompute_later():
+            await asyncio.sleep(max(0.0, self._last_recompute + settings.EVENT_STATS_RECOMPUTE_MIN_SECONDS - time.monotonic()))
+            await self.resync()
+
+        self._recompute_task = _spawn(recompute_later())
+
+
+async def _coverage_recordings(events: List[Dict[str, Any]]) -> None:
+    """Counts first takes of inserted recordings; any other change to who recorded what drops the counts."""
+    if settings.DERIVED_UPDATES_INLINE:
+        return
+    rec_collection = get_recordings_collection()
+    invalidate = False
+    for event in events:
+        operation = event["operationType"]
+        if operation == "insert":
+            doc = event.get("fullDocument") or {}
+            if doc.get("deleted_at") is None:
+                await coverage.note_recording(rec_collection, doc.get("speaker_id"), doc.get("prompt_id"), from_events=True)
+        elif operation != "update" or _changed_fields(event) & COVERAGE_FIELDS:
+            invalidate = True
+    if invalidate:
+        await coverage.coverage_cache.invalidate()
+
+
+async def _coverage_resync() -> None:
+    if not settings.DERIVED_UPDATES_INLINE:
+        await coverage.coverage_cache.invalidate()
+
+
+_stats_consumer = _StatsConsumer()
+register_consumer(RECORDINGS, "stats", _stats_consumer.recordings, _stats_consumer.resync)
+register_consumer(SPEAKERS, "stats", _stats_consumer.speakers, _stats_consumer.resync)
+register_consumer(RECORDINGS, "coverage", _coverage_recordings, _coverage_resync)
@@ -0,0 +1,100 @@
+# app/insert_batcher.py
+import asyncio
+import logging
+from typing import Any, Dict, List, Set, Tuple
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo.errors import BulkWriteError, DuplicateKeyError, WriteConcernError, WriteError
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+
+_Pending = Tuple[Dict[str, Any], asyncio.Future]
+
+
+def _write_error(error: Dict[str, Any]) -> WriteError:
+    """The exception insert_one would have raised for this document."""
+    error_class = DuplicateKeyError if error.get("code") == DUPLICATE_KEY else WriteError
+    return error_class(error.get("errmsg", "Write error"), error.get("code"), error)
+
+
+class InsertBatcher:
+    """
+    Coalesces insert_one calls from concurrent requests into insert_many batches
+    per collection. A document waits at most `max_delay_ms` for others to join,
+    or until `max_batch` are queued. Each caller still gets its own _id (set
+    before queueing, as pymongo does for insert_one) or its own exception: the
+    batch is unordered, so one failed document does not fail the others.
+    """
+
+    def __init__(self, max_batch: int, max_delay_ms: float):
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max_delay_ms / 1000
+        # Collection full name -> (collection, queued documents)
+        self._pending: Dict[str, Tuple[AsyncIOMotorCollection, List[_Pending]]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._flushes: Set[asyncio.Future] = set()
+
+    async def insert(self, collection: AsyncIOMotorCollection, document: Dict[str, Any]) -> ObjectId:
+        document.setdefault("_id", ObjectId())
+        future = asyncio.get_running_loop().create_future()
+        key = collection.full_name
+        _, queued = self._pending.setdefault(key, (collection, []))
+        queued.append((document, future))
+        if len(queued) >= self.max_batch:
+            self._flush_soon(key)
+        elif key not in self._timers:
+            self._timers[key] = asyncio.get_running_loop().call_later(self.max_delay, self._flush_soon, key)
+        # Shielded: the insert goes ahead even if the request is cancelled meanwhile
+        return await asyncio.shield(future)
+
+    def _flush_soon(self, key: str) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        pending = self._pending.pop(key, None)
+        if pending:
+            task = asyncio.ensure_future(self._write(*pending))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _write(self, collection: AsyncIOMotorCollection, batch: List[_Pending]) -> None:
+        errors: Dict[int, Exception] = {}
+        try:
+            await collection.insert_many([document for document, _ in batch], ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                errors[error["index"]] = _write_error(error)
+            concern_errors = e.details.get("writeConcernErrors", [])
+            if concern_errors:
+                concern = WriteConcernError(concern_errors[0].get("errmsg", "Write concern error"), concern_errors[0].get("code"), concern_errors[0])
+                for index in range(len(batch)):
+                    errors.setdefault(index, concern)
+        except Exception as e:
+            errors = {index: e for index in range(len(batch))}
+        if len(batch) > 1:
+            logger.debug(f"Inserted a batch of {len(batch) - len(errors)}/{len(batch)} documents into {collection.full_name}.")
+        for index, (document, future) in enumerate(batch):
+            if future.done():
+                continue
+            if index in errors:
+                future.set_exception(errors[index])
+            else:
+                future.set_result(document["_id"])
+
+    async def flush(self) -> None:
+        """Writes everything queued now and waits for writes in progress (called at shutdown)."""
+        for key in list(self._pending):
+            self._flush_soon(key)
+        if self._flushes:
+            await asyncio.gather(*list(self._flushes), return_exceptions=True)
+
+
+recording_inserts = InsertBatcher(
+    max_batch=settings.RECORDING_INSERT_BATCH_SIZE,
+    max_delay_ms=settings.RECORDING_INSERT_BATCH_DELAY_MS
+)
@@ -0,0 +1,223 @@
+# app/jobs.py
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from bson import ObjectId, errors
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ReturnDocument
+import pytz
+
+from .config import settings
+from .crud import _convert_objectid_to_str
+from .models import JobDocument
+
+logger = logging.getLogger(__name__)
+
+try:
+    ghana_tz = pytz.timezone('Africa/Accra')
+except pytz.UnknownTimeZoneError:
+    ghana_tz = pytz.utc
+
+# pending -> running -> completed | failed | cancelled | interrupted (shutdown);
+# failed and interrupted jobs can be resumed from their saved progress, and so can
+# running jobs whose heartbeat (updated_at) is older than JOB_HEARTBEAT_TIMEOUT_SECONDS:
+# their process was killed without reaching the shutdown handler.
+RESUMABLE_STATUSES = ("pending", "failed", "interrupted")
+
+JobRunner = Callable[[AsyncIOMotorCollection, Dict[str, Any]], Awaitable[None]]
+
+# Job type -> coroutine doing the work; registered by the modules implementing each job
+JOB_RUNNERS: Dict[str, JobRunner] = {}
+
+# Jobs running in this process, by job id
+_running: Dict[str, asyncio.Task] = {}
+
+
+class JobCancelled(Exception):
+    """Raised inside a runner when a cancel was requested between two units of work."""
+
+
+def register_job_type(job_type: str, runner: JobRunner) -> None:
+    JOB_RUNNERS[job_type] = runner
+
+
+def _parse_job_id(job_id: str) -> ObjectId:
+    try:
+        return ObjectId(job_id)
+    except errors.InvalidId:
+        raise ValueError(f"Invalid job ID format: {job_id}")
+
+
+def _to_model(doc: Optional[Dict[str, Any]]) -> Optional[JobDocument]:
+    return JobDocument(**_convert_objectid_to_str(doc)) if doc else None
+
+
+async def create_job(jobs_collection: AsyncIOMotorCollection, job_type: str, params: Dict[str, Any]) -> JobDocument:
+    if job_type not in JOB_RUNNERS:
+        raise ValueError(f"Unknown job type: {job_type}")
+    now = datetime.now(ghana_tz)
+    doc = {
+        "type": job_type,
+        "status": "pending",
+        "params": params,
+        "progress": {},
+        "error": None,
+        "cancel_requested": False,
+        "created_at": now,
+        "updated_at": now,
+    }
+    result = await jobs_collection.insert_one(doc)
+    doc["_id"] = result.inserted_id
+    logger.info(f"Created {job_type} job {result.inserted_id}.")
+    return _to_model(doc)
+
+
+async def get_job(jobs_collection: AsyncIOMotorCollection, job_id: str) -> Optional[JobDocument]:
+    return _to_model(await jobs_collection.find_one({"_id": _parse_job_id(job_id)}))
+
+
+async def list_jobs(
+    jobs_collection: AsyncIOMotorCollection,
+    job_type: Optional[str] = None,
+    limit: int = 50
+) -> List[JobDocument]:
+    query = {"type": job_type} if job_type else {}
+    docs = await jobs_collection.find(query).sort("_id", -1).limit(limit).to_list(length=limit)
+    return [_to_model(doc) for doc in docs]
+
+
+async def update_progress(
+    jobs_collection: AsyncIOMotorCollection,
+    job_id: ObjectId,
+    progress: Dict[str, Any],
+    push: Optional[Dict[str, Any]] = None
+) -> None:
+    """
+    Saves progress fields (as progress.<name>) after a unit of work is durable,
+    and raises JobCancelled if a cancel was requested meanwhile.
+    """
+    update: Dict[str, Any] = {"$set": {
+        **{f"progress.{key}": value for key, value in progress.items()},
+        "updated_at": datetime.now(ghana_tz),
+    }}
+    if push:
+        update["$push"] = {f"progress.{key}": value for key, value in push.items()}
+    doc = await jobs_collection.find_one_and_update(
+        {"_id": job_id}, update, projection={"cancel_requested": 1}, return_document=ReturnDocument.AFTER
+    )
+    if doc and doc.get("cancel_requested"):
+        raise JobCancelled()
+
+
+def _resumable(now: datetime) -> Dict[str, Any]:
+    """Filter for jobs that may be (re)started: resumable statuses, or running with a stale heartbeat."""
+    stale = now - timedelta(seconds=settings.JOB_HEARTBEAT_TIMEOUT_SECONDS)
+    return {"$or": [
+        {"status": {"$in": list(RESUMABLE_STATUSES)}},
+        {"status": "running", "updated_at": {"$lt": stale}},
+    ]}
+
+
+async def _finish(jobs_collection: AsyncIOMotorCollection, job_id: ObjectId, run_id: str, status: str, error: Optional[str] = None) -> None:
+    now = datetime.now(ghana_tz)
+    result = await jobs_collection.update_one(
+        {"_id": job_id, "run_id": run_id, "status": "running"},  # Not if another worker took the job over or cancelled it meanwhile
+        {"$set": {"status": status, "error": error, "updated_at": now, "finished_at": now}}
+    )
+    if result.matched_count:
+        logger.info(f"Job {job_id} finished with status {status}.")
+
+
+async def _heartbeat(jobs_collection: AsyncIOMotorCollection, job_id: ObjectId, run_id: str, runner: asyncio.Task) -> None:
+    """
+    Refreshes updated_at while the job runs, so a long unit of work is not taken
+    for a dead process. Stops the runner if another worker claimed the job
+    after this one missed its heartbeats.
+    """
+    while True:
+        await asyncio.sleep(settings.JOB_HEARTBEAT_SECONDS)
+        try:
+            result = await jobs_collection.update_one(
+                {"_id": job_id, "run_id": run_id, "status": "running"},
+                {"$set": {"updated_at": datetime.now(ghana_tz)}}
+            )
+        except Exception as e:
+            logger.warning(f"Heartbeat for job {job_id} failed: {e}")
+            continue
+        if not result.matched_count:
+            logger.warning(f"Job {job_id} is no longer held by this run; stopping it.")
+            runner.cancel()
+            return
+
+
+async def _run(jobs_collection: AsyncIOMotorCollection, job: Dict[str, Any]) -> None:
+    job_id, run_id = job["_id"], job["run_id"]
+    heartbeat = asyncio.create_task(_heartbeat(jobs_collection, job_id, run_id, asyncio.current_task()))
+    try:
+        await JOB_RUNNERS[job["type"]](jobs_collection, job)
+        await _finish(jobs_collection, job_id, run_id, "completed")
+    except JobCancelled:
+        await _finish(jobs_collection, job_id, run_id, "cancelled")
+    except asyncio.CancelledError:
+        # Shutdown: leave progress in place so the job can be resumed
+        await asyncio.shield(_finish(jobs_collection, job_id, run_id, "interrupted"))
+        raise
+    except Exception as e:
+        logger.exception(f"Job {job_id} failed.")
+        await _finish(jobs_collection, job_id, run_id, "failed", str(e))
+    finally:
+        heartbeat.cancel()
+        if _running.get(str(job_id)) is asyncio.current_task():
+            del _running[str(job_id)]
+
+
+async def start_job(jobs_collection: AsyncIOMotorCollection, job_id: str) -> Optional[JobDocument]:
+    """
+    Starts (or resumes) a job in this process. The status transition is atomic,
+    so the same job is never run twice concurrently; a running job is claimed
+    only once its heartbeat has stopped. Returns None if the job is missing or
+    not in a resumable state.
+    """
+    now = datetime.now(ghana_tz)
+    job = await jobs_collection.find_one_and_update(
+        {"_id": _parse_job_id(job_id), **_resumable(now)},
+        {"$set": {
+            "status": "running", "run_id": uuid.uuid4().hex, "error": None, "cancel_requested": False,
+            "updated_at": now, "started_at": now,
+        }},
+        return_document=ReturnDocument.AFTER
+    )
+    if not job:
+        return None
+    _running[job_id] = asyncio.create_task(_run(jobs_collection, job))
+    return _to_model(job)
+
+
+async def request_cancel(jobs_collection: AsyncIOMotorCollection, job_id: str) -> Optional[JobDocument]:
+    """
+    Asks a running job to stop after its current unit of work; pending jobs, and
+    running jobs whose process died, are cancelled at once.
+    """
+    obj_id = _parse_job_id(job_id)
+    now = datetime.now(ghana_tz)
+    await jobs_collection.update_one(
+        {"_id": obj_id, **_resumable(now)},
+        {"$set": {"status": "cancelled", "updated_at": now, "finished_at": now}}
+    )
+    doc = await jobs_collection.find_one_and_update(
+        {"_id": obj_id},
+        {"$set": {"cancel_requested": True, "updated_at": now}},
+        return_document=ReturnDocument.AFTER
+    )
+    return _to_model(doc)
+
+
+async def shutdown_jobs() -> None:
+    """Cancels jobs running in this process; they are marked interrupted and can be resumed."""
+    tasks = list(_running.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,82 @@
+# app/lifecycle.py
+import asyncio
+import logging
+import os
+import signal
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class ShuttingDown(Exception):
+    """Raised for new work once the worker has started draining."""
+
+
+class InFlightTracker:
+    """
+    Counts operations in progress (e.g. uploads to R2 and their database writes)
+    so shutdown can wait for them to finish before clients are closed. Once
+    draining starts, new operations are refused with ShuttingDown; the server
+    answers those with 503 and the client retries against another worker.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.draining = False
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @asynccontextmanager
+    async def track(self):
+        if self.draining:
+            raise ShuttingDown(f"Server is shutting down; retry the {self.name}.")
+        self.count += 1
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self.count -= 1
+            if self.count == 0:
+                self._idle.set()
+
+    async def drain(self, timeout: float) -> bool:
+        """Stops accepting new operations and waits up to `timeout` seconds for running ones."""
+        self.draining = True
+        if self.count:
+            logger.info(f"Waiting for {self.count} in-flight {self.name}(s) to finish...")
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(f"{self.count} {self.name}(s) still running after {timeout}s; shutting down anyway.")
+            return False
+
+
+uploads = InFlightTracker("upload")
+
+
+def install_sigterm_hook() -> None:
+    """
+    Marks the upload tracker as draining as soon as SIGTERM arrives, then hands
+    the signal to the server's own handler (uvicorn / gunicorn worker), which
+    stops accepting connections and waits for running requests. Call from the
+    lifespan start-up, after the server has installed its handlers.
+    """
+    try:
+        previous = signal.getsignal(signal.SIGTERM)
+    except ValueError:
+        return  # Not the main thread (e.g. some test runners): nothing to chain to
+
+    def handler(signum, frame):
+        uploads.draining = True
+        if callable(previous):
+            previous(signum, frame)
+        elif previous != signal.SIG_IGN:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            os.kill(os.getpid(), signal.SIGTERM)
+
+    try:
+        signal.signal(signal.SIGTERM, handler)
+    except ValueError:
+        pass
@@ -1,66 +1,157 @@
 # app/main.py
 from datetime import datetime
+import asyncio
 import logging
 from fastapi import (
     Body, FastAPI, File, UploadFile, Depends, HTTPException, Form, status, Query,
-    Path # Import Path for path parameters
+    Header, Path # Import Path for path parameters
 )
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from botocore.exceptions import ClientError
 from bson import ObjectId, errors # Import errors
 # --- Make sure Pydantic's ValidationError is imported ---
 from pydantic import ValidationError
 
 import io
-import pandas as pd
+from contextlib import asynccontextmanager
 from typing import Optional, List
 
 from .config import settings
-from .database import connect_to_mongo, close_mongo_connection, get_recordings_collection, get_speakers_collection
-from .r2 import delete_multiple_files_from_r2, upload_file_to_r2, get_r2_public_url, delete_file_from_r2
+from .database import connect_to_mongo, close_mongo_connection, ensure_indexes, get_recordings_collection, get_speakers_collection, get_stats_collection, get_revisions_collection, get_jobs_collection
+from .r2 import delete_multiple_files_from_r2, upload_file_to_r2, get_r2_public_url, delete_file_from_r2, get_s3_client, r2_cache
 # Import new/updated models and crud functions
 from .models import (
-    AudioMetadataForm, RecordingDocument, RecordingProgress,SpeakerDocument, UploadResponse, TranscriptionInput, DeleteSummaryResponse, DeleteConfirmationResponse
+    AudioMetadataForm, RecordingDocument, RecordingProgress,SpeakerDocument, UploadResponse, TranscriptionInput, DeleteSummaryResponse, DeleteConfirmationResponse,
+    DatasetStats, PromptCoverageResponse, SpeakerMissingPrompts,
+    QueueClaimRequest, QueueClaimResponse, QueueLeaseRequest,
+    BulkTranscriptionRequest, BulkTranscriptionResponse, TranscriptionHistoryResponse,
+    RecordingSearchResponse, RecordingFilter, SessionSummary, SpeakerSessionsResponse,
+    JobDocument, WebDatasetExportRequest, R2ReconcileRequest,
+    RecordingDeletionResponse, RecordingDeletionSummary, RestoreResponse
 )
 from .crud import (
     check_recording_completion, create_recording_entry, get_recordings_basic as get_recordings,
     get_all_recordings_for_export, update_transcription,
     get_spontaneous_recordings, get_or_create_speaker,
    get_speaker_by_code, get_all_speakers, get_all_speakers_for_export, # <-- Import new speaker CRUD functions,
-   delete_all_speakers_from_db
+   delete_all_speakers_from_db, backfill_current_flags, purge_superseded_recordings, run_supersede_repair,
+   get_transcription_history, get_recording_audio_source, search_recordings, backfill_search_fields, resync_speaker_snapshots,
+   drain_background_writes, TranscriptionConflictError
 )
+from . import stats, coverage, transcription_queue, bulk_transcriptions, sessions, jobs, webdataset_export, playback, lifecycle, admission, upload_guard, reconcile, speaker_deletion, tombstones, events
+from .query_guard import UnindexedQueryError, query_guard
+from .insert_batcher import recording_inserts
+from .catalog import load_catalog, get_catalog
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# --- FastAPI App Initialization ---
-app = FastAPI(
-    title="Twi Speech Data Collection API",
-    description="API for uploading Twi audio recordings and metadata.",
-    version="1.0.0"
-)
+# Background tasks started at startup and cancelled at shutdown
+background_tasks: List[asyncio.Task] = []
 
-# --- Event Handlers for DB Connection ---
-@app.on_event("startup")
-async def startup_db_client():
+# --- Startup / Shutdown ---
+
+async def _warm_up() -> None:
+    """Index checks and one-off backfills run once the database is connected."""
+    try:
+        await ensure_indexes()
+        query_guard.clear()  # Verdicts cached before the indexes existed are stale
+    except Exception as e:
+        logger.error(f"Failed to ensure MongoDB indexes on startup: {e}")
+    try:
+        # Documents written before re-take tracking need their is_current flag set once
+        rec_collection = get_recordings_collection()
+        if await rec_collection.find_one({"is_current": {"$exists": False}}, {"_id": 1}):
+            await backfill_current_flags(rec_collection)
+    except Exception as e:
+        logger.error(f"Failed to backfill is_current flags on startup: {e}")
+    try:
+        # Search fields for pre-existing documents are filled in the background
+        rec_collection = get_recordings_collection()
+        if await rec_collection.find_one({"search_prompt": {"$exists": False}}, {"_id": 1}):
+            background_tasks.append(asyncio.create_task(backfill_search_fields(rec_collection)))
+    except Exception as e:
+        logger.error(f"Failed to start search field backfill on startup: {e}")
+    try:
+        # Speaker demographics are denormalized onto recordings for filtering
+        rec_collection = get_recordings_collection()
+        if await rec_collection.find_one({"speaker_dialect": {"$exists": False}}, {"_id": 1}):
+            background_tasks.append(asyncio.create_task(resync_speaker_snapshots(rec_collection, get_speakers_collection())))
+    except Exception as e:
+        logger.error(f"Failed to start speaker snapshot backfill on startup: {e}")
+    background_tasks.append(asyncio.create_task(transcription_queue.run_lease_reaper(get_recordings_collection)))
+    if settings.SUPERSEDE_REPAIR_INTERVAL_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(run_supersede_repair(get_recordings_collection)))
+    if settings.TOMBSTONE_PURGE_INTERVAL_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(tombstones.run_purger(get_recordings_collection, get_revisions_collection)))
+    if settings.EVENT_PIPELINE_ENABLED:
+        try:
+            await events.start_pipeline()
+        except Exception as e:
+            logger.error(f"Failed to start the change-stream event pipeline: {e}")
+    elif not settings.DERIVED_UPDATES_INLINE:
+        logger.error("DERIVED_UPDATES_INLINE is off but EVENT_PIPELINE_ENABLED is not set: stats and coverage will not be updated.")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Creates the process's clients before the first request and releases them at
+    shutdown. Start-up problems are logged rather than raised, so the API still
+    comes up (endpoints needing a missing resource answer 503/500).
+    """
+    try:
+        load_catalog()
+    except Exception as e:
+        logger.error(f"Failed to load prompt catalog on startup: {e}")
+    try:
+        # Built here rather than at import so a missing credential is reported once, clearly
+        get_s3_client()
+    except Exception as e:
+        logger.error(f"R2 storage client unavailable, uploads and playback will fail: {e}")
     try:
         await connect_to_mongo()
+        await _warm_up()
     except Exception as e:
         logger.critical(f"FATAL: Could not connect to MongoDB on startup: {e}")
-        import sys
-        # sys.exit("MongoDB connection failed on startup.") # Keep commented out for now if preferred
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
+    lifecycle.install_sigterm_hook()
+
+    yield
+
+    # Uploads still running get to finish their R2 write and database insert
+    await lifecycle.uploads.drain(settings.SHUTDOWN_DRAIN_SECONDS)
+    await recording_inserts.flush()
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+    await events.stop_pipeline()
+    await jobs.shutdown_jobs()
+    await drain_background_writes()
     await close_mongo_connection()
 
+# --- FastAPI App Initialization ---
+app = FastAPI(
+    title="Twi Speech Data Collection API",
+    description="API for uploading Twi audio recordings and metadata.",
+    version="1.0.0",
+    lifespan=lifespan
+)
+
 # --- CORS Middleware ---
 # Ensure allowed_origins is correctly fetched
 # origins = settings.allowed_origins # Get the list from settings
 # logger.info(f"Configuring CORS with origins: {origins}")
 
+# Added before CORS so CORS wraps them and 413/415/429/503 answers still carry CORS headers.
+# The size/type guard is outermost, so a Content-Length over the limit is refused before
+# admission. The streaming 413 and the magic-byte 415 fire while the body is read, which
+# happens after admission: chunked or mislabelled uploads hold a slot until then.
+app.add_middleware(admission.UploadAdmissionMiddleware)
+app.add_middleware(upload_guard.UploadGuardMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.allowed_origins, # Use the property that returns the list
@@ -69,6 +160,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(lifecycle.ShuttingDown)
+async def shutting_down_handler(request, exc: lifecycle.ShuttingDown):
+    # Another worker (or this one after restart) will take the retry
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "5"})
+
+@app.exception_handler(admission.RateLimited)
+async def rate_limited_handler(request, exc: admission.RateLimited):
+    return JSONResponse(status_code=429, content={"detail": str(exc)}, headers={"Retry-After": str(exc.retry_after)})
+
+async def track_upload():
+    """Counts the request as an in-flight upload so shutdown waits for it (refused once draining)."""
+    async with lifecycle.uploads.track():
+        yield
+
 # --- Dependency for DB Collection ---
 def get_collection():
     # Add error handling in case DB is not connected
@@ -88,11 +193,141 @@ def get_spk_collection():
         logger.error(f"Database connection error for speakers: {e}")
         raise HTTPException(status_code=503, detail="DB connection error")
 
+def get_stats_coll():
+    try:
+        return get_stats_collection()
+    except RuntimeError as e:
+        logger.error(f"Database connection error for stats: {e}")
+        raise HTTPException(status_code=503, detail="DB connection error")
+
+def get_revisions_coll():
+    try:
+        return get_revisions_collection()
+    except RuntimeError as e:
+        logger.error(f"Database connection error for transcription revisions: {e}")
+        raise HTTPException(status_code=503, detail="DB connection error")
+
+def get_jobs_coll():
+    try:
+        return get_jobs_collection()
+    except RuntimeError as e:
+        logger.error(f"Database connection error for jobs: {e}")
+        raise HTTPException(status_code=503, detail="DB connection error")
+
+def profiled_dependency(getter, profile: str):
+    """Builds a dependency returning a collection with an operation profile (see database.py)."""
+    def dependency():
+        try:
+            return getter(profile)
+        except RuntimeError as e:
+            logger.error(f"Database connection error ({profile} profile): {e}")
+            raise HTTPException(status_code=503, detail="DB connection error")
+    return dependency
+
+# Uploads and transcription writes: primary, MONGO_INGEST_WRITE_CONCERN
+get_ingest_collection = profiled_dependency(get_recordings_collection, "ingest")
+get_ingest_spk_collection = profiled_dependency(get_speakers_collection, "ingest")
+get_ingest_stats_coll = profiled_dependency(get_stats_collection, "ingest")
+# Exports, statistics and coverage: MONGO_ANALYTICS_READ_PREFERENCE
+get_analytics_collection = profiled_dependency(get_recordings_collection, "analytics")
+get_analytics_spk_collection = profiled_dependency(get_speakers_collection, "analytics")
+get_analytics_stats_coll = profiled_dependency(get_stats_collection, "analytics")
+
 # --- API Endpoints ---
 @app.get("/", summary="Health Check", tags=["General"])
 async def read_root():
     return {"status": "ok", "message": "Welcome to the Twi Speech Data Collection API!"}
 
+# --- Stats Endpoints ---
+
+@app.get(
+    "/stats",
+    response_model=DatasetStats,
+    summary="Get Dataset Statistics",
+    tags=["Stats"]
+)
+async def get_dataset_stats(
+    stats_collection = Depends(get_analytics_stats_coll),
+    rec_collection = Depends(get_analytics_collection),
+    spk_collection = Depends(get_analytics_spk_collection)
+):
+    """
+    Returns precomputed dataset totals (by dialect, gender, age range, prompt section
+    and transcription status, plus hours of audio). Served from a single stats document
+    that is updated incrementally on upload, transcription update and delete.
+    """
+    try:
+        return await stats.get_stats(stats_collection, rec_collection, spk_collection)
+    except Exception as e:
+        logger.exception("Failed to retrieve dataset stats.")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to retrieve dataset stats.")
+
+@app.post(
+    "/stats/recompute",
+    response_model=DatasetStats,
+    summary="Recompute Dataset Statistics",
+    tags=["Administration"]
+)
+async def recompute_dataset_stats(
+    stats_collection = Depends(get_stats_coll),
+    rec_collection = Depends(get_analytics_collection),
+    spk_collection = Depends(get_analytics_spk_collection)
+):
+    """Rebuilds the stats document with a full aggregation over the raw collections (repair)."""
+    try:
+        return await stats.recompute_stats(stats_collection, rec_collection, spk_collection)
+    except Exception as e:
+        logger.exception("Failed to recompute dataset stats.")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to recompute dataset stats.")
+
+@app.get(
+    "/stats/r2-cache",
+    summary="Get R2 Read Cache Metrics",
+    tags=["Administration"]
+)
+async def get_r2_cache_stats():
+    """Hit rate, bytes saved (served from disk instead of R2), evictions and current size of the local audio cache."""
+    return r2_cache.stats()
+
+@app.get(
+    "/stats/uploads/admission",
+    summary="Get Upload Admission Metrics",
+    tags=["Administration"]
+)
+async def get_upload_admission_stats():
+    """Uploads in flight and queued in this worker, and how many were refused (overload, IP or participant rate)."""
+    return admission.admission_stats()
+
+@app.get(
+    "/stats/events",
+    summary="Get Change-Stream Pipeline Status",
+    tags=["Administration"]
+)
+async def get_event_pipeline_status():
+    """Whether this worker tails each change stream (holds its lease) and how many events it has processed."""
+    return events.pipeline_status()
+
+# --- Prompt Coverage Endpoints ---
+
+@app.get(
+    "/prompts/coverage",
+    response_model=PromptCoverageResponse,
+    summary="Get Prompt Coverage Across Speakers",
+    tags=["Prompts"]
+)
+async def get_prompts_coverage(
+    section_id: Optional[str] = Query(None, description="Only include prompts from this script section"),
+    max_speakers: Optional[int] = Query(None, ge=0, description="Only include prompts recorded by at most this many speakers"),
+    rec_collection = Depends(get_analytics_collection),
+    spk_collection = Depends(get_analytics_spk_collection)
+):
+    """Returns, for each prompt in the script, how many distinct speakers have recorded it."""
+    try:
+        return await coverage.get_prompt_coverage(rec_collection, spk_collection, section_id=section_id, max_speakers=max_speakers)
+    except Exception as e:
+        logger.exception("Failed to compute prompt coverage.")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to compute prompt coverage.")
+
 # --- Speaker Endpoints ---
 
 @app.get(
@@ -151,10 +386,11 @@ async def list_all_speakers(
     response_class=StreamingResponse
 )
 async def export_speakers_to_excel(
-    collection = Depends(get_spk_collection),    # Speaker collection
-    rec_collection = Depends(get_collection)      # <-- ADD Recording collection dependency
+    collection = Depends(get_analytics_spk_collection),    # Speaker collection
+    rec_collection = Depends(get_analytics_collection)      # <-- ADD Recording collection dependency
 ):
     """Retrieves all speaker details, including recording progress, and exports them into an Excel (.xlsx) file."""
+    import pandas as pd  # Imported on first export, not at start-up (pandas/openpyxl are slow to load)
     try:
         logger.info("Fetching all speaker data for Excel export...")
         # Pass both collections to the updated CRUD function
@@ -198,6 +434,79 @@ async def export_speakers_to_excel(
         logger.exception("Failed to generate speaker Excel export.")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to generate speaker Excel export.")
 
+@app.get(
+    "/speakers/{participant_code}/missing-prompts",
+    response_model=SpeakerMissingPrompts,
+    summary="List Prompts a Speaker Has Not Recorded",
+    tags=["Speakers", "Prompts"],
+    responses={404: {"description": "Speaker not found"}}
+)
+async def get_speaker_missing_prompts(
+    participant_code: str = Path(..., description="The unique code of the participant (e.g., TWI_Speaker_001)"),
+    spk_collection = Depends(get_spk_collection),
+    rec_collection = Depends(get_collection)
+):
+    """Returns the script prompts this speaker still has to record, in script order."""
+    try:
+        speaker = await get_speaker_by_code(spk_collection, participant_code)
+        if speaker is None or not speaker.id:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Speaker not found")
+        return await coverage.get_missing_prompts(rec_collection, participant_code, ObjectId(speaker.id))
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        logger.exception(f"Failed to compute missing prompts for {participant_code}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to compute missing prompts.")
+
+@app.get(
+    "/speakers/{participant_code}/sessions",
+    response_model=SpeakerSessionsResponse,
+    summary="List a Speaker's Recording Sessions",
+    tags=["Speakers", "Sessions"],
+    responses={404: {"description": "Speaker not found"}}
+)
+async def get_speaker_sessions(
+    participant_code: str = Path(..., description="The unique code of the participant (e.g., TWI_Speaker_001)"),
+    spk_collection = Depends(get_spk_collection),
+    rec_collection = Depends(get_collection)
+):
+    """
+    Per-session recording counts, total duration, start/end time and completion for a speaker,
+    most recent session first. Lets the app resume a session without listing every recording.
+    """
+    try:
+        speaker = await get_speaker_by_code(spk_collection, participant_code)
+        if speaker is None or not speaker.id:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Speaker not found")
+        speaker_sessions = await sessions.get_speaker_sessions(rec_collection, ObjectId(speaker.id))
+        return SpeakerSessionsResponse(participant_code=participant_code, sessions=speaker_sessions)
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        logger.exception(f"Failed to summarize sessions for {participant_code}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to summarize sessions.")
+
+@app.get(
+    "/sessions/{session_id}",
+    response_model=SessionSummary,
+    summary="Get a Recording Session Summary",
+    tags=["Sessions"],
+    responses={404: {"description": "Session not found"}}
+)
+async def get_session_summary(
+    session_id: str = Path(..., description="The session ID sent with the uploads"),
+    rec_collection = Depends(get_collection)
+):
+    """Recording counts, total duration, start/end time and completion for one session."""
+    try:
+        summary = await sessions.get_session(rec_collection, session_id)
+    except Exception as e:
+        logger.exception(f"Failed to summarize session {session_id}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to summarize session.")
+    if summary is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
+    return summary
+
 # --- Recording Endpoints ---
 
 @app.delete(
@@ -213,11 +522,14 @@ async def export_speakers_to_excel(
 )
 async def delete_all_speakers(
     confirm: bool = Query(..., description="Must explicitly set to true to confirm deletion."),
-    collection = Depends(get_spk_collection) # Dependency for the speakers collection
+    collection = Depends(get_spk_collection), # Dependency for the speakers collection
+    rec_collection = Depends(get_collection),
+    stats_collection = Depends(get_stats_coll)
 ):
     """
     **EXTREME WARNING:** Deletes ALL speaker metadata from the database.
-    This action is irreversible and does NOT affect recordings or R2 files.
+    This action is irreversible and does NOT affect recordings or R2 files
+    (use `DELETE /speakers/all/cascade` for that).
     Requires `confirm=true` query parameter.
     """
     if not confirm:
@@ -231,6 +543,10 @@ async def delete_all_speakers(
     try:
         # Call the CRUD function to delete speakers
         deleted_count = await delete_all_speakers_from_db(collection)
+        try:
+            await stats.recompute_stats(stats_collection, rec_collection, collection)
+        except Exception as e:
+            logger.error(f"Failed to recompute dataset stats after speaker deletion: {e}")
 
         return DeleteConfirmationResponse(
             message=f"Successfully deleted {deleted_count} speaker documents from the database.",
@@ -245,6 +561,67 @@ async def delete_all_speakers(
             detail=f"An error occurred during speaker deletion: {e}"
         )
 
+@app.delete(
+    "/speakers/all/cascade",
+    response_model=JobDocument,
+    summary="Delete All Speakers with Their Recordings (USE WITH EXTREME CAUTION)",
+    tags=["Administration"],
+    status_code=status.HTTP_202_ACCEPTED,
+    responses={403: {"description": "Confirmation not provided"}}
+)
+async def delete_all_speakers_cascade(
+    confirm: bool = Query(..., description="Must explicitly set to true to confirm deletion."),
+    jobs_collection = Depends(get_jobs_coll)
+):
+    """
+    **EXTREME WARNING:** Deletes ALL speakers together with their recordings,
+    transcription history and R2 files, in batches as a background job; poll
+    `GET /jobs/{job_id}`. An interrupted job can be resumed. Irreversible.
+    """
+    if not confirm:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Deletion not confirmed. Add '?confirm=true' to the URL to proceed."
+        )
+    logger.warning("!!! Received request to delete ALL speakers with their recordings and R2 files !!!")
+    try:
+        job = await jobs.create_job(jobs_collection, speaker_deletion.JOB_TYPE, {"all": True})
+        return await jobs.start_job(jobs_collection, job.id)
+    except Exception as e:
+        logger.exception("Failed to start cascading speaker deletion.")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to start speaker deletion.")
+
+@app.delete(
+    "/speakers/{participant_code}",
+    response_model=JobDocument,
+    summary="Delete a Speaker with Their Recordings",
+    tags=["Speakers"],
+    status_code=status.HTTP_202_ACCEPTED,
+    responses={404: {"description": "Speaker not found"}}
+)
+async def delete_speaker(
+    participant_code: str = Path(..., description="The unique code of the participant (e.g., TWI_Speaker_001)"),
+    collection = Depends(get_spk_collection),
+    jobs_collection = Depends(get_jobs_coll)
+):
+    """
+    Deletes the speaker, their recordings, transcription history and R2 files as
+    a background job (batched, resumable); poll `GET /jobs/{job_id}`. A speaker
+    whose R2 files could not all be deleted is kept and listed in the job progress.
+    """
+    try:
+        speaker = await get_speaker_by_code(collection, participant_code)
+        if speaker is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Speaker not found")
+        logger.warning(f"Received request to delete speaker {participant_code} with their recordings.")
+        job = await jobs.create_job(jobs_collection, speaker_deletion.JOB_TYPE, {"participant_codes": [participant_code]})
+        return await jobs.start_job(jobs_collection, job.id)
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        logger.exception(f"Failed to start deletion of speaker {participant_code}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to start speaker deletion.")
+
 
 @app.post(
     "/upload/audio",
@@ -265,8 +642,10 @@ async def upload_audio_recording(
     gender: Optional[str] = Form(None),
     # --- End Speaker Details ---
     file: UploadFile = File(..., description="The audio file to upload."),
-    rec_collection = Depends(get_collection), # Recordings collection
-    spk_collection = Depends(get_spk_collection) # Speakers collection
+    rec_collection = Depends(get_ingest_collection), # Recordings collection
+    spk_collection = Depends(get_ingest_spk_collection), # Speakers collection
+    stats_collection = Depends(get_ingest_stats_coll),
+    _in_flight = Depends(track_upload)
 ):
     """Uploads audio, finds/creates speaker, saves recording linked to speaker."""
 
@@ -283,6 +662,13 @@ async def upload_audio_recording(
         raise HTTPException(status_code=422, detail=e.errors())
 
     logger.info(f"Upload request for participant: {participant_code}, prompt: {prompt_id}")
+    admission.participant_limiter.check(participant_code)
+
+    if prompt_id not in get_catalog():
+        if settings.REJECT_UNKNOWN_PROMPTS:
+            logger.error(f"Rejecting upload for unknown prompt_id: {prompt_id}")
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown prompt_id: {prompt_id}")
+        logger.warning(f"Upload for prompt_id not in the prompt catalog: {prompt_id}")
 
     file_content_type_lower: Optional[str] = None
     # File Content Type Check (Improved)
@@ -313,12 +699,14 @@ async def upload_audio_recording(
     try:
         logger.info("Step 2: Getting/Creating speaker...")
         # 2. Get or Create Speaker
-        speaker_model, _, speaker_id_obj = await get_or_create_speaker(
+        speaker_model, speaker_created, speaker_id_obj = await get_or_create_speaker(
                 collection=spk_collection,
                 participant_code=participant_code,
                 dialect=dialect,
                 age_range=age_range,
                 gender=gender,
+                rec_collection=rec_collection,
+                stats_collection=stats_collection,
         )
         if not speaker_id_obj:
             logger.error("Failed to get speaker ObjectId.")
@@ -344,6 +732,9 @@ async def upload_audio_recording(
         recording_doc_data = RecordingDocument(
             speaker_id=str(speaker_id_obj),
             participant_code=participant_code, # Denormalized
+            speaker_dialect=speaker_model.dialect,
+            speaker_gender=speaker_model.gender,
+            speaker_age_range=speaker_model.age_range,
             prompt_id=metadata_input.prompt_id,
             prompt_text=metadata_input.prompt_text,
             session_id=metadata_input.session_id,
@@ -361,6 +752,16 @@ async def upload_audio_recording(
         recording_db_id = await create_recording_entry(rec_collection, recording_doc_data)
         logger.info(f"Step 5 SUCCESS: Recording entry created: {recording_db_id}")
 
+        # Stats are derived data: a failure here must not fail the upload
+        try:
+            await stats.record_upload(stats_collection, recording_doc_data, speaker_model, speaker_created)
+        except Exception as e:
+            logger.error(f"Failed to update dataset stats for recording {recording_db_id}: {e}")
+        try:
+            await coverage.note_recording(rec_collection, speaker_id_obj, prompt_id)
+        except Exception as e:
+            logger.error(f"Failed to update prompt coverage for recording {recording_db_id}: {e}")
+
 
         logger.info("Step 5b: Checking recording completion...")
         progress_data: RecordingProgress = await check_recording_completion(
@@ -402,17 +803,94 @@ async def upload_audio_recording(
 async def list_recordings(
     skip: int = Query(0, ge=0, description="Number of records to skip for pagination"),
     limit: int = Query(50, ge=1, le=1000, description="Maximum number of records to return"),
-    participant_code: Optional[str] = Query(None, description="Filter recordings by participant code"), # Add filter param
+    include_superseded: bool = Query(False, description="Include earlier takes of re-recorded prompts"),
+    filters: RecordingFilter = Depends(),
     collection = Depends(get_collection)
 ):
-    """Retrieves a list of audio recording metadata entries, optionally filtered by participant."""
+    """
+    Retrieves a list of audio recording metadata entries, newest first. Any combination of
+    participant, transcription status, speaker dialect/gender/age range, session, prompt section,
+    upload date range and duration range can be given. Filters are served by planned
+    compound indexes; combinations that no index narrows are logged, or refused with 400 when
+    QUERY_INDEX_GUARD=reject.
+    """
     try:
-        recordings = await get_recordings(collection, skip=skip, limit=limit, participant_code=participant_code)
+        recordings = await get_recordings(collection, skip=skip, limit=limit, include_superseded=include_superseded, filters=filters)
         return recordings
+    except UnindexedQueryError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"{e} Narrow the filter or add an index.")
     except Exception as e:
         logger.exception("Failed to retrieve recordings.")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to retrieve recordings.")
 
+@app.get(
+    "/recordings/search",
+    response_model=RecordingSearchResponse,
+    summary="Search Recordings by Prompt or Transcription Text",
+    tags=["Data Collection"]
+)
+async def search_recordings_text(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to find; quote phrases, prefix - to exclude"),
+    page: int = Query(1, ge=1, le=500),
+    page_size: int = Query(20, ge=1, le=100),
+    transcription_only: bool = Query(False, description="Only return transcribed recordings"),
+    include_superseded: bool = Query(False, description="Include earlier takes of re-recorded prompts"),
+    collection = Depends(get_collection)
+):
+    """
+    Ranked full-text search over prompt text and transcriptions. Matching ignores case,
+    diacritics and the ɛ/ɔ vs e/o distinction, so `ɛyɛ` and `eye` find the same recordings.
+    """
+    try:
+        return await search_recordings(
+            collection, q, page=page, page_size=page_size,
+            transcription_only=transcription_only, include_superseded=include_superseded
+        )
+    except Exception as e:
+        logger.exception(f"Failed to search recordings for '{q}'.")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to search recordings.")
+
+@app.post(
+    "/recordings/search/backfill",
+    summary="Rebuild Search Fields",
+    tags=["Administration"]
+)
+async def backfill_recording_search_fields(collection = Depends(get_collection)):
+    """Computes normalized search fields for recordings that do not have them yet."""
+    try:
+        updated = await backfill_search_fields(collection)
+        return {"message": "Search fields backfilled", "updated_count": updated}
+    except Exception as e:
+        logger.exception("Failed to backfill search fields.")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to backfill search fields.")
+
+@app.post(
+    "/recordings/speaker-snapshots/resync",
+    summary="Resynchronize Speaker Demographics on Recordings",
+    tags=["Administration"]
+)
+async def resync_recording_speaker_snapshots(
+    only_missing: bool = Query(True, description="Only fill recordings that have no snapshot yet; false rewrites every stale snapshot"),
+    rec_collection = Depends(get_collection),
+    spk_collection = Depends(get_spk_collection),
+    stats_collection = Depends(get_stats_coll)
+):
+    """
+    Copies each speaker's dialect, gender and age range onto their recordings.
+    Speaker updates are propagated automatically; this repairs recordings left behind.
+    """
+    try:
+        updated = await resync_speaker_snapshots(rec_collection, spk_collection, only_missing=only_missing)
+        if updated:
+            try:
+                await stats.recompute_stats(stats_collection, rec_collection, spk_collection)
+            except Exception as e:
+                logger.error(f"Failed to recompute dataset stats after speaker snapshot resync: {e}")
+        return {"message": "Speaker snapshots synchronized", "updated_count": updated}
+    except Exception as e:
+        logger.exception("Failed to resync speaker snapshots.")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to resync speaker snapshots.")
+
 @app.get(
     "/recordings/export/excel",
     summary="Export Recordings Metadata to Excel",
@@ -420,13 +898,14 @@ async def list_recordings(
     response_class=StreamingResponse
 )
 async def export_recordings_to_excel(
-    rec_collection = Depends(get_collection),
-    spk_collection = Depends(get_spk_collection) # Add speaker collection dependency
+    include_superseded: bool = Query(False, description="Include earlier takes of re-recorded prompts"),
+    rec_collection = Depends(get_analytics_collection)
 ):
-    """Retrieves all recording metadata, merges speaker details, and exports to Excel."""
+    """Retrieves all recording metadata, with the speaker details stored on each recording, and exports to Excel."""
+    import pandas as pd  # Imported on first export, not at start-up
     try:
         logger.info("Fetching all recording data for Excel export...")
-        recordings_data = await get_all_recordings_for_export(rec_collection, spk_collection)
+        recordings_data = await get_all_recordings_for_export(rec_collection, include_superseded=include_superseded)
 
         if not recordings_data:
              df = pd.DataFrame() # Create empty dataframe if no data
@@ -466,6 +945,7 @@ async def export_recordings_to_excel(
 async def list_spontaneous_recordings(
     skip: int = Query(0, ge=0, description="Number of records to skip for pagination"),
     limit: int = Query(50, ge=1, le=1000, description="Maximum number of records to return"),
+    include_superseded: bool = Query(False, description="Include earlier takes of re-recorded prompts"),
     collection = Depends(get_collection)
 ):
     """
@@ -474,7 +954,7 @@ async def list_spontaneous_recordings(
     These are typically the recordings intended for user editing/transcription.
     """
     try:
-        recordings = await get_spontaneous_recordings(collection, skip=skip, limit=limit)
+        recordings = await get_spontaneous_recordings(collection, skip=skip, limit=limit, include_superseded=include_superseded)
         return recordings
     except Exception as e:
         logger.exception("Failed to retrieve spontaneous recordings.")
@@ -489,6 +969,7 @@ async def list_spontaneous_recordings(
     responses={
         404: {"description": "Recording not found"},
         400: {"description": "Invalid Recording ID format"},
+        409: {"description": "Recording is claimed by another transcriber, or was edited since expected_version"},
         422: {"description": "Validation Error (e.g., invalid transcription data)"} # Added 422
     }
 )
@@ -496,15 +977,23 @@ async def add_or_update_transcription(
     recording_id: str = Path(..., description="The unique ID of the recording to update"),
     transcription_input: TranscriptionInput = Body(...),
     *, # Ensure dependency is keyword-only
-    collection = Depends(get_collection)
+    collection = Depends(get_ingest_collection),
+    stats_collection = Depends(get_ingest_stats_coll),
+    revisions_collection = Depends(get_revisions_coll)
 ):
-    """Adds or updates the transcription text for a specific recording."""
+    """
+    Adds or updates the transcription text for a specific recording.
+    Send `expected_version` (the recording's `transcription_version` when editing began)
+    to get a 409 instead of overwriting someone else's newer edit.
+    """
     logger.info(f"Received transcription update request for recording ID: {recording_id}")
     try:
         updated_recording = await update_transcription(
             collection=collection,
             recording_id_str=recording_id,
-            transcription_data=transcription_input
+            transcription_data=transcription_input,
+            stats_collection=stats_collection,
+            revisions_collection=revisions_collection
         )
 
         if updated_recording is None:
@@ -514,6 +1003,8 @@ async def add_or_update_transcription(
         logger.info(f"Successfully processed transcription update for ID: {recording_id}")
         return updated_recording
 
+    except TranscriptionConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except ValueError as e: # Catch InvalidId errors from crud
         logger.error(f"Invalid ID format provided: {e}")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
@@ -525,9 +1016,235 @@ async def add_or_update_transcription(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to update transcription.")
 
 
+@app.post(
+    "/recordings/transcriptions/bulk",
+    response_model=BulkTranscriptionResponse,
+    summary="Bulk Add or Update Transcriptions",
+    tags=["Transcription"]
+)
+async def bulk_add_or_update_transcriptions(
+    request: BulkTranscriptionRequest = Body(...),
+    collection = Depends(get_ingest_collection),
+    stats_collection = Depends(get_ingest_stats_coll),
+    revisions_collection = Depends(get_revisions_coll)
+):
+    """
+    Applies many transcriptions at once with chunked, unordered bulk writes.
+    Returns one result per row (`updated`, `not_found`, `conflict`, `invalid` or `skipped`).
+    With `check_concurrency`, a row is only applied if the recording's
+    `transcription_updated_at` still equals the value sent with the row.
+    """
+    logger.info(f"Received bulk transcription update with {len(request.items)} rows.")
+    try:
+        return await bulk_transcriptions.bulk_update_transcriptions(
+            collection,
+            request.items,
+            default_transcribed_by=request.transcribed_by,
+            check_concurrency=request.check_concurrency,
+            stats_collection=stats_collection,
+            revisions_collection=revisions_collection
+        )
+    except Exception as e:
+        logger.exception("Failed to apply bulk transcription update.")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to apply bulk transcription update.")
+
+@app.post(
+    "/recordings/transcriptions/bulk/file",
+    response_model=BulkTranscriptionResponse,
+    summary="Bulk Update Transcriptions from CSV/Excel",
+    tags=["Transcription"],
+    responses={400: {"description": "File could not be parsed"}}
+)
+async def bulk_update_transcriptions_from_file(
+    file: UploadFile = File(..., description="CSV or Excel file in the layout of /recordings/export (`id`, `transcription`, ...)"),
+    transcribed_by: Optional[str] = Form(None, description="Default transcriber for rows that do not set one"),
+    check_concurrency: bool = Form(False, description="Reject rows whose transcription_updated_at no longer matches"),
+    collection = Depends(get_ingest_collection),
+    stats_collection = Depends(get_ingest_stats_coll),
+    revisions_collection = Depends(get_revisions_coll)
+):
+    """
+    Same as the JSON bulk endpoint, for spreadsheets edited offline.
+    Rows with an empty `transcription` cell are skipped.
+    """
+    try:
+        content = await file.read()
+        rows = bulk_transcriptions.parse_transcription_file(file.filename or "", content)
+    except Exception as e:
+        logger.error(f"Failed to parse bulk transcription file {file.filename}: {e}")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Could not parse file: {e}")
+    finally:
+        await file.close()
+
+    logger.info(f"Received bulk transcription file {file.filename} with {len(rows)} rows.")
+    try:
+        return await bulk_transcriptions.bulk_update_transcriptions(
+            collection,
+            bulk_transcriptions.rows_to_items(rows),
+            default_transcribed_by=transcribed_by,
+            check_concurrency=check_concurrency,
+            stats_collection=stats_collection,
+            revisions_collection=revisions_collection
+        )
+    except Exception as e:
+        logger.exception("Failed to apply bulk transcription file.")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to apply bulk transcription update.")
+
+
+@app.get(
+    "/recordings/{recording_id}/transcription/history",
+    response_model=TranscriptionHistoryResponse,
+    summary="Get Transcription Revision History",
+    tags=["Transcription"],
+    responses={404: {"description": "Recording not found"}, 400: {"description": "Invalid Recording ID format"}}
+)
+async def get_recording_transcription_history(
+    recording_id: str = Path(..., description="The unique ID of the recording"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of revisions to return"),
+    collection = Depends(get_collection),
+    revisions_collection = Depends(get_revisions_coll)
+):
+    """Lists earlier transcriptions of a recording, newest first, from the `transcription_revisions` log."""
+    try:
+        history = await get_transcription_history(collection, revisions_collection, recording_id, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.exception(f"Failed to retrieve transcription history for ID {recording_id}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to retrieve transcription history.")
+    if history is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recording not found")
+    return history
+
+
+@app.get(
+    "/recordings/{recording_id}/audio",
+    summary="Play Recording Audio",
+    tags=["Data Collection"],
+    responses={
+        200: {"description": "Whole audio file (stream mode)"},
+        206: {"description": "Requested byte range (stream mode)"},
+        307: {"description": "Redirect to a short-lived presigned R2 URL (redirect mode)"},
+        400: {"description": "Invalid Recording ID format"},
+        404: {"description": "Recording or audio object not found"},
+        416: {"description": "Range not satisfiable"}
+    }
+)
+async def get_recording_audio(
+    recording_id: str = Path(..., description="The unique ID of the recording"),
+    mode: Optional[str] = Query(None, description="'redirect' or 'stream'; defaults to AUDIO_PLAYBACK_MODE"),
+    range_header: Optional[str] = Header(None, alias="Range"),
+    collection = Depends(get_collection)
+):
+    """
+    Serves a recording's audio without requiring public bucket access. In 'redirect'
+    mode the client is sent to a presigned GET URL (reused until close to expiry);
+    in 'stream' mode the API proxies the bytes with HTTP Range support, so players
+    can seek without downloading the whole file.
+    """
+    mode = (mode or settings.AUDIO_PLAYBACK_MODE).lower()
+    if mode not in playback.PLAYBACK_MODES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"mode must be one of {', '.join(playback.PLAYBACK_MODES)}")
+    try:
+        source = await get_recording_audio_source(collection, recording_id)
+        if source is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recording not found")
+        response = await playback.audio_response(source["object_key"], source.get("content_type"), mode, range_header)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except playback.RangeNotSatisfiable as e:
+        headers = {"Content-Range": f"bytes */{e.size}"} if e.size is not None else None
+        raise HTTPException(status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE, detail=str(e), headers=headers)
+    except Exception as e:
+        logger.exception(f"Failed to serve audio for recording {recording_id}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to serve audio.")
+    if response is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Audio object not found in storage")
+    return response
+
+
+# --- Transcription Work-Queue ---
+
+@app.post(
+    "/transcription/queue/claim",
+    response_model=QueueClaimResponse,
+    summary="Claim Pending Recordings for Transcription",
+    tags=["Transcription"]
+)
+async def claim_transcription_work(
+    claim: QueueClaimRequest = Body(...),
+    collection = Depends(get_collection)
+):
+    """
+    Atomically claims up to `count` pending recordings for a transcriber, oldest first.
+    Claimed recordings are leased until `lease_expires_at`; other transcribers will not
+    receive them until the lease is released or expires.
+    """
+    try:
+        lease_expires_at, recordings = await transcription_queue.claim_recordings(
+            collection,
+            transcriber=claim.transcriber,
+            count=claim.count,
+            lease_seconds=claim.lease_seconds,
+            spontaneous_only=claim.spontaneous_only
+        )
+        return QueueClaimResponse(transcriber=claim.transcriber, lease_expires_at=lease_expires_at, recordings=recordings)
+    except Exception as e:
+        logger.exception(f"Failed to claim transcription work for {claim.transcriber}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to claim transcription work.")
+
+@app.post(
+    "/transcription/queue/{recording_id}/renew",
+    response_model=RecordingDocument,
+    summary="Renew a Transcription Lease",
+    tags=["Transcription"],
+    responses={409: {"description": "Lease not held or already expired"}}
+)
+async def renew_transcription_lease(
+    recording_id: str = Path(..., description="The ID of the claimed recording"),
+    lease: QueueLeaseRequest = Body(...),
+    collection = Depends(get_collection)
+):
+    """Extends the lease on a recording the transcriber is still working on."""
+    try:
+        return await transcription_queue.renew_lease(collection, recording_id, lease.transcriber, lease.lease_seconds)
+    except transcription_queue.LeaseNotHeldError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.exception(f"Failed to renew lease on {recording_id}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to renew lease.")
+
+@app.post(
+    "/transcription/queue/{recording_id}/release",
+    summary="Release a Claimed Recording",
+    tags=["Transcription"],
+    responses={409: {"description": "Lease not held"}}
+)
+async def release_transcription_lease(
+    recording_id: str = Path(..., description="The ID of the claimed recording"),
+    lease: QueueLeaseRequest = Body(...),
+    collection = Depends(get_collection)
+):
+    """Returns a claimed recording to the queue without transcribing it."""
+    try:
+        await transcription_queue.release_lease(collection, recording_id, lease.transcriber)
+        return {"message": "Lease released", "recording_id": recording_id}
+    except transcription_queue.LeaseNotHeldError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.exception(f"Failed to release lease on {recording_id}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to release lease.")
+
+
 @app.delete(
     "/recordings/all",
-    response_model=DeleteSummaryResponse,
+    response_model=RecordingDeletionResponse,
     summary="Delete All Recordings (USE WITH CAUTION)",
     tags=["Administration"],
     status_code=status.HTTP_200_OK,
@@ -538,12 +1255,17 @@ async def add_or_update_transcription(
 )
 async def delete_all_recordings(
     confirm: bool = Query(..., description="Must explicitly set to true to confirm deletion."),
-    collection = Depends(get_collection)
+    collection = Depends(get_collection),
+    spk_collection = Depends(get_spk_collection),
+    stats_collection = Depends(get_stats_coll)
 ):
     """
-    **WARNING:** Deletes ALL recording metadata from the database AND
-    attempts to delete corresponding files from Cloudflare R2.
-    This action is irreversible. Requires `confirm=true` query parameter.
+    **WARNING:** Soft-deletes ALL recordings: they disappear from every listing,
+    export and statistic at once, but the documents and R2 files are kept for
+    `SOFT_DELETE_RETENTION_HOURS` and can be brought back with
+    `POST /recordings/deletions/{deletion_id}/restore`. After that a background
+    purger removes them, with their R2 files, in throttled batches.
+    Requires `confirm=true` query parameter.
     """
     if not confirm:
         raise HTTPException(
@@ -551,77 +1273,231 @@ async def delete_all_recordings(
             detail="Deletion not confirmed. Add '?confirm=true' to the URL to proceed."
         )
 
-    logger.warning("!!! Initiating deletion of ALL recordings and R2 files !!!")
-    r2_failed_keys = []
-    r2_attempted_count = 0
-    db_deleted_count = None
-
-    try:
-        # 1. Get all recording documents (only need object_key and _id)
-        logger.info("Fetching all recording keys for deletion...")
-        all_recs_cursor = collection.find({}, {"object_key": 1, "_id": 1})
-        all_recs = await all_recs_cursor.to_list(length=None)
-        r2_attempted_count = len(all_recs)
-        logger.info(f"Found {r2_attempted_count} records to process for deletion.")
-
-        if not all_recs:
-            return DeleteSummaryResponse(
-                message="No recordings found to delete.",
-                db_deleted_count=0, # Explicitly set 0
-                r2_attempted_count=0,
-                r2_failed_keys=[]
-            )
-
-        # 2. Attempt to delete files from R2
-        logger.info("Attempting to delete files from R2...")
-        keys_to_delete_from_r2 = [rec.get("object_key") for rec in all_recs if rec.get("object_key") and rec.get("object_key") != "unknown_key"]
-
-        if keys_to_delete_from_r2:
-             # Using batch delete for efficiency
-             delete_results = await delete_multiple_files_from_r2(keys_to_delete_from_r2)
-             r2_failed_keys = [key for key, success in delete_results.items() if not success]
-             # Log sequential delete attempts if needed for debugging:
-             # for key in keys_to_delete_from_r2:
-             #    success = await delete_file_from_r2(key)
-             #    if not success:
-             #        r2_failed_keys.append(key)
-
-        if r2_failed_keys:
-             logger.warning(f"Failed to delete {len(r2_failed_keys)} objects from R2: {r2_failed_keys}")
-        else:
-             logger.info("All R2 delete requests processed (or objects didn't exist).")
+    logger.warning("!!! Initiating soft deletion of ALL recordings !!!")
+    try:
+        deletion_id, deleted_count, deleted_at = await tombstones.soft_delete_recordings(collection, {})
+    except Exception as e:
+        logger.exception("An error occurred during the delete all process.")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error during deletion: {e}")
 
+    try:
+        await stats.recompute_stats(stats_collection, collection, spk_collection)
+    except Exception as e:
+        logger.error(f"Failed to recompute dataset stats after recording deletion: {e}")
+    try:
+        await coverage.coverage_cache.invalidate()
+    except Exception as e:
+        logger.error(f"Failed to invalidate prompt coverage after recording deletion: {e}")
 
-        # 3. Delete all documents from MongoDB collection
-        logger.info("Attempting to delete all documents from MongoDB collection...")
-        delete_result = await collection.delete_many({})
-        db_deleted_count = delete_result.deleted_count
-        logger.info(f"Deleted {db_deleted_count} documents from MongoDB.")
+    purge_after = tombstones.purge_after(deleted_at)
+    return RecordingDeletionResponse(
+        message=f"Soft-deleted {deleted_count} recordings. Restorable until {purge_after.isoformat()}.",
+        deletion_id=deletion_id,
+        deleted_count=deleted_count,
+        purge_after=purge_after
+    )
 
-        # 4. Return summary
-        final_message = f"Delete process complete. DB Docs Deleted: {db_deleted_count}."
-        if r2_failed_keys:
-            final_message = f" R2 Deletion Failures: {len(r2_failed_keys)}."
-        else:
-            final_message = " All associated R2 objects processed successfully."
+@app.get(
+    "/recordings/deletions",
+    response_model=List[RecordingDeletionSummary],
+    summary="List Soft Deletions Awaiting Purge",
+    tags=["Administration"]
+)
+async def list_recording_deletions(collection = Depends(get_collection)):
+    """Deletions whose tombstoned recordings have not all been purged yet, most recent first."""
+    try:
+        return await tombstones.list_deletions(collection)
+    except Exception as e:
+        logger.exception("Failed to list recording deletions.")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to list deletions.")
+
+@app.post(
+    "/recordings/deletions/{deletion_id}/restore",
+    response_model=RestoreResponse,
+    summary="Restore Soft-Deleted Recordings",
+    tags=["Administration"],
+    responses={404: {"description": "Nothing left to restore for this deletion"}}
+)
+async def restore_recording_deletion(
+    deletion_id: str = Path(..., description="The deletion_id returned by the delete request"),
+    collection = Depends(get_collection),
+    spk_collection = Depends(get_spk_collection),
+    stats_collection = Depends(get_stats_coll)
+):
+    """Undoes a soft deletion whose retention window has not passed."""
+    try:
+        restored_count = await tombstones.restore_deletion(collection, deletion_id)
+    except Exception as e:
+        logger.exception(f"Failed to restore deletion {deletion_id}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to restore recordings.")
+    if not restored_count:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Nothing to restore: unknown deletion or already purged.")
+
+    try:
+        await stats.recompute_stats(stats_collection, collection, spk_collection)
+    except Exception as e:
+        logger.error(f"Failed to recompute dataset stats after restore: {e}")
+    try:
+        await coverage.coverage_cache.invalidate()
+    except Exception as e:
+        logger.error(f"Failed to invalidate prompt coverage after restore: {e}")
+    return RestoreResponse(message=f"Restored {restored_count} recordings.", restored_count=restored_count)
 
 
+@app.post(
+    "/recordings/superseded/purge",
+    response_model=DeleteSummaryResponse,
+    summary="Garbage-Collect Superseded Takes",
+    tags=["Administration"],
+    responses={403: {"description": "Confirmation not provided"}}
+)
+async def purge_superseded_takes(
+    confirm: bool = Query(..., description="Must explicitly set to true to confirm deletion."),
+    batch_size: int = Query(500, ge=1, le=1000, description="Documents/R2 objects per batch (R2 batch delete max is 1000)"),
+    min_age_hours: float = Query(24, ge=0, description="Only purge takes superseded at least this long ago"),
+    max_batches: Optional[int] = Query(None, ge=1, description="Stop after this many batches"),
+    collection = Depends(get_collection),
+    spk_collection = Depends(get_spk_collection),
+    stats_collection = Depends(get_stats_coll),
+    revisions_collection = Depends(get_revisions_coll)
+):
+    """
+    Deletes earlier takes of re-recorded prompts from R2 (batched `delete_objects`) and
+    then removes their documents. The current take of every prompt is never touched.
+    """
+    if not confirm:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Deletion not confirmed. Add '?confirm=true' to the URL to proceed."
+        )
+    try:
+        db_deleted_count, r2_attempted_count, r2_failed_keys = await purge_superseded_recordings(
+            collection, batch_size=batch_size, min_age_hours=min_age_hours, max_batches=max_batches,
+            revisions_collection=revisions_collection
+        )
+        if db_deleted_count:
+            try:
+                await stats.recompute_stats(stats_collection, collection, spk_collection)
+            except Exception as e:
+                logger.error(f"Failed to recompute dataset stats after superseded purge: {e}")
         return DeleteSummaryResponse(
-            message=final_message,
+            message=f"Purged {db_deleted_count} superseded takes. R2 Deletion Failures: {len(r2_failed_keys)}.",
             db_deleted_count=db_deleted_count,
             r2_attempted_count=r2_attempted_count,
             r2_failed_keys=r2_failed_keys
         )
+    except Exception as e:
+        logger.exception("Failed to purge superseded takes.")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to purge superseded takes.")
+
+
+# --- Background Jobs ---
 
+@app.post(
+    "/exports/webdataset",
+    response_model=JobDocument,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Start a WebDataset Export",
+    tags=["Exports"]
+)
+async def start_webdataset_export(
+    export_request: WebDatasetExportRequest = Body(...),
+    jobs_collection = Depends(get_jobs_coll)
+):
+    """
+    Packs recordings and their JSON metadata into tar shards (WebDataset layout:
+    `<id>.m4a` + `<id>.json` per sample) and writes them to R2 or local disk, followed
+    by a `manifest.json`. Runs in the background; poll `GET /jobs/{job_id}`.
+    """
+    try:
+        job = await jobs.create_job(jobs_collection, webdataset_export.JOB_TYPE, export_request.model_dump())
+        return await jobs.start_job(jobs_collection, job.id)
     except Exception as e:
-        logger.exception("An error occurred during the delete all process.")
-        # Try to return partial info if possible
-        return DeleteSummaryResponse(
-            message=f"Error during deletion: {e}",
-            db_deleted_count=db_deleted_count, # May be None if error occurred before DB delete
-            r2_attempted_count=r2_attempted_count,
-            r2_failed_keys=r2_failed_keys
-        )
+        logger.exception("Failed to start WebDataset export.")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to start export.")
+
+@app.post(
+    "/maintenance/r2/reconcile",
+    response_model=JobDocument,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Reconcile R2 Objects with Recording Documents",
+    tags=["Administration"]
+)
+async def start_r2_reconcile(
+    reconcile_request: R2ReconcileRequest = Body(...),
+    jobs_collection = Depends(get_jobs_coll)
+):
+    """
+    Finds R2 objects no recording references (e.g. an upload whose database insert
+    failed), recordings whose R2 object is missing, and recordings whose speaker was
+    deleted, in one sorted pass over both. Reports counts and sample keys in the job
+    progress; deletes the orphans only when asked. Runs in the background; poll `GET /jobs/{job_id}`.
+    """
+    try:
+        job = await jobs.create_job(jobs_collection, reconcile.JOB_TYPE, reconcile_request.model_dump())
+        return await jobs.start_job(jobs_collection, job.id)
+    except Exception as e:
+        logger.exception("Failed to start R2 reconciliation.")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to start reconciliation.")
+
+@app.get("/jobs", response_model=List[JobDocument], summary="List Background Jobs", tags=["Exports"])
+async def list_background_jobs(
+    job_type: Optional[str] = Query(None, description="Only jobs of this type, e.g. webdataset_export"),
+    limit: int = Query(50, ge=1, le=500),
+    jobs_collection = Depends(get_jobs_coll)
+):
+    """Most recent jobs first."""
+    return await jobs.list_jobs(jobs_collection, job_type=job_type, limit=limit)
+
+@app.get(
+    "/jobs/{job_id}",
+    response_model=JobDocument,
+    summary="Get Background Job Status",
+    tags=["Exports"],
+    responses={404: {"description": "Job not found"}}
+)
+async def get_background_job(job_id: str = Path(...), jobs_collection = Depends(get_jobs_coll)):
+    try:
+        job = await jobs.get_job(jobs_collection, job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
+
+@app.post(
+    "/jobs/{job_id}/resume",
+    response_model=JobDocument,
+    summary="Resume an Interrupted or Failed Job",
+    tags=["Exports"],
+    responses={409: {"description": "Job is not resumable (running with a live heartbeat, completed or cancelled)"}}
+)
+async def resume_background_job(job_id: str = Path(...), jobs_collection = Depends(get_jobs_coll)):
+    """Restarts a job from its saved progress (for exports: after the last completed shard)."""
+    try:
+        job = await jobs.start_job(jobs_collection, job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Job not found or not resumable")
+    return job
+
+@app.post(
+    "/jobs/{job_id}/cancel",
+    response_model=JobDocument,
+    summary="Cancel a Background Job",
+    tags=["Exports"],
+    responses={404: {"description": "Job not found"}}
+)
+async def cancel_background_job(job_id: str = Path(...), jobs_collection = Depends(get_jobs_coll)):
+    """A running job stops after its current unit of work (for exports: the current shard)."""
+    try:
+        job = await jobs.request_cancel(jobs_collection, job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
 
 
 # --- Uvicorn Runner ---
@@ -632,5 +1508,13 @@ if __name__ == "__main__":
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", 8000))
 
-    logger.info(f"Starting Uvicorn server on {host}:{port}...")
-    uvicorn.run("app.main:app", host=host, port=port, reload=True)
+    # Development runner. In production use gunicorn (see gunicorn.conf.py);
+    # WEB_CONCURRENCY > 1 here starts uvicorn's own worker processes without reload.
+    workers = int(os.getenv("WEB_CONCURRENCY", 1))
+    reload = workers == 1 and os.getenv("RELOAD", "true").lower() == "true"
+
+    logger.info(f"Starting Uvicorn server on {host}:{port} ({workers} worker(s), reload={reload})...")
+    uvicorn.run(
+        "app.main:app", host=host, port=port, reload=reload, workers=workers,
+        timeout_graceful_shutdown=settings.SHUTDOWN_DRAIN_SECONDS
+    )
@@ -1,6 +1,6 @@
 # app/models.py
-from pydantic import BaseModel, Field, field_validator # field_validator might be preferred in Pydantic v2+
-from typing import List, Optional, Any
+from pydantic import BaseModel, Field, field_validator, computed_field # field_validator might be preferred in Pydantic v2+
+from typing import List, Literal, Optional, Any, Dict
 from datetime import datetime
 import pytz
 from bson import ObjectId # Import ObjectId
@@ -69,11 +69,21 @@ class AudioMetadataForm(BaseModel):
 # --- TranscriptionInput remains the same ---
 class TranscriptionInput(BaseModel):
     transcription: str = Field(..., description="The transcribed text for the audio recording.")
+    transcribed_by: Optional[str] = Field(None, description="Identifier of the transcriber (must match the queue lease holder, if any).")
+    expected_version: Optional[int] = Field(
+        None, description="transcription_version the edit was based on; the update is rejected with 409 if it changed."
+    )
 
 class RecordingProgress(BaseModel):
-    total_recordings: int
-    total_required: int = Field(default=163)  # Your expected total
+    total_recordings: int = Field(..., description="Distinct catalog prompts recorded (re-takes count once)")
+    total_required: int = Field(..., description="Number of prompts in the catalog")
     is_complete: bool = Field(default=False)
+    total_takes: int = Field(default=0, description="Raw number of recording documents, including re-takes")
+    scripted_completed: int = Field(default=0)
+    scripted_required: int = Field(default=0)
+    spontaneous_completed: int = Field(default=0)
+    spontaneous_required: int = Field(default=0)
+    missing_prompt_ids: List[str] = Field(default_factory=list)
 
 
 # --- RecordingDocument (inherits the new prompt_text field) ---
@@ -93,11 +103,25 @@ class RecordingDocument(BaseModel):
     recording_duration: Optional[int] = Field(None, description="Duration in milliseconds")
     uploaded_at: datetime = Field(default_factory=lambda: datetime.now(ghana_tz))
 
+    # Snapshot of the speaker's demographics, so recordings can be filtered without a join
+    speaker_dialect: Optional[str] = Field(None)
+    speaker_gender: Optional[str] = Field(None)
+    speaker_age_range: Optional[str] = Field(None)
+
+    # Latest take of this (speaker, prompt) wins; older takes are flagged as superseded
+    is_current: bool = Field(default=True)
+    superseded_at: Optional[datetime] = Field(None)
+
     # Transcription Fields
     transcription: Optional[str] = Field(None)
     transcription_status: str = Field(default="pending")
     transcribed_by: Optional[str] = Field(None)
     transcription_updated_at: Optional[datetime] = Field(None)
+    transcription_version: int = Field(default=0, description="Incremented on every transcription update; history is in transcription_revisions")
+
+    # Transcription work-queue lease (set while a transcriber has claimed the recording)
+    lease_owner: Optional[str] = Field(None)
+    lease_expires_at: Optional[datetime] = Field(None)
 
     class Config:
         populate_by_name = True
@@ -119,6 +143,8 @@ class RecordingDocument(BaseModel):
                 "size_bytes": 95582,
                 "recording_duration": 5320,
                 "uploaded_at": "2025-04-11T10:30:00+00:00",
+                "is_current": True,
+                "superseded_at": None,
                 "transcription": "What is your name?",
                 "transcription_status": "transcribed",
                 "transcribed_by": "validator_01",
@@ -137,6 +163,23 @@ class DeleteConfirmationResponse(BaseModel):
     message: str
     deleted_count: int
 
+class RecordingDeletionResponse(BaseModel):
+    """A soft delete: the recordings are tombstoned and can be restored until purge_after."""
+    message: str
+    deletion_id: str
+    deleted_count: int
+    purge_after: datetime
+
+class RecordingDeletionSummary(BaseModel):
+    deletion_id: str
+    recording_count: int = Field(..., description="Tombstoned recordings not yet purged")
+    deleted_at: datetime
+    purge_after: datetime
+
+class RestoreResponse(BaseModel):
+    message: str
+    restored_count: int
+
 class UploadResponse(BaseModel):
     message: str
     file_url: str
@@ -145,3 +188,191 @@ class UploadResponse(BaseModel):
     participant_code: str
     prompt_id: str
     progress: RecordingProgress
+
+class DatasetStats(BaseModel):
+    """Precomputed dataset totals, maintained incrementally and repairable by full recompute."""
+    total_recordings: int = 0
+    total_speakers: int = 0
+    total_duration_ms: int = 0
+    total_size_bytes: int = 0
+    recordings_by_dialect: Dict[str, int] = Field(default_factory=dict)
+    recordings_by_gender: Dict[str, int] = Field(default_factory=dict)
+    recordings_by_age_range: Dict[str, int] = Field(default_factory=dict)
+    recordings_by_section: Dict[str, int] = Field(default_factory=dict)
+    recordings_by_transcription_status: Dict[str, int] = Field(default_factory=dict)
+    updated_at: Optional[datetime] = None
+    recomputed_at: Optional[datetime] = None
+
+    @computed_field
+    @property
+    def total_duration_hours(self) -> float:
+        return round(self.total_duration_ms / 3_600_000, 2)
+
+class PromptCoverage(BaseModel):
+    prompt_id: str
+    section_id: str
+    type: str
+    speaker_count: int = Field(..., description="Distinct speakers who recorded this prompt")
+    missing_speaker_count: int
+    coverage_ratio: float
+
+class PromptCoverageResponse(BaseModel):
+    total_speakers: int
+    total_prompts: int
+    computed_at: Optional[datetime] = None
+    prompts: List[PromptCoverage]
+
+class SpeakerMissingPrompts(BaseModel):
+    participant_code: str
+    total_required: int
+    recorded_count: int
+    missing_prompt_ids: List[str]
+
+class QueueClaimRequest(BaseModel):
+    transcriber: str = Field(..., min_length=1, description="Identifier of the transcriber claiming work")
+    count: int = Field(1, ge=1, le=50, description="Maximum number of recordings to claim")
+    lease_seconds: Optional[int] = Field(None, ge=30, le=86400, description="Lease duration (defaults to TRANSCRIPTION_LEASE_SECONDS)")
+    spontaneous_only: bool = Field(True, description="Only claim recordings of spontaneous prompts")
+
+class QueueLeaseRequest(BaseModel):
+    transcriber: str = Field(..., min_length=1)
+    lease_seconds: Optional[int] = Field(None, ge=30, le=86400)
+
+class QueueClaimResponse(BaseModel):
+    transcriber: str
+    lease_expires_at: datetime
+    recordings: List[RecordingDocument]
+
+class BulkTranscriptionItem(BaseModel):
+    recording_id: str = Field(..., description="Recording ID (the `id` column of the recordings export)")
+    transcription: str = Field(...)
+    transcribed_by: Optional[str] = Field(None)
+    transcription_updated_at: Optional[datetime] = Field(
+        None, description="Value seen when the row was exported; checked when check_concurrency is set (empty = never transcribed)"
+    )
+    expected_version: Optional[int] = Field(
+        None, description="transcription_version the row was based on (the export's transcription_version column); rejected as a conflict if it changed"
+    )
+
+class BulkTranscriptionRequest(BaseModel):
+    items: List[BulkTranscriptionItem] = Field(..., max_length=50000)
+    transcribed_by: Optional[str] = Field(None, description="Default transcriber for rows that do not set one")
+    check_concurrency: bool = Field(False, description="Reject rows whose transcription_updated_at no longer matches")
+
+class BulkTranscriptionRowResult(BaseModel):
+    row: int = Field(..., description="1-based position of the row in the submitted items/file (header excluded)")
+    recording_id: Optional[str] = None
+    status: str = Field(..., description="updated | not_found | conflict | invalid | skipped")
+    detail: Optional[str] = None
+
+class BulkTranscriptionResponse(BaseModel):
+    total: int
+    updated: int
+    failed: int
+    results: List[BulkTranscriptionRowResult]
+
+class TranscriptionRevision(BaseModel):
+    id: Optional[str] = Field(None, alias="_id")
+    recording_id: str
+    version: int
+    transcription: str
+    transcribed_by: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        populate_by_name = True
+
+class TranscriptionHistoryResponse(BaseModel):
+    recording_id: str
+    current_version: int
+    revisions: List[TranscriptionRevision] = Field(..., description="Newest first")
+
+class RecordingSearchResult(RecordingDocument):
+    score: float = Field(..., description="MongoDB text relevance score")
+
+class RecordingSearchResponse(BaseModel):
+    query: str
+    normalized_query: str = Field(..., description="Query after case, diacritic and ɛ/ɔ folding")
+    page: int
+    page_size: int
+    has_more: bool
+    results: List[RecordingSearchResult]
+
+class RecordingFilter(BaseModel):
+    """Optional filters for recording listings; all given filters must match."""
+    participant_code: Optional[str] = Field(None, description="Filter recordings by participant code")
+    transcription_status: Optional[str] = Field(None, description="e.g. pending, transcribed")
+    dialect: Optional[str] = Field(None, description="Speaker dialect")
+    gender: Optional[str] = Field(None, description="Speaker gender")
+    age_range: Optional[str] = Field(None, description="Speaker age range")
+    session_id: Optional[str] = Field(None)
+    section_id: Optional[str] = Field(None, description="Prompt catalog section, e.g. ScriptAU")
+    prompt_id: Optional[str] = Field(None)
+    uploaded_from: Optional[datetime] = Field(None, description="Uploaded at or after (ISO 8601)")
+    uploaded_to: Optional[datetime] = Field(None, description="Uploaded before (ISO 8601)")
+    min_duration_ms: Optional[int] = Field(None, ge=0)
+    max_duration_ms: Optional[int] = Field(None, ge=0)
+
+class SessionSummary(BaseModel):
+    session_id: str
+    speaker_id: str
+    participant_code: str
+    take_count: int = Field(..., description="All recordings uploaded in the session, including re-takes")
+    current_take_count: int = Field(..., description="Recordings from the session that are still the current take")
+    prompt_count: int = Field(..., description="Distinct catalog prompts recorded in the session")
+    total_duration_ms: int = 0
+    started_at: datetime
+    ended_at: datetime
+    last_prompt_id: Optional[str] = Field(None, description="Most recently recorded prompt, to resume from")
+    completion_ratio: float = Field(..., description="prompt_count / prompts in the catalog")
+
+class SpeakerSessionsResponse(BaseModel):
+    participant_code: str
+    sessions: List[SessionSummary] = Field(..., description="Most recent session first")
+
+class JobDocument(BaseModel):
+    id: Optional[str] = Field(None, alias="_id")
+    type: str
+    status: str = Field(..., description="pending | running | completed | failed | cancelled | interrupted")
+    params: Dict[str, Any] = Field(default_factory=dict)
+    progress: Dict[str, Any] = Field(default_factory=dict)
+    error: Optional[str] = None
+    cancel_requested: bool = False
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        populate_by_name = True
+
+class R2ReconcileRequest(BaseModel):
+    prefix: str = Field("recordings/", description="R2 key prefix to reconcile")
+    delete_orphan_objects: bool = Field(False, description="Delete R2 objects that no recording references (older than the grace period)")
+    delete_orphan_documents: bool = Field(False, description="Delete recordings whose R2 object is missing, and recordings (with their objects) whose speaker no longer exists")
+    grace_hours: Optional[float] = Field(None, ge=0, description="Leave unreferenced objects younger than this alone; uploads write R2 before MongoDB (default RECONCILE_GRACE_HOURS)")
+    sample_size: int = Field(100, ge=0, le=10000, description="Keys of each orphan kind to list in the job progress")
+
+class WebDatasetExportRequest(BaseModel):
+    destination: Literal["r2", "local"] = Field("r2", description="Write shards back to R2 or to EXPORT_LOCAL_DIR on the server")
+    prefix: Optional[str] = Field(None, description="R2 key prefix / local sub-directory (default exports/webdataset/<job id>)")
+    max_samples_per_shard: int = Field(1000, ge=1, le=100000)
+    max_shard_bytes: int = Field(512 * 1024 * 1024, ge=1024 * 1024, description="Audio bytes per shard, from the size_bytes recorded at upload")
+    concurrency: Optional[int] = Field(None, ge=1, le=64, description="Concurrent R2 downloads (default EXPORT_DOWNLOAD_CONCURRENCY)")
+    transcription_status: Optional[str] = Field(None, description="Only export recordings with this status, e.g. transcribed")
+    include_superseded: bool = Field(False)
+
+    @field_validator('prefix')
+    def prefix_must_be_relative(cls, v):
+        # Used as an R2 key prefix and as a directory under EXPORT_LOCAL_DIR
+        if v is None:
+            return v
+        v = v.strip().rstrip("/")
+        segments = v.split("/")
+        if v.startswith("/") or "\\" in v or ":" in v:
+            raise ValueError('prefix must be a relative path')
+        if any(segment in ("", ".", "..") for segment in segments):
+            raise ValueError('prefix must not contain empty, "." or ".." segments')
+        if segments[0] == "recordings":
+            raise ValueError('prefix must not be under "recordings/", which holds the uploaded audio')
+        return v
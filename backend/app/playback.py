@@ -0,0 +1,158 @@
+# app/playback.py
+import asyncio
+import hashlib
+import logging
+import os
+import re
+from typing import Any, AsyncIterator, BinaryIO, Dict, Optional, Tuple
+
+from botocore.exceptions import ClientError
+from fastapi.responses import RedirectResponse, Response, StreamingResponse
+
+from .r2 import get_presigned_url, open_object_range, r2_cache
+
+logger = logging.getLogger(__name__)
+
+PLAYBACK_MODES = ("redirect", "stream")
+CHUNK_SIZE = 256 * 1024
+# Object keys are never reused for different audio, so proxied responses can be cached by the browser
+STREAM_CACHE_CONTROL = "private, max-age=86400"
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    """The Range header does not overlap the object; answered with 416."""
+
+    def __init__(self, size: Optional[int] = None):
+        super().__init__("Requested range not satisfiable")
+        self.size = size
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parses a single-range 'bytes=' header into inclusive (start, end) offsets.
+    Returns None when the whole object should be sent: no header, or a form we
+    do not serve partially (multiple ranges, other units), which RFC 9110 allows.
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable(size)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or (last and int(last) < start):
+        raise RangeNotSatisfiable(size)
+    return start, end
+
+
+def _etag(object_key: str) -> str:
+    return '"' + hashlib.sha256(object_key.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+async def _iter_file(f: BinaryIO, start: int, length: int) -> AsyncIterator[bytes]:
+    try:
+        await asyncio.to_thread(f.seek, start)
+        remaining = length
+        while remaining > 0:
+            chunk = await asyncio.to_thread(f.read, min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+async def _iter_body(body: Any) -> AsyncIterator[bytes]:
+    try:
+        while True:
+            chunk = await asyncio.to_thread(body.read, CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        body.close()
+
+
+def _file_response(path: str, object_key: str, content_type: str, range_header: Optional[str]) -> Response:
+    # Opened before responding: if the file is evicted meanwhile, this handle keeps it readable
+    f = open(path, "rb")
+    try:
+        size = os.fstat(f.fileno()).st_size
+        byte_range = parse_range(range_header, size)
+    except BaseException:
+        f.close()
+        raise
+    headers = {"Accept-Ranges": "bytes", "ETag": _etag(object_key), "Cache-Control": STREAM_CACHE_CONTROL}
+    start, end = byte_range if byte_range else (0, size - 1)
+    headers["Content-Length"] = str(end - start + 1)
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return StreamingResponse(
+        _iter_file(f, start, end - start + 1),
+        status_code=206 if byte_range else 200,
+        media_type=content_type,
+        headers=headers
+    )
+
+
+async def _r2_response(object_key: str, content_type: str, range_header: Optional[str]) -> Optional[Response]:
+    """Streams straight from R2, letting R2 answer the Range header (used when the disk cache is off)."""
+    byte_range = range_header.strip() if range_header and _RANGE_RE.match(range_header.strip()) else None
+    try:
+        obj = await open_object_range(object_key, byte_range)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") == "InvalidRange":
+            raise RangeNotSatisfiable()
+        raise
+    if obj is None:
+        return None
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": _etag(object_key),
+        "Cache-Control": STREAM_CACHE_CONTROL,
+        "Content-Length": str(obj["ContentLength"]),
+    }
+    partial = obj.get("ResponseMetadata", {}).get("HTTPStatusCode") == 206
+    if partial and obj.get("ContentRange"):
+        headers["Content-Range"] = obj["ContentRange"]
+    return StreamingResponse(
+        _iter_body(obj["Body"]),
+        status_code=206 if partial else 200,
+        media_type=content_type,
+        headers=headers
+    )
+
+
+async def audio_response(
+    object_key: str,
+    content_type: Optional[str],
+    mode: str,
+    range_header: Optional[str] = None
+) -> Optional[Response]:
+    """
+    Builds the playback response for one object: a 307 to a presigned URL
+    ('redirect'), or the bytes proxied with Range support ('stream'), read
+    through the local R2 cache when it is enabled. None if the object is missing.
+    """
+    content_type = content_type or "audio/mp4"
+    if mode == "redirect":
+        url, max_age = get_presigned_url(object_key)
+        # The browser may reuse the redirect until shortly before the URL expires
+        return RedirectResponse(url, status_code=307, headers={"Cache-Control": f"private, max-age={max_age}"})
+
+    if not r2_cache.enabled:
+        return await _r2_response(object_key, content_type, range_header)
+    path = await r2_cache.get_path(object_key)
+    if path is None:
+        return None
+    return _file_response(path, object_key, content_type, range_header)
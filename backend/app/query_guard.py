@@ -0,0 +1,159 @@
+# app/query_guard.py
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+GUARD_MODES = ("off", "warn", "reject")
+
+
+class UnindexedQueryError(Exception):
+    """Raised in 'reject' mode when no index narrows a query shape."""
+
+
+def query_shape(value: Any) -> Any:
+    """Replaces the values of a query/sort with placeholders, keeping fields and operators."""
+    if isinstance(value, dict):
+        return tuple(sorted((key, query_shape(sub)) for key, sub in value.items()))
+    if isinstance(value, (list, tuple)) and value and all(isinstance(v, dict) for v in value):
+        return tuple(query_shape(v) for v in value)  # $and / $or branches
+    return "?"
+
+
+# Present on every recording query (current/deleted flags): matching them says nothing about selectivity
+BASELINE_FIELDS = ("is_current", "deleted_at")
+
+# Operators an index scan turns into point or range bounds
+EQUALITY_OPERATORS = ("$eq", "$in")
+RANGE_OPERATORS = ("$gt", "$gte", "$lt", "$lte")
+
+
+def _bound_kind(value: Any) -> Optional[str]:
+    """'equality' or 'range' if an index on the field can bound this condition, else None."""
+    if not isinstance(value, dict) or not any(key.startswith("$") for key in value):
+        return "equality"
+    operators = set(value)
+    if operators & set(EQUALITY_OPERATORS):
+        return "equality"
+    if operators & set(RANGE_OPERATORS):
+        return "range"
+    pattern = value.get("$regex")
+    if isinstance(pattern, str) and pattern.startswith("^") and "i" not in value.get("$options", ""):
+        return "range"  # An anchored, case-sensitive prefix scans one key range
+    return None  # $ne, $nin, $exists, $not, unanchored $regex: the whole index
+
+
+def _bounded_fields(keys: List[Tuple[str, Any]], query_filter: Dict[str, Any]) -> Set[str]:
+    """
+    Filter fields an index with these keys narrows: the leading fields matched by
+    equality, then at most one range field. A field after a gap is not bounded.
+    """
+    fields: Set[str] = set()
+    for field, _ in keys:
+        kind = _bound_kind(query_filter[field]) if field in query_filter else None
+        if kind is None:
+            break
+        fields.add(field)
+        if kind == "range":
+            break
+    return fields
+
+
+def _covers_partial_filter(partial_filter: Dict[str, Any], query_filter: Dict[str, Any]) -> bool:
+    """Whether every document the query matches is in the partial index (for the expressions used in database.py)."""
+    for field, condition in partial_filter.items():
+        if condition == {"$exists": True}:
+            if field not in query_filter or query_filter[field] is None or query_filter[field] == {"$exists": False}:
+                return False
+        elif query_filter.get(field) != condition:
+            return False
+    return True
+
+
+def filter_fields(query_filter: Dict[str, Any]) -> List[str]:
+    return sorted(key for key in query_filter if not key.startswith("$") and key not in BASELINE_FIELDS)
+
+
+class QueryIndexGuard:
+    """
+    Checks each filtered query against the collection's index definitions. A
+    query is indexed when an index usable for it (a partial index only if the
+    query implies its filter, e.g. is_current for the current-take indexes)
+    bounds at least one of its filter fields. Walking an index in uploaded_at
+    order does not count, as it reads every current take. Without filter fields,
+    an index must lead with the sort field. The verdict does not depend on the
+    planner's choice or on the values of the first query of a shape. Unindexed
+    queries are logged once per shape ('warn', the default) or refused
+    ('reject'). Index definitions are read once per process (and again after
+    clear()).
+    """
+
+    def __init__(self):
+        self._indexes: Dict[str, List[Dict[str, Any]]] = {}
+        self._warned: Set[Tuple] = set()
+
+    @property
+    def mode(self) -> str:
+        mode = (settings.QUERY_INDEX_GUARD or "off").lower()
+        return mode if mode in GUARD_MODES else "warn"
+
+    async def _index_definitions(self, collection: AsyncIOMotorCollection) -> List[Dict[str, Any]]:
+        if collection.name not in self._indexes:
+            information = await collection.index_information()
+            self._indexes[collection.name] = [
+                {"keys": spec["key"], "partial": spec.get("partialFilterExpression", {})}
+                for spec in information.values()
+                if all(direction in (1, -1) for _, direction in spec["key"])  # Not text / hashed / geo
+            ]
+        return self._indexes[collection.name]
+
+    async def is_indexed(
+        self,
+        collection: AsyncIOMotorCollection,
+        query_filter: Dict[str, Any],
+        sort: Optional[List[Tuple[str, int]]] = None
+    ) -> bool:
+        try:
+            indexes = await self._index_definitions(collection)
+        except Exception as e:
+            # The guard must never break a query that MongoDB itself would run
+            logger.error(f"Query index guard could not read the indexes of {collection.name}, skipping the check: {e}")
+            return True
+        usable = [index for index in indexes if _covers_partial_filter(index["partial"], query_filter)]
+        fields = set(filter_fields(query_filter))
+        if not fields:
+            return not sort or any(index["keys"][0][0] == sort[0][0] for index in usable)
+        return any(_bounded_fields(index["keys"], query_filter) & fields for index in usable)
+
+    async def check(
+        self,
+        collection: AsyncIOMotorCollection,
+        query_filter: Dict[str, Any],
+        sort: Optional[List[Tuple[str, int]]] = None
+    ) -> None:
+        """Applies the configured guard mode to a query before it is run."""
+        mode = self.mode
+        if mode == "off":
+            return
+        if await self.is_indexed(collection, query_filter, sort):
+            return
+        fields = filter_fields(query_filter)
+        message = f"Filter on {fields or 'no fields'} is not backed by an index on {collection.name}."
+        if mode == "reject":
+            raise UnindexedQueryError(message)
+        shape = (collection.name, query_shape(query_filter), tuple(sort or ()))
+        if shape not in self._warned:
+            self._warned.add(shape)
+            logger.warning(message)
+
+    def clear(self) -> None:
+        """Forgets the index definitions read so far (call after creating indexes)."""
+        self._indexes.clear()
+        self._warned.clear()
+
+
+query_guard = QueryIndexGuard()
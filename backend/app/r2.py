@@ -1,28 +1,48 @@
 # app/r2.py
 import os
-import boto3
-from botocore.client import Config
+import shutil
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from botocore.exceptions import ClientError
 from .config import settings
 import logging
 from fastapi import UploadFile
 import io
 import uuid
-from typing import Dict, List, Tuple # <-- Import Tuple for type hinting
+from typing import Any, Dict, List, Optional, Tuple # <-- Import Tuple for type hinting
 
 logger = logging.getLogger(__name__)
 
-# Initialize S3 client for R2
-s3_client = boto3.client(
-    service_name='s3',
-    endpoint_url=settings.r2_endpoint_url,
-    aws_access_key_id=settings.CLOUDFLARE_ACCESS_KEY_ID,
-    aws_secret_access_key=settings.CLOUDFLARE_SECRET_ACCESS_KEY,
-    region_name='auto',
-    config=Config(signature_version='s3v4')
-)
+# S3 client for R2, built on first use (importing this module needs no credentials)
+_s3_client = None
+_s3_client_lock = threading.Lock()
 
-logger.info(f"Initialized S3 client for R2 endpoint: {settings.r2_endpoint_url}")
+def get_s3_client():
+    """
+    Returns the shared boto3 client, creating it on first call. The client is
+    thread-safe and keeps up to R2_MAX_POOL_CONNECTIONS connections open.
+    Raises RuntimeError if R2 credentials are not configured.
+    """
+    global _s3_client
+    if _s3_client is None:
+        with _s3_client_lock:
+            if _s3_client is None:
+                settings.require_r2()
+                import boto3  # Deferred: importing boto3 takes a noticeable share of start-up
+                from botocore.client import Config
+                _s3_client = boto3.client(
+                    service_name='s3',
+                    endpoint_url=settings.r2_endpoint_url,
+                    aws_access_key_id=settings.CLOUDFLARE_ACCESS_KEY_ID,
+                    aws_secret_access_key=settings.CLOUDFLARE_SECRET_ACCESS_KEY,
+                    region_name='auto',
+                    config=Config(signature_version='s3v4', max_pool_connections=settings.R2_MAX_POOL_CONNECTIONS)
+                )
+                logger.info(f"Initialized S3 client for R2 endpoint: {settings.r2_endpoint_url}")
+    return _s3_client
 
 def generate_r2_object_key(participant_code: str, prompt_id: str, original_filename: str) -> str:
     """Generates a unique and structured key (path) for the object in R2."""
@@ -78,12 +98,14 @@ async def upload_file_to_r2(
     """
     object_key = None # Initialize object_key
     try:
-        contents = await file.read()
-        if not contents:
+        # Stream from the spooled upload file instead of reading it into memory
+        file_stream = file.file
+        file_stream.seek(0, io.SEEK_END)
+        if file_stream.tell() == 0:
             logger.error("Upload aborted: Received empty file.")
             raise ValueError("Received empty file content.")
+        file_stream.seek(0)
 
-        file_stream = io.BytesIO(contents)
         object_key = generate_r2_object_key(participant_code, prompt_id, file.filename) # Generate key
 
         logger.info(f"Uploading file to R2. Bucket: {settings.R2_BUCKET_NAME}, Key: {object_key}")
@@ -94,7 +116,9 @@ async def upload_file_to_r2(
             content_type = 'audio/mp4' # Be more specific for .m4a if possible
         logger.debug(f"Using ContentType: {content_type} for upload.")
 
-        s3_client.upload_fileobj(
+        # boto3 blocks; run it in a worker thread so the event loop keeps serving
+        await asyncio.to_thread(
+            get_s3_client().upload_fileobj,
             Fileobj=file_stream,
             Bucket=settings.R2_BUCKET_NAME,
             Key=object_key,
@@ -123,6 +147,15 @@ async def upload_file_to_r2(
         # Close the FastAPI UploadFile stream
         await file.close()
 
+def _delete_object(object_key: str) -> None:
+    get_s3_client().delete_object(Bucket=settings.R2_BUCKET_NAME, Key=object_key)
+
+def _delete_objects(objects_to_delete: List[Dict[str, str]]) -> Dict[str, Any]:
+    return get_s3_client().delete_objects(
+        Bucket=settings.R2_BUCKET_NAME,
+        Delete={'Objects': objects_to_delete, 'Quiet': False} # Quiet=False returns results
+    )
+
 async def delete_file_from_r2(object_key: str) -> bool:
     """
     Deletes a single object from the R2 bucket.
@@ -139,11 +172,8 @@ async def delete_file_from_r2(object_key: str) -> bool:
 
     logger.info(f"Attempting to delete object from R2: {object_key}")
     try:
-        # Boto3 runs sync code, FastAPI handles it in threadpool
-        s3_client.delete_object(
-            Bucket=settings.R2_BUCKET_NAME,
-            Key=object_key
-        )
+        # Boto3 is synchronous; run it in a worker thread so the event loop keeps serving
+        await asyncio.to_thread(_delete_object, object_key)
         logger.info(f"Successfully submitted delete request for R2 object: {object_key}")
         # Note: delete_object doesn't raise error if key doesn't exist, it succeeds silently.
         # For stricter checking, you might head_object first, but that adds latency.
@@ -170,10 +200,7 @@ async def delete_multiple_files_from_r2(object_keys: List[str]) -> Dict[str, boo
     results = {}
     try:
         logger.info(f"Attempting to batch delete {len(objects_to_delete)} objects from R2...")
-        response = s3_client.delete_objects(
-            Bucket=settings.R2_BUCKET_NAME,
-            Delete={'Objects': objects_to_delete, 'Quiet': False} # Quiet=False returns results
-        )
+        response = await asyncio.to_thread(_delete_objects, objects_to_delete)
         # Process successful deletions
         deleted_keys = {d['Key'] for d in response.get('Deleted', [])}
         for obj in objects_to_delete:
@@ -202,3 +229,268 @@ async def delete_multiple_files_from_r2(object_keys: List[str]) -> Dict[str, boo
     except Exception as e:
         logger.error(f"Unexpected error during R2 batch delete: {e}")
         return {key: False for key in object_keys}
+
+
+# --- Reads and file uploads (run in worker threads so the event loop keeps serving) ---
+
+def _get_object_bytes(object_key: str) -> Optional[bytes]:
+    try:
+        response = get_s3_client().get_object(Bucket=settings.R2_BUCKET_NAME, Key=object_key)
+        return response['Body'].read()
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+            return None
+        raise
+
+async def download_object_bytes(object_key: str) -> Optional[bytes]:
+    """Downloads an object from R2; returns None if it does not exist."""
+    return await asyncio.to_thread(_get_object_bytes, object_key)
+
+async def upload_path_to_r2(path: str, object_key: str, content_type: str = 'application/octet-stream') -> None:
+    """Uploads a local file to R2 (multipart for large files, handled by boto3)."""
+    await asyncio.to_thread(
+        get_s3_client().upload_file, path, settings.R2_BUCKET_NAME, object_key,
+        ExtraArgs={'ContentType': content_type}
+    )
+    logger.info(f"Uploaded {path} to R2 as {object_key}.")
+
+def _get_object_range(object_key: str, byte_range: Optional[str]) -> Optional[Dict[str, Any]]:
+    params = {"Bucket": settings.R2_BUCKET_NAME, "Key": object_key}
+    if byte_range:
+        params["Range"] = byte_range
+    try:
+        return get_s3_client().get_object(**params)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+            return None
+        raise
+
+async def open_object_range(object_key: str, byte_range: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Starts a (ranged) GET and returns the boto3 response without reading the body.
+    `byte_range` is an HTTP Range value such as 'bytes=0-1023'. None if the object does not exist.
+    """
+    return await asyncio.to_thread(_get_object_range, object_key, byte_range)
+
+def _list_objects_page(prefix: str, start_after: Optional[str], continuation_token: Optional[str], max_keys: int) -> Dict[str, Any]:
+    params = {"Bucket": settings.R2_BUCKET_NAME, "Prefix": prefix, "MaxKeys": max_keys}
+    if continuation_token:
+        params["ContinuationToken"] = continuation_token
+    elif start_after:
+        params["StartAfter"] = start_after
+    return get_s3_client().list_objects_v2(**params)
+
+async def list_objects_page(
+    prefix: str,
+    start_after: Optional[str] = None,
+    continuation_token: Optional[str] = None,
+    max_keys: int = 1000
+) -> Dict[str, Any]:
+    """One list_objects_v2 page (keys in ascending UTF-8 byte order); pass NextContinuationToken for the next."""
+    return await asyncio.to_thread(_list_objects_page, prefix, start_after, continuation_token, max_keys)
+
+
+# --- Presigned playback URLs ---
+
+# object_key -> (url, monotonic expiry time)
+_presigned_urls: Dict[str, Tuple[str, float]] = {}
+
+def get_presigned_url(object_key: str) -> Tuple[str, int]:
+    """
+    Returns a presigned GET URL for an object and the seconds it remains usable.
+    URLs are reused per key until they are within R2_PRESIGNED_URL_REFRESH_SECONDS
+    of expiring, so repeated plays of a recording hit the browser's cache.
+    Signing is local (no request to R2).
+    """
+    now = time.monotonic()
+    cached = _presigned_urls.get(object_key)
+    if cached and cached[1] - now > settings.R2_PRESIGNED_URL_REFRESH_SECONDS:
+        return cached[0], int(cached[1] - now - settings.R2_PRESIGNED_URL_REFRESH_SECONDS)
+
+    url = get_s3_client().generate_presigned_url(
+        "get_object",
+        Params={"Bucket": settings.R2_BUCKET_NAME, "Key": object_key},
+        ExpiresIn=settings.R2_PRESIGNED_URL_TTL_SECONDS
+    )
+    if len(_presigned_urls) >= 10000:
+        for key in [key for key, (_, expires) in _presigned_urls.items() if expires <= now + settings.R2_PRESIGNED_URL_REFRESH_SECONDS]:
+            del _presigned_urls[key]
+        if len(_presigned_urls) >= 10000:
+            _presigned_urls.clear()
+    _presigned_urls[object_key] = (url, now + settings.R2_PRESIGNED_URL_TTL_SECONDS)
+    return url, settings.R2_PRESIGNED_URL_TTL_SECONDS - settings.R2_PRESIGNED_URL_REFRESH_SECONDS
+
+
+# --- Local disk cache for reads ---
+
+class R2DiskCache:
+    """
+    Size-bounded LRU cache of R2 objects on local disk.
+
+    Files are addressed by the SHA-256 of the object key: keys embed a fresh
+    uuid per upload and objects are never rewritten in place, so a key always
+    names the same content and no revalidation is needed. Concurrent misses for
+    the same key share one download. Objects stream to a temp file and are
+    renamed into place, so readers never see partial files.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # digest -> size, least recently used first
+        self._size = 0
+        self._loaded = False
+        self._lock = threading.Lock()  # _entries, _size and metrics are touched from worker threads during fills
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.metrics: Dict[str, int] = {
+            "hits": 0, "misses": 0, "deduplicated_waits": 0, "not_found": 0,
+            "bytes_saved": 0, "bytes_downloaded": 0, "evictions": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory) and self.max_bytes > 0
+
+    @staticmethod
+    def _digest(object_key: str) -> str:
+        return hashlib.sha256(object_key.encode("utf-8")).hexdigest()
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def _load(self) -> None:
+        """Indexes files left by a previous run (oldest access first) and removes partial downloads."""
+        with self._lock:
+            if self._loaded:
+                return
+            tmp_dir = os.path.join(self.directory, "tmp")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(tmp_dir, exist_ok=True)
+            found = []
+            for root, _, files in os.walk(self.directory):
+                if root == tmp_dir:
+                    continue
+                for name in files:
+                    stat = os.stat(os.path.join(root, name))
+                    found.append((stat.st_atime, name, stat.st_size))
+            for _, digest, size in sorted(found):
+                self._entries[digest] = size
+                self._size += size
+            self._loaded = True
+        logger.info(f"R2 cache at {self.directory}: {len(self._entries)} files, {self._size} bytes.")
+
+    def _count(self, metric: str, amount: int = 1) -> None:
+        with self._lock:
+            self.metrics[metric] += amount
+
+    def _lookup(self, digest: str) -> Optional[str]:
+        """Returns the cached file's path, counting a hit, or None on a miss."""
+        path = self._path(digest)
+        with self._lock:
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                # Evicted by another worker sharing the directory: forget the stale entry
+                stale = self._entries.pop(digest, None)
+                if stale is not None:
+                    self._size -= stale
+                return None
+            previous = self._entries.get(digest)
+            if previous is None:
+                # Adopt a file another worker filled
+                self._entries[digest] = size
+                self._size += size
+                self._evict()
+            else:
+                self._entries.move_to_end(digest)
+            self.metrics["hits"] += 1
+            self.metrics["bytes_saved"] += size
+        return path
+
+    def _fill(self, object_key: str, digest: str) -> Optional[str]:
+        """Streams one object to disk (worker thread). Returns its path, or None if it does not exist."""
+        tmp_path = os.path.join(self.directory, "tmp", f"{digest}.{uuid.uuid4().hex}.part")
+        try:
+            response = get_s3_client().get_object(Bucket=settings.R2_BUCKET_NAME, Key=object_key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                return None
+            raise
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in response["Body"].iter_chunks(1024 * 1024):
+                    f.write(chunk)
+            size = os.path.getsize(tmp_path)
+            final_path = self._path(digest)
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.replace(tmp_path, final_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        with self._lock:
+            self.metrics["bytes_downloaded"] += size
+            # Another worker may have filled (and this one adopted) the same file meanwhile
+            self._size += size - self._entries.pop(digest, 0)
+            self._entries[digest] = size
+            self._evict()
+        return final_path
+
+    def _evict(self) -> None:
+        """Drops least recently used files until the cache fits (caller holds the lock)."""
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            digest, size = self._entries.popitem(last=False)
+            self._size -= size
+            self.metrics["evictions"] += 1
+            try:
+                os.remove(self._path(digest))  # Open readers keep their file handle
+            except FileNotFoundError:
+                pass
+
+    async def get_path(self, object_key: str) -> Optional[str]:
+        """Returns a local path holding the object, downloading it once on a miss; None if it does not exist."""
+        if not self._loaded:
+            await asyncio.to_thread(self._load)
+        digest = self._digest(object_key)
+        path = self._lookup(digest)
+        if path is not None:
+            return path
+        if digest in self._inflight:
+            self._count("deduplicated_waits")
+            path = await asyncio.shield(self._inflight[digest])
+            if path is not None:
+                self._count("bytes_saved", self._entries.get(digest, 0))
+            return path
+
+        self._count("misses")
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[digest] = future
+        try:
+            path = await asyncio.to_thread(self._fill, object_key, digest)
+            if path is None:
+                self._count("not_found")
+            future.set_result(path)
+            return path
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved: waiters re-raise it, and no waiter is fine too
+            raise
+        finally:
+            del self._inflight[digest]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = dict(self.metrics)
+            entries, size = len(self._entries), self._size
+        lookups = metrics["hits"] + metrics["misses"] + metrics["deduplicated_waits"]
+        return {
+            **metrics,
+            "enabled": self.enabled,
+            "entries": entries,
+            "size_bytes": size,
+            "max_bytes": self.max_bytes,
+            "hit_rate": round((metrics["hits"] + metrics["deduplicated_waits"]) / lookups, 4) if lookups else 0.0,
+        }
+
+
+r2_cache = R2DiskCache(settings.R2_CACHE_DIR, settings.R2_CACHE_MAX_BYTES)
+
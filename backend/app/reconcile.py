@@ -0,0 +1,204 @@
+# app/reconcile.py
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from . import coverage, jobs, stats
+from .config import settings
+from .database import get_recordings_collection, get_revisions_collection, get_speakers_collection, get_stats_collection
+from .r2 import delete_multiple_files_from_r2, list_objects_page
+
+logger = logging.getLogger(__name__)
+
+JOB_TYPE = "r2_reconcile"
+PAGE_SIZE = 1000
+# Keys merged between progress checkpoints (pending deletes are flushed first)
+CHECKPOINT_EVERY = 5000
+
+ORPHAN_KINDS = ("objects_without_document", "documents_without_object", "documents_without_speaker")
+
+
+def _prefix_end(prefix: str) -> Optional[str]:
+    """Smallest string greater than every string starting with `prefix` (None if unbounded)."""
+    if not prefix:
+        return None
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+async def _r2_objects(prefix: str, start_after: Optional[str]) -> AsyncIterator[Dict[str, Any]]:
+    token = None
+    while True:
+        page = await list_objects_page(prefix, start_after=start_after, continuation_token=token, max_keys=PAGE_SIZE)
+        for obj in page.get("Contents", []):
+            yield obj
+        token = page.get("NextContinuationToken")
+        if not page.get("IsTruncated") or not token:
+            return
+
+
+async def _recordings_by_key(
+    rec_collection: AsyncIOMotorCollection,
+    prefix: str,
+    start_after: Optional[str]
+) -> AsyncIterator[Dict[str, Any]]:
+    key_range: Dict[str, Any] = {"$gt": start_after} if start_after and start_after >= prefix else {"$gte": prefix}
+    end = _prefix_end(prefix)
+    if end:
+        key_range["$lt"] = end
+    # Served by the object_key index; binary string order matches R2's listing order
+    cursor = rec_collection.find(
+        {"object_key": key_range}, {"object_key": 1, "speaker_id": 1, "uploaded_at": 1}
+    ).sort("object_key", 1).batch_size(PAGE_SIZE)
+    async for doc in cursor:
+        yield doc
+
+
+class _Reconciler:
+    """Accumulates orphans found by the merge, deletes them in batches if asked, and keeps counts/samples."""
+
+    def __init__(
+        self,
+        params: Dict[str, Any],
+        progress: Dict[str, Any],
+        spk_collection: AsyncIOMotorCollection,
+        speaker_ids: Set[ObjectId]
+    ):
+        self.delete_objects = params.get("delete_orphan_objects", False)
+        self.delete_documents = params.get("delete_orphan_documents", False)
+        grace_hours = params.get("grace_hours")
+        grace = timedelta(hours=settings.RECONCILE_GRACE_HOURS if grace_hours is None else grace_hours)
+        self.cutoff = datetime.now(timezone.utc) - grace
+        self.sample_size = params.get("sample_size", 100)
+        self.spk_collection = spk_collection
+        self.speaker_ids = speaker_ids
+        self.counts = {key: progress.get(key, 0) for key in (
+            "objects_scanned", "documents_scanned", "matched", "objects_in_grace_period",
+            "objects_deleted", "documents_deleted", *ORPHAN_KINDS,
+        )}
+        self.samples: Dict[str, List[str]] = {kind: list(progress.get("samples", {}).get(kind, [])) for kind in ORPHAN_KINDS}
+        self._objects_to_delete: List[str] = []
+        self._documents_to_delete: List[ObjectId] = []
+
+    def _found(self, kind: str, key: str) -> None:
+        self.counts[kind] += 1
+        if len(self.samples[kind]) < self.sample_size:
+            self.samples[kind].append(key)
+
+    def _is_recent(self, when: Optional[datetime]) -> bool:
+        if when is None:
+            return False
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)  # MongoDB returns naive UTC datetimes
+        return when > self.cutoff
+
+    def orphan_object(self, obj: Dict[str, Any]) -> None:
+        if self._is_recent(obj.get("LastModified")):
+            self.counts["objects_in_grace_period"] += 1  # Possibly an upload whose document is still being written
+            return
+        self._found("objects_without_document", obj["Key"])
+        if self.delete_objects:
+            self._objects_to_delete.append(obj["Key"])
+
+    def orphan_document(self, doc: Dict[str, Any]) -> None:
+        if self._is_recent(doc.get("uploaded_at")):
+            return  # Uploaded after this part of the bucket was listed
+        self._found("documents_without_object", doc["object_key"])
+        if self.delete_documents:
+            self._documents_to_delete.append(doc["_id"])
+
+    async def matched(self, doc: Dict[str, Any]) -> None:
+        self.counts["matched"] += 1
+        speaker_id = doc.get("speaker_id")
+        if speaker_id not in self.speaker_ids and await self.spk_collection.find_one({"_id": speaker_id}, {"_id": 1}):
+            self.speaker_ids.add(speaker_id)  # Registered after the scan started
+        if speaker_id not in self.speaker_ids:
+            self._found("documents_without_speaker", doc["object_key"])
+            if self.delete_documents:
+                self._documents_to_delete.append(doc["_id"])
+                self._objects_to_delete.append(doc["object_key"])
+
+    async def flush(self, rec_collection: AsyncIOMotorCollection, revisions_collection: AsyncIOMotorCollection) -> None:
+        if self._documents_to_delete:
+            ids, self._documents_to_delete = self._documents_to_delete, []
+            result = await rec_collection.delete_many({"_id": {"$in": ids}})
+            await revisions_collection.delete_many({"recording_id": {"$in": ids}})
+            self.counts["documents_deleted"] += result.deleted_count
+        while self._objects_to_delete:
+            batch, self._objects_to_delete = self._objects_to_delete[:1000], self._objects_to_delete[1000:]
+            results = await delete_multiple_files_from_r2(batch)  # Runs in a worker thread; the merge's event loop keeps serving
+            self.counts["objects_deleted"] += sum(1 for ok in results.values() if ok)
+
+    def progress(self) -> Dict[str, Any]:
+        return {**self.counts, "samples": self.samples}
+
+
+async def run_r2_reconcile(jobs_collection: AsyncIOMotorCollection, job: Dict[str, Any]) -> None:
+    """
+    One pass over R2 and MongoDB as a merge-join: R2 lists keys under the prefix
+    in sorted order, recordings are streamed sorted by object_key, and both
+    cursors advance together. Memory holds one page from each side, pending
+    deletes, and the set of speaker ids. Progress (last merged key and counts)
+    is checkpointed, so an interrupted job resumes where it stopped.
+    """
+    job_id: ObjectId = job["_id"]
+    params = job["params"]
+    progress = job.get("progress") or {}
+    prefix = params.get("prefix", "recordings/")
+    start_after = progress.get("last_key")
+
+    rec_collection = get_recordings_collection()
+    revisions_collection = get_revisions_collection()
+    spk_collection = get_speakers_collection()
+    speaker_ids = {doc["_id"] async for doc in spk_collection.find({}, {"_id": 1})}
+    reconciler = _Reconciler(params, progress, spk_collection, speaker_ids)
+
+    objects = _r2_objects(prefix, start_after)
+    documents = _recordings_by_key(rec_collection, prefix, start_after)
+    obj = await anext(objects, None)
+    doc = await anext(documents, None)
+    since_checkpoint = 0
+    last_key = start_after
+
+    while obj is not None or doc is not None:
+        if doc is None or (obj is not None and obj["Key"] < doc["object_key"]):
+            reconciler.counts["objects_scanned"] += 1
+            reconciler.orphan_object(obj)
+            last_key = obj["Key"]
+            obj = await anext(objects, None)
+        elif obj is None or doc["object_key"] < obj["Key"]:
+            reconciler.counts["documents_scanned"] += 1
+            reconciler.orphan_document(doc)
+            last_key = doc["object_key"]
+            doc = await anext(documents, None)
+        else:
+            key = obj["Key"]
+            reconciler.counts["objects_scanned"] += 1
+            while doc is not None and doc["object_key"] == key:  # Several documents may share a key
+                reconciler.counts["documents_scanned"] += 1
+                await reconciler.matched(doc)
+                doc = await anext(documents, None)
+            last_key = key
+            obj = await anext(objects, None)
+
+        since_checkpoint += 1
+        if since_checkpoint >= CHECKPOINT_EVERY:
+            since_checkpoint = 0
+            # Every key up to last_key is settled on both sides, so a resume can start after it
+            await reconciler.flush(rec_collection, revisions_collection)
+            await jobs.update_progress(jobs_collection, job_id, {"last_key": last_key, **reconciler.progress()})
+
+    await reconciler.flush(rec_collection, revisions_collection)
+    await jobs.update_progress(jobs_collection, job_id, {"last_key": last_key, **reconciler.progress()})
+    if reconciler.counts["documents_deleted"]:
+        try:
+            await stats.recompute_stats(get_stats_collection(), rec_collection, spk_collection)
+            await coverage.coverage_cache.invalidate()
+        except Exception as e:
+            logger.error(f"Reconcile job {job_id}: failed to refresh stats/coverage after deleting documents: {e}")
+    logger.info(f"Reconcile job {job_id} finished: " + ", ".join(f"{k}={v}" for k, v in reconciler.counts.items()))
+
+
+jobs.register_job_type(JOB_TYPE, run_r2_reconcile)
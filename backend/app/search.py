@@ -0,0 +1,39 @@
+# app/search.py
+import re
+import unicodedata
+from typing import Dict, Optional
+
+# Twi open vowels are separate letters (not accented e/o), so Unicode
+# decomposition alone would keep them distinct from what people type.
+TWI_LETTER_MAP = str.maketrans({
+    "ɛ": "e",
+    "ɔ": "o",
+    "ŋ": "n",
+})
+
+SEARCH_FIELDS = ("search_prompt", "search_transcription")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_twi_text(text: Optional[str]) -> str:
+    """
+    Folds case, tone marks/diacritics and the Twi letters ɛ/ɔ so that
+    'Ɛyɛ', 'ɛyɛ' and 'eye' all normalize to 'eye'.
+    Applied to both stored text and queries.
+    """
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _WHITESPACE.sub(" ", stripped.translate(TWI_LETTER_MAP)).strip()
+
+
+def search_fields(prompt_text: Optional[str] = None, transcription: Optional[str] = None) -> Dict[str, str]:
+    """Normalized copies of the searchable fields, stored alongside the originals for the text index."""
+    fields: Dict[str, str] = {}
+    if prompt_text is not None:
+        fields["search_prompt"] = normalize_twi_text(prompt_text)
+    if transcription is not None:
+        fields["search_transcription"] = normalize_twi_text(transcription)
+    return fields
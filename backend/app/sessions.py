@@ -0,0 +1,84 @@
+# app/sessions.py
+import logging
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from .catalog import get_catalog
+from .database import NOT_DELETED
+from .models import SessionSummary
+
+logger = logging.getLogger(__name__)
+
+
+def _session_pipeline(match: Dict[str, Any], sort: Dict[str, int]) -> List[Dict[str, Any]]:
+    """
+    One pass over recordings (every take, tombstones excluded), grouped by
+    session. `sort` follows the index serving `match`, ending in uploaded_at.
+    """
+    return [
+        {"$match": {**match, **NOT_DELETED}},
+        {"$sort": sort},
+        {"$group": {
+            "_id": "$session_id",
+            "speaker_id": {"$first": "$speaker_id"},
+            "participant_code": {"$first": "$participant_code"},
+            "take_count": {"$sum": 1},
+            "current_take_count": {"$sum": {"$cond": [{"$eq": ["$is_current", True]}, 1, 0]}},
+            "prompt_ids": {"$addToSet": "$prompt_id"},
+            "total_duration_ms": {"$sum": {"$ifNull": ["$recording_duration", 0]}},
+            "started_at": {"$min": "$uploaded_at"},
+            "ended_at": {"$max": "$uploaded_at"},
+            "last_prompt_id": {"$last": "$prompt_id"},
+        }},
+        {"$sort": {"started_at": -1}},
+    ]
+
+
+def _to_summary(row: Dict[str, Any]) -> SessionSummary:
+    catalog = get_catalog()
+    prompt_count = sum(1 for prompt_id in row.get("prompt_ids", []) if prompt_id in catalog)
+    return SessionSummary(
+        session_id=row["_id"],
+        speaker_id=str(row["speaker_id"]),
+        participant_code=row.get("participant_code") or "",
+        take_count=row["take_count"],
+        current_take_count=row["current_take_count"],
+        prompt_count=prompt_count,
+        total_duration_ms=row.get("total_duration_ms") or 0,
+        started_at=row["started_at"],
+        ended_at=row["ended_at"],
+        last_prompt_id=row.get("last_prompt_id"),
+        completion_ratio=round(prompt_count / len(catalog), 4) if len(catalog) else 0.0,
+    )
+
+
+async def get_speaker_sessions(
+    rec_collection: AsyncIOMotorCollection,
+    speaker_id: ObjectId
+) -> List[SessionSummary]:
+    """
+    Summarizes every recording session of a speaker, most recent first, through
+    the (speaker_id, session_id, uploaded_at) index.
+    """
+    rows = await rec_collection.aggregate(_session_pipeline(
+        {"speaker_id": speaker_id, "session_id": {"$ne": None}},
+        {"speaker_id": 1, "session_id": 1, "uploaded_at": 1}
+    )).to_list(length=None)
+    return [_to_summary(row) for row in rows]
+
+
+async def get_session(
+    rec_collection: AsyncIOMotorCollection,
+    session_id: str
+) -> Optional[SessionSummary]:
+    """
+    Summarizes one session in a single aggregation through the (session_id,
+    uploaded_at) index over all takes, so a session whose takes were all
+    re-recorded later is still found.
+    """
+    rows = await rec_collection.aggregate(
+        _session_pipeline({"session_id": session_id}, {"session_id": 1, "uploaded_at": 1})
+    ).to_list(length=1)
+    return _to_summary(rows[0]) if rows else None
@@ -0,0 +1,145 @@
+# app/speaker_deletion.py
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from . import coverage, jobs, stats
+from .config import settings
+from .database import get_recordings_collection, get_revisions_collection, get_speakers_collection, get_stats_collection
+from .r2 import delete_multiple_files_from_r2
+
+logger = logging.getLogger(__name__)
+
+JOB_TYPE = "speaker_delete"
+# R2 delete_objects accepts at most 1000 keys per call
+MAX_BATCH_SIZE = 1000
+# Object keys whose R2 delete failed, kept in the job progress
+FAILED_KEYS_SAMPLE = 100
+
+
+def _batch_size() -> int:
+    return max(1, min(settings.DELETE_BATCH_SIZE, MAX_BATCH_SIZE))
+
+
+async def _next_speaker(
+    spk_collection: AsyncIOMotorCollection,
+    params: Dict[str, Any],
+    after: Optional[ObjectId]
+) -> Optional[Dict[str, Any]]:
+    # One speaker at a time in _id order, so no cursor stays open across long batches
+    query: Dict[str, Any] = {} if params.get("all") else {"participant_code": {"$in": params.get("participant_codes", [])}}
+    if after is not None:
+        query["_id"] = {"$gt": after}
+    docs = await spk_collection.find(query, {"participant_code": 1}).sort("_id", 1).limit(1).to_list(length=1)
+    return docs[0] if docs else None
+
+
+class _SpeakerDeleter:
+    """Deletes one speaker's recordings batch by batch: R2 objects first, then documents and revisions."""
+
+    def __init__(self, jobs_collection: AsyncIOMotorCollection, job_id: ObjectId, progress: Dict[str, Any]):
+        self.jobs_collection = jobs_collection
+        self.job_id = job_id
+        self.rec_collection = get_recordings_collection()
+        self.revisions_collection = get_revisions_collection()
+        self.counts = {key: progress.get(key, 0) for key in (
+            "speakers_deleted", "recordings_deleted", "objects_deleted", "objects_failed",
+        )}
+        self.failed_keys: List[str] = list(progress.get("failed_keys", []))
+        self.speakers_incomplete: List[str] = list(progress.get("speakers_incomplete", []))
+
+    def progress(self) -> Dict[str, Any]:
+        return {**self.counts, "failed_keys": self.failed_keys, "speakers_incomplete": self.speakers_incomplete}
+
+    async def _delete_batch(self, batch: List[Dict[str, Any]]) -> int:
+        """Deletes a batch of recordings; returns how many were kept because their R2 object could not be deleted."""
+        keys = [doc["object_key"] for doc in batch if doc.get("object_key")]
+        results = await delete_multiple_files_from_r2(keys) if keys else {}
+        failed = [key for key, ok in results.items() if not ok]
+        self.counts["objects_deleted"] += len(results) - len(failed)
+        self.counts["objects_failed"] += len(failed)
+        self.failed_keys.extend(failed[:FAILED_KEYS_SAMPLE - len(self.failed_keys)])
+
+        # A document whose object is still in R2 stays, so a later run can retry it
+        ids = [doc["_id"] for doc in batch if results.get(doc.get("object_key"), True)]
+        if ids:
+            result = await self.rec_collection.delete_many({"_id": {"$in": ids}})
+            await self.revisions_collection.delete_many({"recording_id": {"$in": ids}})
+            self.counts["recordings_deleted"] += result.deleted_count
+        return len(batch) - len(ids)
+
+    async def delete_recordings(self, speaker: Dict[str, Any]) -> int:
+        """Deletes every recording of the speaker; returns how many had to be kept."""
+        size = _batch_size()
+        kept = 0
+        last_id: Optional[ObjectId] = None
+        while True:
+            query: Dict[str, Any] = {"speaker_id": speaker["_id"]}
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}  # Step past documents kept after an R2 failure
+            batch = await self.rec_collection.find(query, {"object_key": 1}).sort("_id", 1).limit(size).to_list(length=size)
+            if not batch:
+                return kept
+            last_id = batch[-1]["_id"]
+            kept += await self._delete_batch(batch)
+            # Checkpoint (and honour cancel requests) after every batch
+            await jobs.update_progress(
+                self.jobs_collection, self.job_id,
+                {"current_speaker": speaker.get("participant_code"), **self.progress()}
+            )
+            if settings.DELETE_BATCH_PAUSE_SECONDS > 0:
+                await asyncio.sleep(settings.DELETE_BATCH_PAUSE_SECONDS)  # Leave room for foreground traffic
+
+
+async def run_speaker_delete(jobs_collection: AsyncIOMotorCollection, job: Dict[str, Any]) -> None:
+    """
+    Deletes speakers (the listed participant codes, or all of them) together with
+    their recordings, transcription revisions and R2 objects, one speaker at a time
+    in _id order. Each speaker's recordings go in batches of DELETE_BATCH_SIZE: a
+    single delete_objects call to R2, then one delete_many per collection, then a
+    progress checkpoint. The speaker document is removed last, so an interrupted
+    job resumes at the speaker it was working on and simply finds fewer recordings.
+    """
+    job_id: ObjectId = job["_id"]
+    params = job["params"]
+    progress = job.get("progress") or {}
+    last_speaker = progress.get("last_speaker_id")
+    after = ObjectId(last_speaker) if last_speaker else None
+
+    spk_collection = get_speakers_collection()
+    deleter = _SpeakerDeleter(jobs_collection, job_id, progress)
+
+    while True:
+        speaker = await _next_speaker(spk_collection, params, after)
+        if speaker is None:
+            break
+        code = speaker.get("participant_code")
+        kept = await deleter.delete_recordings(speaker)
+        if kept:
+            logger.warning(f"Speaker delete job {job_id}: kept speaker {code}; {kept} R2 object(s) could not be deleted.")
+            if code not in deleter.speakers_incomplete:
+                deleter.speakers_incomplete.append(code)
+        else:
+            await spk_collection.delete_one({"_id": speaker["_id"]})
+            deleter.counts["speakers_deleted"] += 1
+            # Uploads that arrived while the speaker was being deleted
+            await deleter.delete_recordings(speaker)
+        after = speaker["_id"]
+        await jobs.update_progress(
+            jobs_collection, job_id,
+            {"last_speaker_id": str(after), "current_speaker": None, **deleter.progress()}
+        )
+
+    if deleter.counts["speakers_deleted"] or deleter.counts["recordings_deleted"]:
+        try:
+            await stats.recompute_stats(get_stats_collection(), get_recordings_collection(), spk_collection)
+            await coverage.coverage_cache.invalidate()
+        except Exception as e:
+            logger.error(f"Speaker delete job {job_id}: failed to refresh stats/coverage: {e}")
+    logger.info(f"Speaker delete job {job_id} finished: " + ", ".join(f"{k}={v}" for k, v in deleter.counts.items()))
+
+
+jobs.register_job_type(JOB_TYPE, run_speaker_delete)
@@ -0,0 +1,232 @@
+# app/stats.py
+from motor.motor_asyncio import AsyncIOMotorCollection
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime
+import pytz
+
+from .catalog import get_catalog
+from .config import settings
+from .database import NOT_DELETED
+from .models import DatasetStats, RecordingDocument, SpeakerDocument
+
+logger = logging.getLogger(__name__)
+
+try:
+    ghana_tz = pytz.timezone('Africa/Accra')
+except pytz.UnknownTimeZoneError:
+    ghana_tz = pytz.utc
+
+# All counters live in a single document so dashboards read one _id lookup.
+STATS_DOCUMENT_ID = "global"
+UNKNOWN_BUCKET = "unknown"
+
+# Recording fields broken down in the stats document -> counter map name
+BREAKDOWN_FIELDS = {
+    "dialect": "recordings_by_dialect",
+    "gender": "recordings_by_gender",
+    "age_range": "recordings_by_age_range",
+    "section": "recordings_by_section",
+    "transcription_status": "recordings_by_transcription_status",
+}
+
+
+def prompt_section(prompt_id: str) -> str:
+    """
+    Looks up the script section of a prompt in the catalog. Prompt ids from older
+    scripts fall back to their prefix (e.g. 'ScriptA_12' -> 'ScriptA').
+    """
+    if not prompt_id:
+        return UNKNOWN_BUCKET
+    section_id = get_catalog().section_of(prompt_id)
+    if section_id:
+        return section_id
+    return prompt_id.rsplit("_", 1)[0] if "_" in prompt_id else prompt_id
+
+
+def _bucket_key(value: Optional[Any]) -> str:
+    """Makes a value safe to use as a key inside a MongoDB field path."""
+    if value is None or str(value).strip() == "":
+        return UNKNOWN_BUCKET
+    key = str(value).strip().replace(".", "_")
+    if key.startswith("$"):
+        key = "_" + key[1:]
+    return key
+
+
+async def _apply_increments(stats_collection: AsyncIOMotorCollection, increments: Dict[str, int]) -> None:
+    """
+    Applies $inc counters to the stats document.
+    The document is not upserted: if it does not exist yet, the next read
+    recomputes it from scratch, so partial counters are never served.
+    """
+    increments = {k: v for k, v in increments.items() if v}
+    if not increments:
+        return
+    await stats_collection.update_one(
+        {"_id": STATS_DOCUMENT_ID},
+        {"$inc": increments, "$set": {"updated_at": datetime.now(ghana_tz)}}
+    )
+
+
+async def record_upload(
+    stats_collection: AsyncIOMotorCollection,
+    recording: RecordingDocument,
+    speaker: Optional[SpeakerDocument] = None,
+    speaker_created: bool = False
+) -> None:
+    """Incrementally counts a newly stored recording (and new speaker, if any)."""
+    if not settings.DERIVED_UPDATES_INLINE:
+        return  # Counted by the change-stream consumer (app/events.py)
+    increments: Dict[str, int] = {
+        "total_recordings": 1,
+        "total_duration_ms": recording.recording_duration or 0,
+        "total_size_bytes": recording.size_bytes or 0,
+        "total_speakers": 1 if speaker_created else 0,
+    }
+    values = {
+        "dialect": speaker.dialect if speaker else None,
+        "gender": speaker.gender if speaker else None,
+        "age_range": speaker.age_range if speaker else None,
+        "section": prompt_section(recording.prompt_id),
+        "transcription_status": recording.transcription_status,
+    }
+    for field, counter in BREAKDOWN_FIELDS.items():
+        increments[f"{counter}.{_bucket_key(values[field])}"] = 1
+    await _apply_increments(stats_collection, increments)
+
+
+async def record_breakdown_change(
+    stats_collection: AsyncIOMotorCollection,
+    field: str,
+    old_value: Optional[str],
+    new_value: Optional[str],
+    count: int = 1
+) -> None:
+    """Moves `count` recordings from one bucket of a breakdown (see BREAKDOWN_FIELDS) to another."""
+    if not settings.DERIVED_UPDATES_INLINE:
+        return  # Applied by the change-stream consumer (app/events.py)
+    old_key, new_key = _bucket_key(old_value), _bucket_key(new_value)
+    if old_key == new_key or count <= 0:
+        return
+    counter = BREAKDOWN_FIELDS[field]
+    await _apply_increments(stats_collection, {
+        f"{counter}.{old_key}": -count,
+        f"{counter}.{new_key}": count,
+    })
+
+
+async def record_transcription_status_change(
+    stats_collection: AsyncIOMotorCollection,
+    old_status: Optional[str],
+    new_status: Optional[str],
+    count: int = 1
+) -> None:
+    """Moves `count` recordings from one transcription status bucket to another."""
+    await record_breakdown_change(stats_collection, "transcription_status", old_status, new_status, count)
+
+
+def _document_increments(doc: Optional[Dict[str, Any]], sign: int) -> Dict[str, int]:
+    """Counters a raw recording document contributes (nothing if absent or soft-deleted), times `sign`."""
+    if not doc or doc.get("deleted_at") is not None:
+        return {}
+    increments = {
+        "total_recordings": sign,
+        "total_duration_ms": sign * (doc.get("recording_duration") or 0),
+        "total_size_bytes": sign * (doc.get("size_bytes") or 0),
+    }
+    values = {
+        "dialect": doc.get("speaker_dialect"),
+        "gender": doc.get("speaker_gender"),
+        "age_range": doc.get("speaker_age_range"),
+        "section": prompt_section(doc.get("prompt_id")),
+        "transcription_status": doc.get("transcription_status"),
+    }
+    for field, counter in BREAKDOWN_FIELDS.items():
+        increments[f"{counter}.{_bucket_key(values[field])}"] = sign
+    return increments
+
+
+async def record_document_changes(
+    stats_collection: AsyncIOMotorCollection,
+    changes: List[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]],
+    speaker_delta: int = 0
+) -> None:
+    """
+    Applies (before, after) pairs of raw recording documents as one $inc: the
+    before image is uncounted and the after image counted. Used by the
+    change-stream consumer; None stands for "did not exist".
+    """
+    increments: Dict[str, int] = {"total_speakers": speaker_delta}
+    for before, after in changes:
+        for sign, doc in ((-1, before), (1, after)):
+            for key, value in _document_increments(doc, sign).items():
+                increments[key] = increments.get(key, 0) + value
+    await _apply_increments(stats_collection, increments)
+
+
+async def recompute_stats(
+    stats_collection: AsyncIOMotorCollection,
+    rec_collection: AsyncIOMotorCollection,
+    spk_collection: AsyncIOMotorCollection
+) -> DatasetStats:
+    """
+    Rebuilds the stats document from the raw collections with one aggregation.
+    Used to seed the document and to repair drift in the incremental counters.
+    Demographics come from the snapshot stored on each recording, so no join is needed.
+    """
+    logger.info("Recomputing dataset statistics from raw collections...")
+    pipeline = [
+        {"$match": NOT_DELETED},
+        {"$facet": {
+            "totals": [{"$group": {
+                "_id": None,
+                "count": {"$sum": 1},
+                "duration": {"$sum": {"$ifNull": ["$recording_duration", 0]}},
+                "size": {"$sum": {"$ifNull": ["$size_bytes", 0]}},
+            }}],
+            "dialect": [{"$group": {"_id": "$speaker_dialect", "count": {"$sum": 1}}}],
+            "gender": [{"$group": {"_id": "$speaker_gender", "count": {"$sum": 1}}}],
+            "age_range": [{"$group": {"_id": "$speaker_age_range", "count": {"$sum": 1}}}],
+            # Grouped by prompt here and folded into sections below (few hundred prompts at most)
+            "section": [{"$group": {"_id": "$prompt_id", "count": {"$sum": 1}}}],
+            "transcription_status": [{"$group": {"_id": "$transcription_status", "count": {"$sum": 1}}}],
+        }}
+    ]
+    results = await rec_collection.aggregate(pipeline).to_list(length=1)
+    facets = results[0] if results else {}
+
+    totals = (facets.get("totals") or [{}])[0]
+    now = datetime.now(ghana_tz)
+    stats_dict: Dict[str, Any] = {
+        "total_recordings": totals.get("count", 0),
+        "total_speakers": await spk_collection.count_documents({}),
+        "total_duration_ms": totals.get("duration", 0),
+        "total_size_bytes": totals.get("size", 0),
+        "updated_at": now,
+        "recomputed_at": now,
+    }
+    for field, counter in BREAKDOWN_FIELDS.items():
+        breakdown: Dict[str, int] = {}
+        for row in facets.get(field, []):
+            value = prompt_section(row["_id"]) if field == "section" else row["_id"]
+            key = _bucket_key(value)
+            breakdown[key] = breakdown.get(key, 0) + row["count"]
+        stats_dict[counter] = breakdown
+
+    await stats_collection.replace_one({"_id": STATS_DOCUMENT_ID}, stats_dict, upsert=True)
+    logger.info(f"Dataset statistics recomputed: {stats_dict['total_recordings']} recordings, {stats_dict['total_speakers']} speakers.")
+    return DatasetStats(**stats_dict)
+
+
+async def get_stats(
+    stats_collection: AsyncIOMotorCollection,
+    rec_collection: AsyncIOMotorCollection,
+    spk_collection: AsyncIOMotorCollection
+) -> DatasetStats:
+    """Returns the precomputed stats document, seeding it on first use."""
+    stats_dict = await stats_collection.find_one({"_id": STATS_DOCUMENT_ID})
+    if not stats_dict or not stats_dict.get("recomputed_at"):
+        return await recompute_stats(stats_collection, rec_collection, spk_collection)
+    stats_dict.pop("_id", None)
+    return DatasetStats(**stats_dict)
@@ -0,0 +1,174 @@
+# app/tombstones.py
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+import pytz
+
+from .config import settings
+from .crud import resolve_current_takes
+from .database import NOT_DELETED
+from .models import RecordingDeletionSummary
+from .r2 import delete_multiple_files_from_r2
+
+logger = logging.getLogger(__name__)
+
+try:
+    ghana_tz = pytz.timezone('Africa/Accra')
+except pytz.UnknownTimeZoneError:
+    ghana_tz = pytz.utc
+
+# Set on a recording when it is soft-deleted, removed again on restore
+TOMBSTONE_FIELDS = ("deleted_at", "deletion_id", "deleted_was_current")
+
+
+def purge_after(deleted_at: datetime) -> datetime:
+    return deleted_at + timedelta(hours=settings.SOFT_DELETE_RETENTION_HOURS)
+
+
+async def soft_delete_recordings(
+    collection: AsyncIOMotorCollection,
+    query: Dict[str, Any]
+) -> Tuple[str, int, datetime]:
+    """
+    Tombstones the live recordings matching `query` under a new deletion id:
+    deleted_at is set and is_current cleared, so every read stops seeing them
+    at once, while the documents and R2 objects stay until the purger runs.
+    Returns (deletion id, recordings tombstoned, deleted_at).
+    """
+    deletion_id = str(ObjectId())
+    now = datetime.now(ghana_tz)
+    deleted = 0
+    # Whether each take was current is kept so a restore can put it back
+    for was_current, current_filter in ((True, True), (False, {"$ne": True})):
+        result = await collection.update_many(
+            {**query, **NOT_DELETED, "is_current": current_filter},
+            {"$set": {"deleted_at": now, "deletion_id": deletion_id, "deleted_was_current": was_current, "is_current": False}}
+        )
+        deleted += result.modified_count
+    logger.warning(f"Soft-deleted {deleted} recordings (deletion {deletion_id}); purge after {purge_after(now).isoformat()}.")
+    return deletion_id, deleted, now
+
+
+async def list_deletions(collection: AsyncIOMotorCollection) -> List[RecordingDeletionSummary]:
+    """Deletions that still have tombstones, most recent first (served by the tombstone_deletion_id index)."""
+    rows = await collection.aggregate([
+        {"$match": {"deletion_id": {"$exists": True}}},
+        {"$group": {"_id": "$deletion_id", "recording_count": {"$sum": 1}, "deleted_at": {"$min": "$deleted_at"}}},
+        {"$sort": {"deleted_at": -1}},
+    ]).to_list(length=None)
+    return [
+        RecordingDeletionSummary(
+            deletion_id=row["_id"],
+            recording_count=row["recording_count"],
+            deleted_at=row["deleted_at"],
+            purge_after=purge_after(row["deleted_at"]),
+        )
+        for row in rows
+    ]
+
+
+async def restore_deletion(
+    collection: AsyncIOMotorCollection,
+    deletion_id: str,
+    batch_size: Optional[int] = None
+) -> int:
+    """
+    Brings back the recordings of a deletion, in batches. Takes that were current
+    become current again unless a newer take of the same prompt was uploaded
+    meanwhile. Only tombstones inside the retention window are restored: older
+    ones belong to the purger, which may already have deleted their R2 objects.
+    Returns how many recordings were restored.
+    """
+    size = batch_size or settings.DELETE_BATCH_SIZE
+    window_start = datetime.now(ghana_tz) - timedelta(hours=settings.SOFT_DELETE_RETENTION_HOURS)
+    restored = 0
+    unset = {field: "" for field in TOMBSTONE_FIELDS}
+    while True:
+        batch = await collection.find(
+            {"deletion_id": deletion_id, "deleted_at": {"$gte": window_start}}, {"deleted_was_current": 1, "speaker_id": 1, "prompt_id": 1}
+        ).limit(size).to_list(length=size)
+        if not batch:
+            break
+        current_ids = [doc["_id"] for doc in batch if doc.get("deleted_was_current")]
+        other_ids = [doc["_id"] for doc in batch if not doc.get("deleted_was_current")]
+        if current_ids:
+            result = await collection.update_many({"_id": {"$in": current_ids}}, {"$set": {"is_current": True}, "$unset": unset})
+            restored += result.modified_count
+            await resolve_current_takes(collection, list({(doc["speaker_id"], doc.get("prompt_id")) for doc in batch if doc.get("deleted_was_current")}))
+        if other_ids:
+            result = await collection.update_many({"_id": {"$in": other_ids}}, {"$unset": unset})
+            restored += result.modified_count
+    logger.info(f"Restored {restored} recordings from deletion {deletion_id}.")
+    return restored
+
+
+async def purge_tombstones(
+    collection: AsyncIOMotorCollection,
+    revisions_collection: Optional[AsyncIOMotorCollection] = None,
+    retention_hours: Optional[float] = None,
+    batch_size: Optional[int] = None,
+    pause_seconds: Optional[float] = None
+) -> Tuple[int, List[str]]:
+    """
+    Physically removes recordings tombstoned more than `retention_hours` ago,
+    oldest first through the (deleted_at, _id) tombstone index: per batch, one R2
+    delete_objects call (in a worker thread, so requests keep being served
+    while it runs), then the documents whose objects were removed and
+    their transcription history, then a pause. Documents whose R2 delete failed
+    stay tombstoned and are retried on the next run.
+    Returns (documents deleted, failed object keys).
+    """
+    hours = settings.SOFT_DELETE_RETENTION_HOURS if retention_hours is None else retention_hours
+    size = max(1, min(batch_size or settings.DELETE_BATCH_SIZE, 1000))  # delete_objects takes at most 1000 keys
+    pause = settings.DELETE_BATCH_PAUSE_SECONDS if pause_seconds is None else pause_seconds
+    cutoff = datetime.now(ghana_tz) - timedelta(hours=hours)
+    db_deleted = 0
+    failed_keys: List[str] = []
+    position: Optional[Tuple[datetime, ObjectId]] = None
+    while True:
+        query: Dict[str, Any] = {"deleted_at": {"$lt": cutoff}}
+        if position is not None:
+            # Step past documents kept after an R2 failure
+            query["$or"] = [{"deleted_at": {"$gt": position[0]}}, {"deleted_at": position[0], "_id": {"$gt": position[1]}}]
+        batch = await collection.find(query, {"deleted_at": 1, "object_key": 1}).sort(
+            [("deleted_at", 1), ("_id", 1)]
+        ).limit(size).to_list(length=size)
+        if not batch:
+            break
+        position = (batch[-1]["deleted_at"], batch[-1]["_id"])
+        keys = [doc["object_key"] for doc in batch if doc.get("object_key")]
+        results = await delete_multiple_files_from_r2(keys) if keys else {}
+        batch_failed = {key for key, ok in results.items() if not ok}
+        failed_keys.extend(batch_failed)
+        ids = [doc["_id"] for doc in batch if doc.get("object_key") not in batch_failed]
+        if ids:
+            result = await collection.delete_many({"_id": {"$in": ids}, "deleted_at": {"$lt": cutoff}})  # Not if restored meanwhile
+            db_deleted += result.deleted_count
+            if revisions_collection is not None:
+                await revisions_collection.delete_many({"recording_id": {"$in": ids}})
+        if pause > 0:
+            await asyncio.sleep(pause)  # Spread the purge so foreground traffic keeps its share
+    if db_deleted or failed_keys:
+        logger.info(f"Purged {db_deleted} tombstoned recordings; {len(failed_keys)} R2 deletes failed.")
+    return db_deleted, failed_keys
+
+
+async def run_purger(collection_getter, revisions_getter, interval_seconds: Optional[int] = None) -> None:
+    """
+    Background loop purging expired tombstones; cancelled at shutdown. Every
+    worker runs one; overlapping purges are harmless (R2 and MongoDB deletes
+    are idempotent).
+    """
+    interval = interval_seconds or settings.TOMBSTONE_PURGE_INTERVAL_SECONDS
+    while True:
+        try:
+            await purge_tombstones(collection_getter(), revisions_getter())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Tombstone purge iteration failed: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,128 @@
+# app/transcription_queue.py
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId, errors
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ReturnDocument
+import pytz
+
+from .config import settings
+from .crud import LEASE_FIELDS, _convert_objectid_to_str, spontaneous_prompt_filter
+from .models import RecordingDocument
+
+logger = logging.getLogger(__name__)
+
+try:
+    ghana_tz = pytz.timezone('Africa/Accra')
+except pytz.UnknownTimeZoneError:
+    ghana_tz = pytz.utc
+
+
+class LeaseNotHeldError(Exception):
+    """Raised when renewing/releasing a recording the transcriber does not hold a live lease on."""
+
+
+def _parse_recording_id(recording_id_str: str) -> ObjectId:
+    try:
+        return ObjectId(recording_id_str)
+    except errors.InvalidId:
+        raise ValueError(f"Invalid recording ID format: {recording_id_str}")
+
+
+async def claim_recordings(
+    collection: AsyncIOMotorCollection,
+    transcriber: str,
+    count: int = 1,
+    lease_seconds: Optional[int] = None,
+    spontaneous_only: bool = True
+) -> Tuple[datetime, List[RecordingDocument]]:
+    """
+    Atomically claims up to `count` pending recordings, oldest first.
+    Each claim is a find_one_and_update on an unleased (or expired) document,
+    so concurrent transcribers never receive the same recording.
+    """
+    now = datetime.now(ghana_tz)
+    lease_expires_at = now + timedelta(seconds=lease_seconds or settings.TRANSCRIPTION_LEASE_SECONDS)
+    claim_filter: Dict[str, Any] = {
+        "transcription_status": "pending",
+        "is_current": True,
+        "$and": [{"$or": [{"lease_expires_at": None}, {"lease_expires_at": {"$lt": now}}]}],
+    }
+    if spontaneous_only:
+        claim_filter["$and"].append(spontaneous_prompt_filter())
+
+    claimed: List[RecordingDocument] = []
+    for _ in range(count):
+        doc = await collection.find_one_and_update(
+            claim_filter,
+            {"$set": {"lease_owner": transcriber, "lease_expires_at": lease_expires_at}},
+            sort=[("uploaded_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+        if not doc:
+            break
+        claimed.append(RecordingDocument(**_convert_objectid_to_str(doc)))
+    logger.info(f"Transcriber {transcriber} claimed {len(claimed)} recording(s) until {lease_expires_at.isoformat()}.")
+    return lease_expires_at, claimed
+
+
+async def renew_lease(
+    collection: AsyncIOMotorCollection,
+    recording_id_str: str,
+    transcriber: str,
+    lease_seconds: Optional[int] = None
+) -> RecordingDocument:
+    """Extends a live lease held by `transcriber`."""
+    obj_id = _parse_recording_id(recording_id_str)
+    now = datetime.now(ghana_tz)
+    doc = await collection.find_one_and_update(
+        {"_id": obj_id, "lease_owner": transcriber, "lease_expires_at": {"$gte": now}},
+        {"$set": {"lease_expires_at": now + timedelta(seconds=lease_seconds or settings.TRANSCRIPTION_LEASE_SECONDS)}},
+        return_document=ReturnDocument.AFTER
+    )
+    if not doc:
+        raise LeaseNotHeldError(f"{transcriber} does not hold a live lease on recording {recording_id_str}.")
+    return RecordingDocument(**_convert_objectid_to_str(doc))
+
+
+async def release_lease(
+    collection: AsyncIOMotorCollection,
+    recording_id_str: str,
+    transcriber: str
+) -> None:
+    """Returns a claimed recording to the queue without transcribing it."""
+    obj_id = _parse_recording_id(recording_id_str)
+    result = await collection.update_one(
+        {"_id": obj_id, "lease_owner": transcriber},
+        {"$unset": {field: "" for field in LEASE_FIELDS}}
+    )
+    if result.matched_count == 0:
+        raise LeaseNotHeldError(f"{transcriber} does not hold a lease on recording {recording_id_str}.")
+    logger.info(f"Transcriber {transcriber} released recording {recording_id_str}.")
+
+
+async def reclaim_expired_leases(collection: AsyncIOMotorCollection) -> int:
+    """Clears expired leases so the documents show as unclaimed again."""
+    result = await collection.update_many(
+        {"lease_expires_at": {"$lt": datetime.now(ghana_tz)}},
+        {"$unset": {field: "" for field in LEASE_FIELDS}}
+    )
+    if result.modified_count:
+        logger.info(f"Reclaimed {result.modified_count} expired transcription lease(s).")
+    return result.modified_count
+
+
+async def run_lease_reaper(collection_getter, interval_seconds: Optional[int] = None) -> None:
+    """Background loop reclaiming expired leases; cancelled at shutdown."""
+    interval = interval_seconds or settings.LEASE_REAPER_INTERVAL_SECONDS
+    while True:
+        try:
+            await reclaim_expired_leases(collection_getter())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Lease reaper iteration failed: {e}")
+        await asyncio.sleep(interval)
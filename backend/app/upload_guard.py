@@ -0,0 +1,189 @@
+# app/upload_guard.py
+import json
+import logging
+import re
+from typing import Dict, Optional
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_PATH = "/upload/audio"
+# Bytes of the request kept for finding the file part and sniffing its first bytes
+HEAD_LIMIT = 64 * 1024
+SNIFF_BYTES = 16
+
+_FILE_PART_RE = re.compile(
+    rb'content-disposition:[^\r\n]*\bname="file"[^\r\n]*\r\n(?:[^\r\n]+\r\n)*\r\n', re.IGNORECASE
+)
+_PART_TYPE_RE = re.compile(rb'content-type:\s*([^\r\n;]+)', re.IGNORECASE)
+
+# Canonical content type of each container recognised by sniff_audio()
+SNIFFED_TYPES = {
+    "mp4": "audio/mp4", "wav": "audio/wav", "mp3": "audio/mpeg", "ogg": "audio/ogg",
+    "flac": "audio/flac", "webm": "audio/webm", "caf": "audio/x-caf", "amr": "audio/amr",
+}
+
+
+class RequestRejected(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def sniff_audio(head: bytes) -> Optional[str]:
+    """Names the audio container from its first bytes, or None if it is not one we accept."""
+    if head[4:8] == b"ftyp":
+        return "mp4"  # m4a, mp4, 3gp (AAC in an MP4 container, the app's recorder format)
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if head[:3] == b"ID3" or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return "mp3"  # MPEG audio or ADTS AAC frame sync
+    if head[:4] == b"OggS":
+        return "ogg"
+    if head[:4] == b"fLaC":
+        return "flac"
+    if head[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"
+    if head[:4] == b"caff":
+        return "caf"
+    if head[:5] == b"#!AMR":
+        return "amr"
+    return None
+
+
+def max_bytes_for(content_type: Optional[str]) -> int:
+    """Request size limit for an upload whose file has this content type (0 = unlimited)."""
+    return settings.UPLOAD_MAX_BYTES_BY_TYPE.get(content_type or "", settings.UPLOAD_MAX_BYTES)
+
+
+def max_bytes_any() -> int:
+    """The largest limit of any content type: nothing bigger can be acceptable (0 = unlimited)."""
+    if not settings.UPLOAD_MAX_BYTES:
+        return 0
+    return max([settings.UPLOAD_MAX_BYTES, *settings.UPLOAD_MAX_BYTES_BY_TYPE.values()])
+
+
+class _BodyInspector:
+    """
+    Follows the multipart body as it streams in: counts bytes against the limit,
+    and once the 'file' part's headers and first bytes have arrived, applies the
+    limit for its content type and checks its magic bytes.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.received = 0
+        self.head = b""
+        self.inspected = False
+        self.rejection: Optional[RequestRejected] = None
+
+    def feed(self, chunk: bytes, more_body: bool) -> None:
+        try:
+            self._feed(chunk, more_body)
+        except RequestRejected as e:
+            self.rejection = e
+            raise
+
+    def _feed(self, chunk: bytes, more_body: bool) -> None:
+        self.received += len(chunk)
+        if not self.inspected:
+            self.head += chunk[:HEAD_LIMIT - len(self.head)]
+            self._inspect(final=not more_body or len(self.head) >= HEAD_LIMIT)
+        if self.limit and self.received > self.limit:
+            raise RequestRejected(413, f"Upload exceeds the {self.limit} byte limit.")
+
+    def _inspect(self, final: bool) -> None:
+        match = _FILE_PART_RE.search(self.head)
+        if match is None or (len(self.head) - match.end() < SNIFF_BYTES and not final):
+            if final:
+                self.inspected = True  # No file part in the first bytes: only the size limit applies
+            return
+        self.inspected = True
+        type_match = _PART_TYPE_RE.search(match.group(0))
+        declared = type_match.group(1).strip().decode("latin-1").lower() if type_match else None
+        kind = sniff_audio(self.head[match.end():match.end() + SNIFF_BYTES])
+        if kind is None and settings.UPLOAD_SNIFF_AUDIO:
+            logger.warning(f"Rejecting upload: file part (declared {declared}) is not a recognised audio container.")
+            raise RequestRejected(415, "Uploaded file is not a supported audio format.")
+        if declared not in settings.UPLOAD_MAX_BYTES_BY_TYPE and kind:
+            declared = SNIFFED_TYPES[kind]
+        self.limit = max_bytes_for(declared)
+
+
+async def _reject(send, error: RequestRejected) -> None:
+    body = json.dumps({"detail": error.detail}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": error.status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"connection", b"close"),  # The rest of the body is never read
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class UploadGuardMiddleware:
+    """
+    ASGI middleware for POST /upload/audio that rejects oversized or non-audio
+    uploads while the body is still streaming in: 413 from Content-Length or the
+    running byte count (limit per content type), 415 when the file part's magic
+    bytes are not an audio container. A bad request costs the first few kilobytes.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] != UPLOAD_PATH:
+            await self.app(scope, receive, send)
+            return
+
+        ceiling = max_bytes_any()
+        headers: Dict[bytes, bytes] = dict(scope.get("headers", []))
+        content_length = headers.get(b"content-length")
+        if content_length and content_length.isdigit() and ceiling and int(content_length) > ceiling:
+            await _reject(send, RequestRejected(413, f"Upload exceeds the {ceiling} byte limit."))
+            return
+
+        inspector = _BodyInspector(ceiling)
+        response_started = False
+        answered = False
+
+        async def guarded_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                inspector.feed(message.get("body", b""), message.get("more_body", False))
+            return message
+
+        async def answer(error: RequestRejected):
+            nonlocal response_started, answered
+            response_started = answered = True
+            logger.warning(f"Upload rejected after {inspector.received} bytes: {error.detail}")
+            await _reject(send, error)
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if answered:
+                return
+            if inspector.rejection is not None and not response_started:
+                # FastAPI turns errors raised while parsing the form into a 400;
+                # answer with the real reason instead and drop the app's response.
+                if message["type"] == "http.response.start":
+                    await answer(inspector.rejection)
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, guarded_receive, tracking_send)
+        except RequestRejected as e:
+            if response_started:
+                if answered:
+                    return
+                raise
+            await answer(e)
@@ -0,0 +1,208 @@
+# app/webdataset_export.py
+import asyncio
+import io
+import json
+import logging
+import os
+import shutil
+import tarfile
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from . import jobs
+from .config import settings
+from .crud import build_recording_query
+from .database import get_recordings_collection
+from .models import RecordingFilter
+from .r2 import download_object_bytes, upload_path_to_r2
+
+logger = logging.getLogger(__name__)
+
+JOB_TYPE = "webdataset_export"
+
+# Recording fields written to each sample's .json member
+METADATA_FIELDS = (
+    "participant_code", "speaker_id", "prompt_id", "prompt_text", "session_id",
+    "speaker_dialect", "speaker_gender", "speaker_age_range",
+    "transcription", "transcription_status", "transcribed_by",
+    "recording_duration", "content_type", "size_bytes", "uploaded_at", "object_key",
+)
+
+
+def shard_name(index: int) -> str:
+    return f"shard-{index:06d}.tar"
+
+
+def _sample_metadata(doc: Dict[str, Any]) -> bytes:
+    metadata = {"id": str(doc["_id"])}
+    for field in METADATA_FIELDS:
+        value = doc.get(field)
+        if isinstance(value, ObjectId):
+            value = str(value)
+        elif isinstance(value, datetime):
+            value = value.isoformat()
+        metadata[field] = value
+    return json.dumps(metadata, ensure_ascii=False).encode("utf-8")
+
+
+def _add_member(tar: tarfile.TarFile, name: str, data: bytes, mtime: float) -> None:
+    info = tarfile.TarInfo(name=name)
+    info.size = len(data)
+    info.mtime = mtime
+    tar.addfile(info, io.BytesIO(data))
+
+
+def _add_sample(tar: tarfile.TarFile, key: str, extension: str, audio: bytes, metadata: bytes) -> None:
+    """Writes one WebDataset sample: '<key>.<ext>' audio and '<key>.json' metadata, adjacent in the tar."""
+    mtime = time.time()
+    _add_member(tar, f"{key}.{extension}", audio, mtime)
+    _add_member(tar, f"{key}.json", metadata, mtime)
+
+
+def _select_shard(docs: List[Dict[str, Any]], max_shard_bytes: int) -> List[Dict[str, Any]]:
+    """Cuts a batch of documents at the shard byte budget (always keeping at least one)."""
+    selected, total = [], 0
+    for doc in docs:
+        size = doc.get("size_bytes") or 0
+        if selected and total + size > max_shard_bytes:
+            break
+        selected.append(doc)
+        total += size
+    return selected
+
+
+async def _write_shard(path: str, docs: List[Dict[str, Any]], concurrency: int) -> Dict[str, int]:
+    """
+    Streams the shard's objects from R2 and appends each sample to the tar file as
+    it arrives. `concurrency` workers fetch objects into a queue of the same size,
+    and a worker whose result does not fit waits for the tar writer, so at most
+    2 * concurrency objects are in memory. If a fetch fails, the remaining fetches
+    are cancelled and the error propagates.
+    """
+    pending = iter(docs)
+    results: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+
+    async def fetch() -> None:
+        for doc in pending:  # Shared iterator: each document is taken by one worker
+            try:
+                audio = await download_object_bytes(doc["object_key"])
+            except Exception as e:
+                await results.put((doc, e))
+                return
+            await results.put((doc, audio))
+
+    samples, audio_bytes, missing = 0, 0, 0
+    workers = [asyncio.create_task(fetch()) for _ in range(min(concurrency, len(docs)))]
+    tar = await asyncio.to_thread(tarfile.open, path, "w")
+    try:
+        for _ in range(len(docs)):
+            doc, audio = await results.get()
+            if isinstance(audio, Exception):
+                raise audio
+            if audio is None:
+                logger.warning(f"Export: R2 object {doc['object_key']} for recording {doc['_id']} is missing, skipped.")
+                missing += 1
+                continue
+            extension = os.path.splitext(doc["object_key"])[1].lstrip(".").lower() or "m4a"
+            await asyncio.to_thread(_add_sample, tar, str(doc["_id"]), extension, audio, _sample_metadata(doc))
+            samples += 1
+            audio_bytes += len(audio)
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        await asyncio.to_thread(tar.close)
+    return {"samples": samples, "audio_bytes": audio_bytes, "missing": missing}
+
+
+async def _store(path: str, destination: str, prefix: str, name: str) -> str:
+    """Moves a finished file to its destination and returns where it went."""
+    if destination == "local":
+        root = os.path.realpath(settings.EXPORT_LOCAL_DIR)
+        target_dir = os.path.realpath(os.path.join(root, prefix))
+        if os.path.commonpath([root, target_dir]) != root:
+            # The request model rejects such prefixes; symlinks could still lead out
+            raise ValueError(f"Export prefix {prefix!r} resolves outside EXPORT_LOCAL_DIR.")
+        os.makedirs(target_dir, exist_ok=True)
+        target = os.path.join(target_dir, name)
+        await asyncio.to_thread(shutil.move, path, target)
+        return target
+    key = f"{prefix.rstrip('/')}/{name}"
+    await upload_path_to_r2(path, key, content_type="application/x-tar")
+    return key
+
+
+async def run_webdataset_export(jobs_collection: AsyncIOMotorCollection, job: Dict[str, Any]) -> None:
+    """
+    Packs recordings (ordered by _id) into tar shards one at a time. After each
+    shard is stored, the job records the shard count and the last _id packed, so
+    a resumed job continues with the next shard.
+    """
+    job_id: ObjectId = job["_id"]
+    params = job["params"]
+    progress = job.get("progress") or {}
+    destination = params.get("destination", "r2")
+    prefix = params.get("prefix") or f"exports/webdataset/{job_id}"
+    max_samples = params.get("max_samples_per_shard", 1000)
+    max_shard_bytes = params.get("max_shard_bytes", 512 * 1024 * 1024)
+    concurrency = params.get("concurrency") or settings.EXPORT_DOWNLOAD_CONCURRENCY
+
+    rec_collection = get_recordings_collection("analytics")  # Long scan: keep it off the ingest path
+    base_query = build_recording_query(
+        RecordingFilter(transcription_status=params.get("transcription_status")),
+        include_superseded=params.get("include_superseded", False)
+    )
+    shard_index = progress.get("shards_completed", 0)
+    last_id = ObjectId(progress["last_id"]) if progress.get("last_id") else None
+    totals = {key: progress.get(key, 0) for key in ("samples", "audio_bytes", "missing")}
+    if not progress:
+        await jobs.update_progress(jobs_collection, job_id, {
+            "total_recordings": await rec_collection.count_documents(base_query),
+            "shards_completed": 0, "samples": 0, "audio_bytes": 0, "missing": 0, "shards": [],
+        })
+
+    with tempfile.TemporaryDirectory(prefix="webdataset-") as work_dir:
+        while True:
+            query = dict(base_query)
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            batch = await rec_collection.find(query).sort("_id", 1).limit(max_samples).to_list(length=max_samples)
+            docs = _select_shard(batch, max_shard_bytes)
+            if not docs:
+                break
+
+            name = shard_name(shard_index)
+            path = os.path.join(work_dir, name)
+            counts = await _write_shard(path, docs, concurrency)
+            location = await _store(path, destination, prefix, name)
+            if os.path.exists(path):
+                os.remove(path)
+
+            shard_index += 1
+            last_id = docs[-1]["_id"]
+            for key in totals:
+                totals[key] += counts[key]
+            logger.info(f"Export job {job_id}: stored {location} ({counts['samples']} samples).")
+            await jobs.update_progress(
+                jobs_collection, job_id,
+                {"shards_completed": shard_index, "last_id": str(last_id), **totals},
+                push={"shards": location},
+            )
+
+        manifest_path = os.path.join(work_dir, "manifest.json")
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "job_id": str(job_id),
+                "shards": [shard_name(i) for i in range(shard_index)],
+                "params": params,
+                **totals,
+            }, f, indent=2)
+        await _store(manifest_path, destination, prefix, "manifest.json")
+
+
+jobs.register_job_type(JOB_TYPE, run_webdataset_export)
@@ -0,0 +1,32 @@
+# gunicorn.conf.py
+# Production server: gunicorn -c gunicorn.conf.py app.main:app
+#
+# Each worker is a separate process running its own event loop, Mongo and R2
+# clients (created in the app's lifespan handler after the fork) and its own
+# in-process caches, kept coherent through version stamps in MongoDB.
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", max(2, multiprocessing.cpu_count())))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Importing the app once in the master makes forks cheap. This is safe because
+# importing app.main creates no clients or sockets; they are built per worker.
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+# SIGTERM: workers stop accepting connections, refuse new uploads with 503 and
+# wait for in-flight uploads (SHUTDOWN_DRAIN_SECONDS) before closing clients.
+# graceful_timeout must leave room for that wait before gunicorn kills the worker.
+graceful_timeout = int(os.getenv("SHUTDOWN_DRAIN_SECONDS", "25")) + 5
+# Large uploads on slow mobile connections can take a while
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info")
+
+
+def post_fork(server, worker):
+    server.log.info(f"Worker {worker.pid} started; clients are created by the app's lifespan start-up.")
@@ -0,0 +1,74 @@
+"""
+Measures API start-up time.
+
+  python scripts/bench_startup.py              # import time of app.main (fresh interpreter per run)
+  python scripts/bench_startup.py --lifespan   # also time lifespan start-up/shutdown (needs MongoDB)
+
+Run from the backend directory. Import timing does not need R2 or MongoDB
+credentials; the lifespan run uses the normal .env settings.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that should stay out of the import path until an endpoint needs them
+HEAVY_MODULES = ("pandas", "openpyxl", "boto3")
+
+IMPORT_SNIPPET = f"""
+import sys, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+loaded = [name for name in {HEAVY_MODULES!r} if name in sys.modules]
+print(elapsed, ",".join(loaded))
+"""
+
+
+def time_imports(runs: int):
+    env = dict(os.environ)
+    timings, loaded = [], ""
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET], cwd=BACKEND_DIR, env=env,
+            capture_output=True, text=True, check=True
+        )
+        elapsed, loaded = result.stdout.strip().splitlines()[-1].partition(" ")[::2]
+        timings.append(float(elapsed))
+    return timings, loaded
+
+
+async def time_lifespan():
+    sys.path.insert(0, BACKEND_DIR)
+    from app.main import app
+
+    start = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter() - start
+        stop = time.perf_counter()
+    return ready, time.perf_counter() - stop
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Fresh-interpreter import runs (default 5)")
+    parser.add_argument("--lifespan", action="store_true", help="Also time lifespan start-up and shutdown")
+    args = parser.parse_args()
+
+    timings, loaded = time_imports(args.runs)
+    print(f"import app.main: median {statistics.median(timings) * 1000:.0f} ms, "
+          f"min {min(timings) * 1000:.0f} ms, max {max(timings) * 1000:.0f} ms over {args.runs} runs")
+    print(f"heavy modules loaded at import: {loaded or 'none'}")
+
+    if args.lifespan:
+        ready, shutdown = asyncio.run(time_lifespan())
+        print(f"lifespan start-up: {ready * 1000:.0f} ms, shutdown: {shutdown * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# tests/conftest.py
+import asyncio
+import os
+import sys
+import uuid
+
+import motor.motor_asyncio
+import pytest
+
+# Run from the backend directory: `python -m pytest tests`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import database  # noqa: E402
+
+# A single-node replica set is enough: `mongod --replSet rs0` then `rs.initiate()` once
+TEST_MONGODB_URI = os.environ.get("TEST_MONGODB_URI", "mongodb://localhost:27017/?directConnection=true")
+
+_skip_reason = None
+
+
+@pytest.fixture
+def run_on_replica_set():
+    """
+    Runs an async test against a throwaway database on TEST_MONGODB_URI, with
+    app.database pointed at it. Skips when no replica set is reachable (change
+    streams need one); the database is dropped afterwards.
+    """
+    def run(test):
+        async def main():
+            global _skip_reason
+            if _skip_reason:
+                pytest.skip(_skip_reason)
+            client = motor.motor_asyncio.AsyncIOMotorClient(TEST_MONGODB_URI, serverSelectionTimeoutMS=1000)
+            try:
+                hello = await client.admin.command("hello")
+                if not hello.get("setName"):
+                    _skip_reason = f"MongoDB at {TEST_MONGODB_URI} is not a replica set"
+            except Exception as e:
+                _skip_reason = f"No MongoDB at {TEST_MONGODB_URI}: {e}"
+            if _skip_reason:
+                client.close()
+                pytest.skip(_skip_reason)
+
+            db = client[f"test_{uuid.uuid4().hex[:12]}"]
+            previous = database.db
+            database.db = db
+            try:
+                await test(db)
+            finally:
+                database.db = previous
+                await client.drop_database(db.name)
+                client.close()
+
+        asyncio.run(main())
+
+    return run
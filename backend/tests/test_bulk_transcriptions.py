@@ -0,0 +1,93 @@
+# tests/test_bulk_transcriptions.py
+import csv
+import io
+from datetime import datetime
+
+from bson import ObjectId
+
+from app.bulk_transcriptions import _to_stored_timestamp, parse_transcription_file, rows_to_items
+from app.crud import EXPORT_COLUMNS, export_row
+from app.models import BulkTranscriptionItem, BulkTranscriptionRowResult
+
+
+def _recording(**fields):
+    return {
+        "_id": ObjectId(),
+        "speaker_id": ObjectId(),
+        "participant_code": "TWI_Speaker_001",
+        "prompt_id": "ScriptA_1",
+        "prompt_text": "Ɛte sɛn?",
+        "uploaded_at": datetime(2026, 3, 1, 9, 30),
+        "is_current": True,
+        **fields,
+    }
+
+
+def _export_csv(docs):
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    for doc in docs:
+        writer.writerow({key: "" if value is None else value for key, value in export_row(doc).items()})
+    return output.getvalue().encode("utf-8-sig")
+
+
+def test_export_row_carries_the_recording_id():
+    doc = _recording()
+    row = export_row(doc)
+    assert list(row) == EXPORT_COLUMNS
+    assert row["id"] == str(doc["_id"])
+    assert row["speaker_id"] == str(doc["speaker_id"])
+
+
+def test_exported_csv_is_accepted_by_the_bulk_import():
+    edited_at = datetime(2026, 3, 2, 12, 0, 0, 123000)
+    docs = [
+        _recording(transcription="Me ho yɛ", transcription_status="transcribed",
+                   transcription_updated_at=edited_at, transcription_version=3, transcribed_by="t1"),
+        _recording(),  # Never transcribed
+    ]
+    rows = parse_transcription_file("export.csv", _export_csv(docs))
+    rows[1]["transcription"] = "Aane"  # Filled in by the transcriber
+    items = rows_to_items(rows)
+
+    assert all(isinstance(item, BulkTranscriptionItem) for item in items)
+    assert [item.recording_id for item in items] == [str(doc["_id"]) for doc in docs]
+    assert items[0].expected_version == 3
+    assert items[0].transcribed_by == "t1"
+    assert _to_stored_timestamp(items[0].transcription_updated_at) == edited_at
+    assert items[1].expected_version == 0
+    assert items[1].transcription_updated_at is None
+
+
+def test_exported_excel_is_accepted_by_the_bulk_import():
+    import pandas as pd
+
+    docs = [_recording(transcription="Me ho yɛ", transcription_version=1)]
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine="openpyxl") as writer:
+        pd.DataFrame([export_row(doc) for doc in docs]).to_excel(writer, index=False, sheet_name="Recordings")
+
+    items = rows_to_items(parse_transcription_file("export.xlsx", output.getvalue()))
+    assert [item.recording_id for item in items] == [str(docs[0]["_id"])]
+    assert items[0].transcription == "Me ho yɛ"
+    assert items[0].expected_version == 1
+
+
+def test_rows_to_items_reports_invalid_rows_and_keeps_going():
+    rows = [
+        {"recording_id": "a1", "transcription": "Aane", "transcription_version": ""},
+        {"id": "b2", "transcription": "Daabi", "transcription_version": "two"},
+        {"id": "c3", "transcription": "Yoo", "transcription_updated_at": "yesterday"},
+        {"id": "d4", "transcription": "Me da wo ase", "transcribed_by": "", "transcription_version": "4"},
+    ]
+    first, second, third, fourth = rows_to_items(rows)
+
+    assert isinstance(first, BulkTranscriptionItem)
+    assert (first.recording_id, first.expected_version) == ("a1", None)
+    for result, row, recording_id in ((second, 2, "b2"), (third, 3, "c3")):
+        assert isinstance(result, BulkTranscriptionRowResult)
+        assert (result.row, result.recording_id, result.status) == (row, recording_id, "invalid")
+        assert result.detail
+    assert isinstance(fourth, BulkTranscriptionItem)
+    assert (fourth.expected_version, fourth.transcribed_by) == (4, None)
@@ -0,0 +1,146 @@
+# tests/test_events.py
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from pymongo.errors import OperationFailure
+
+from app import events, stats
+from app.config import settings
+
+
+@pytest.fixture(autouse=True)
+def event_settings(monkeypatch):
+    monkeypatch.setattr(settings, "DERIVED_UPDATES_INLINE", False)
+    monkeypatch.setattr(settings, "EVENT_BATCH_SIZE", 100)
+    monkeypatch.setattr(settings, "EVENT_BATCH_WAIT_MS", 50)
+    monkeypatch.setattr(settings, "EVENT_LEASE_SECONDS", 30)
+
+
+async def wait_for(condition, timeout: float = 10) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        result = condition()
+        if asyncio.iscoroutine(result):
+            result = await result
+        if result:
+            return
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out waiting for the change stream")
+        await asyncio.sleep(0.05)
+
+
+async def stop(task: asyncio.Task) -> None:
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+def test_lease_passes_to_another_worker_only_after_expiry(run_on_replica_set, monkeypatch):
+    async def test(db):
+        checkpoints = db.event_checkpoints
+        tailer = events.ChangeStreamTailer(events.RECORDINGS)
+
+        monkeypatch.setattr(events, "WORKER_ID", "worker-a")
+        checkpoint = await tailer._acquire_lease(checkpoints)
+        assert checkpoint["lease_owner"] == "worker-a"
+
+        monkeypatch.setattr(events, "WORKER_ID", "worker-b")
+        assert await tailer._acquire_lease(checkpoints) is None
+
+        await checkpoints.update_one(
+            {"_id": events.RECORDINGS},
+            {"$set": {"lease_expires_at": datetime.now(events.ghana_tz) - timedelta(seconds=1)}}
+        )
+        checkpoint = await tailer._acquire_lease(checkpoints)
+        assert checkpoint["lease_owner"] == "worker-b"
+
+        # The previous leader notices at its next checkpoint and stops tailing
+        monkeypatch.setattr(events, "WORKER_ID", "worker-a")
+        assert not await tailer._checkpoint(checkpoints, None)
+        monkeypatch.setattr(events, "WORKER_ID", "worker-b")
+        assert await tailer._checkpoint(checkpoints, None)
+
+    run_on_replica_set(test)
+
+
+def test_resume_token_is_saved_and_a_new_leader_resumes_after_it(run_on_replica_set, monkeypatch):
+    received = []
+
+    async def capture(batch):
+        received.extend(event["fullDocument"]["n"] for event in batch if event["operationType"] == "insert")
+
+    monkeypatch.setattr(events, "CONSUMERS", {events.RECORDINGS: [events.Consumer("capture", capture)], events.SPEAKERS: []})
+
+    async def test(db):
+        recordings, checkpoints = db.audio_recordings, db.event_checkpoints
+        # Start from a known point so the first insert cannot race the stream opening
+        async with recordings.watch() as change_stream:
+            await change_stream.try_next()
+            start_token = change_stream.resume_token
+        await checkpoints.insert_one({"_id": events.RECORDINGS, "resume_token": start_token})
+
+        monkeypatch.setattr(events, "WORKER_ID", "worker-a")
+        first = asyncio.create_task(events.ChangeStreamTailer(events.RECORDINGS).run())
+        await recordings.insert_one({"n": 1})
+        await wait_for(lambda: received == [1])
+
+        async def token_saved():
+            checkpoint = await checkpoints.find_one({"_id": events.RECORDINGS})
+            return checkpoint.get("resume_token") not in (None, start_token)
+        await wait_for(token_saved)
+        await stop(first)
+
+        # Written while no worker is tailing; the next leader must pick it up, and only it
+        await recordings.insert_one({"n": 2})
+        await checkpoints.update_one({"_id": events.RECORDINGS}, {"$set": {"lease_owner": None}})
+        monkeypatch.setattr(events, "WORKER_ID", "worker-b")
+        second = asyncio.create_task(events.ChangeStreamTailer(events.RECORDINGS).run())
+        await wait_for(lambda: len(received) >= 2)
+        await asyncio.sleep(0.3)
+        await stop(second)
+        assert received == [1, 2]
+
+    run_on_replica_set(test)
+
+
+def test_stats_consumer_applies_update_deltas_from_pre_images(run_on_replica_set):
+    async def test(db):
+        try:
+            await db.create_collection(events.RECORDINGS, changeStreamPreAndPostImages={"enabled": True})
+        except OperationFailure as e:
+            pytest.skip(f"Change stream pre-images need MongoDB 6.0+: {e}")
+        recordings, stats_collection = db.audio_recordings, db.dataset_stats
+        await stats.recompute_stats(stats_collection, recordings, db.speakers)
+
+        async with recordings.watch(full_document_before_change="whenAvailable") as change_stream:
+            result = await recordings.insert_one({
+                "prompt_id": "TestSection_1", "speaker_dialect": "Asante", "transcription_status": "pending",
+                "recording_duration": 1000, "size_bytes": 10,
+            })
+            recording = {"_id": result.inserted_id}
+            await recordings.update_one(recording, {"$set": {"transcription_status": "transcribed", "recording_duration": 1500}})
+            await recordings.update_one(recording, {"$set": {"lease_owner": "someone"}})  # Not a stats field
+            await recordings.update_one(recording, {"$set": {"deleted_at": datetime.now(events.ghana_tz)}})
+            batch = [await change_stream.next() for _ in range(4)]
+
+        consumer = events._StatsConsumer()
+        await consumer.recordings(batch[:3])
+        doc = await stats_collection.find_one({"_id": stats.STATS_DOCUMENT_ID})
+        assert doc["total_recordings"] == 1
+        assert doc["total_duration_ms"] == 1500
+        assert doc["total_size_bytes"] == 10
+        # One $inc per batch: the insert's +1 and the update's -1 on "pending" cancel out
+        assert doc["recordings_by_transcription_status"] == {"transcribed": 1}
+        assert doc["recordings_by_dialect"] == {"Asante": 1}
+        assert doc["recordings_by_section"] == {"TestSection": 1}
+
+        # Soft delete: the pre-image is uncounted and the tombstone adds nothing
+        await consumer.recordings(batch[3:])
+        doc = await stats_collection.find_one({"_id": stats.STATS_DOCUMENT_ID})
+        assert doc["total_recordings"] == 0
+        assert doc["total_duration_ms"] == 0
+        assert doc["recordings_by_transcription_status"] == {"transcribed": 0}
+        assert consumer._recompute_task is None  # Every change had a pre-image
+
+    run_on_replica_set(test)
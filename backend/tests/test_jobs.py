@@ -0,0 +1,66 @@
+# tests/test_jobs.py
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from app import jobs
+from app.config import settings
+
+
+@pytest.fixture(autouse=True)
+def job_settings(monkeypatch):
+    monkeypatch.setattr(settings, "JOB_HEARTBEAT_SECONDS", 0.05)
+    monkeypatch.setattr(settings, "JOB_HEARTBEAT_TIMEOUT_SECONDS", 1)
+
+
+@pytest.fixture
+def blocking_job_type(monkeypatch):
+    release = asyncio.Event()
+
+    async def runner(jobs_collection, job):
+        await release.wait()
+
+    monkeypatch.setitem(jobs.JOB_RUNNERS, "test_blocking", runner)
+    return release
+
+
+def _stale():
+    return datetime.now(jobs.ghana_tz) - timedelta(seconds=5)
+
+
+def test_a_running_job_is_resumable_only_after_its_heartbeat_stops(run_on_replica_set, blocking_job_type):
+    async def test(db):
+        collection = db.jobs
+        job = await jobs.create_job(collection, "test_blocking", {})
+        assert (await jobs.start_job(collection, job.id)).status == "running"
+        assert await jobs.start_job(collection, job.id) is None  # Heartbeat is live
+
+        first_beat = (await collection.find_one({"_id": ObjectId(job.id)}))["updated_at"]
+        await asyncio.sleep(0.3)
+        assert (await collection.find_one({"_id": ObjectId(job.id)}))["updated_at"] > first_beat
+
+        # The process was killed: the document stays running and its heartbeat ages
+        task = jobs._running[job.id]
+        await collection.update_one({"_id": ObjectId(job.id)}, {"$set": {"run_id": "killed", "updated_at": _stale()}})
+        await asyncio.sleep(0.3)
+        assert task.done()  # A run that lost the job stops instead of racing the new owner
+
+        await collection.update_one({"_id": ObjectId(job.id)}, {"$set": {"updated_at": _stale()}})
+        assert (await jobs.start_job(collection, job.id)).status == "running"
+        blocking_job_type.set()
+        await asyncio.sleep(0.1)
+        assert (await collection.find_one({"_id": ObjectId(job.id)}))["status"] == "completed"
+
+    run_on_replica_set(test)
+
+
+def test_a_running_job_without_heartbeat_is_cancelled_at_once(run_on_replica_set, blocking_job_type):
+    async def test(db):
+        collection = db.jobs
+        job = await jobs.create_job(collection, "test_blocking", {})
+        await collection.update_one({"_id": ObjectId(job.id)}, {"$set": {"status": "running", "updated_at": _stale()}})
+        assert (await jobs.request_cancel(collection, job.id)).status == "cancelled"
+
+    run_on_replica_set(test)
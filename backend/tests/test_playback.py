@@ -0,0 +1,33 @@
+# tests/test_playback.py
+import pytest
+
+from app.playback import RangeNotSatisfiable, parse_range
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=900-5000", (900, 999)),  # End clamped to the object
+    ("bytes=-100", (900, 999)),  # Suffix: the last 100 bytes
+    ("bytes=-5000", (0, 999)),
+    (" bytes=5-5 ", (5, 5)),
+    (None, None),
+    ("", None),
+    ("bytes=-", None),
+    ("bytes=0-10,20-30", None),  # Multiple ranges: the whole object is sent
+    ("items=0-10", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header, size", [
+    ("bytes=1000-", 1000),
+    ("bytes=50-10", 1000),
+    ("bytes=-0", 1000),
+    ("bytes=-10", 0),
+])
+def test_unsatisfiable_ranges(header, size):
+    with pytest.raises(RangeNotSatisfiable) as excinfo:
+        parse_range(header, size)
+    assert excinfo.value.size == size
@@ -0,0 +1,82 @@
+# tests/test_query_guard.py
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from app.crud import build_recording_query
+from app.models import RecordingFilter
+from app.query_guard import QueryIndexGuard, _bounded_fields, _covers_partial_filter, query_shape
+
+DIALECT_STATUS = [("speaker_dialect", 1), ("transcription_status", 1), ("uploaded_at", -1)]
+
+
+def test_query_shape_ignores_values_but_keeps_fields_and_operators():
+    a = build_recording_query(RecordingFilter(session_id="s1", min_duration_ms=1000))
+    b = build_recording_query(RecordingFilter(session_id="s2", min_duration_ms=5))
+    c = build_recording_query(RecordingFilter(session_id="s1", max_duration_ms=1000))
+    assert query_shape(a) == query_shape(b)
+    assert query_shape(a) != query_shape(c)  # $gte vs $lte
+    assert query_shape({"$or": [{"a": 1}, {"b": 2}]}) == (("$or", ((("a", "?"),), (("b", "?"),))),)
+
+
+def test_bounded_fields_follow_the_index_prefix():
+    assert _bounded_fields(DIALECT_STATUS, {"speaker_dialect": "Asante", "transcription_status": "pending"}) == {
+        "speaker_dialect", "transcription_status"}
+    # uploaded_at comes after a gap in the prefix: only the dialect is bounded
+    assert _bounded_fields(DIALECT_STATUS, {"speaker_dialect": "Asante", "uploaded_at": {"$gte": datetime(2026, 1, 1)}}) == {
+        "speaker_dialect"}
+    # The leading field is missing: the index only supplies the order
+    assert _bounded_fields(DIALECT_STATUS, {"transcription_status": "pending"}) == set()
+
+
+def test_bounded_fields_stop_after_a_range_or_an_unbounded_operator():
+    keys = [("prompt_id", 1), ("uploaded_at", -1)]
+    assert _bounded_fields(keys, {"prompt_id": {"$regex": "^ScriptA_"}, "uploaded_at": {"$lt": 1}}) == {"prompt_id"}
+    assert _bounded_fields(keys, {"prompt_id": {"$in": ["a", "b"]}, "uploaded_at": {"$lt": 1}}) == {"prompt_id", "uploaded_at"}
+    assert _bounded_fields(keys, {"prompt_id": {"$regex": "ScriptA"}}) == set()
+    assert _bounded_fields(keys, {"prompt_id": {"$ne": "a"}}) == set()
+
+
+def test_partial_indexes_are_usable_only_when_the_query_implies_their_filter():
+    current = build_recording_query(RecordingFilter(session_id="s1"))
+    all_takes = build_recording_query(RecordingFilter(session_id="s1"), include_superseded=True)
+    assert _covers_partial_filter({"is_current": True}, current)
+    assert not _covers_partial_filter({"is_current": True}, all_takes)
+    assert _covers_partial_filter({}, all_takes)
+    assert not _covers_partial_filter({"deleted_at": {"$exists": True}}, all_takes)  # deleted_at: None
+    assert _covers_partial_filter({"deleted_at": {"$exists": True}}, {"deleted_at": {"$lt": 1}})
+
+
+class _Collection:
+    """index_information() of audio_recordings for a few of the indexes in database.py."""
+
+    name = "audio_recordings"
+
+    async def index_information(self):
+        current = {"is_current": True}
+        return {
+            "_id_": {"key": [("_id", 1)]},
+            "uploaded_at": {"key": [("uploaded_at", -1)]},
+            "session_id_uploaded_at": {"key": [("session_id", 1), ("uploaded_at", 1)]},
+            "current_uploaded_at": {"key": [("uploaded_at", -1)], "partialFilterExpression": current},
+            "current_recording_duration": {"key": [("recording_duration", 1)], "partialFilterExpression": current},
+            "current_dialect_status_uploaded_at": {"key": DIALECT_STATUS, "partialFilterExpression": current},
+            "search_text": {"key": [("_fts", "text"), ("_ftsx", 1)]},
+        }
+
+
+@pytest.mark.parametrize("filters, include_superseded, indexed", [
+    ({}, False, True),
+    ({}, True, True),
+    ({"min_duration_ms": 1000}, False, True),
+    ({"min_duration_ms": 1000}, True, False),  # Duration is indexed for current takes only
+    ({"session_id": "s1"}, True, True),
+    ({"dialect": "Asante"}, False, True),
+    ({"transcription_status": "pending"}, False, False),  # Not the leading field of any index here
+    ({"uploaded_from": datetime(2026, 1, 1)}, True, True),
+])
+def test_is_indexed_judges_the_filter_against_the_index_definitions(filters, include_superseded, indexed):
+    query = build_recording_query(RecordingFilter(**filters), include_superseded)
+    verdict = asyncio.run(QueryIndexGuard().is_indexed(_Collection(), query, [("uploaded_at", -1)]))
+    assert verdict is indexed
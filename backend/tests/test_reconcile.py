@@ -0,0 +1,48 @@
+# tests/test_reconcile.py
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from app import r2, reconcile
+
+
+class _SlowR2Client:
+    def __init__(self):
+        self.batches = []
+
+    def delete_objects(self, Bucket, Delete):
+        self.batches.append((threading.get_ident(), len(Delete["Objects"])))
+        time.sleep(0.2)
+        return {"Deleted": [{"Key": obj["Key"]} for obj in Delete["Objects"]]}
+
+
+def test_flush_deletes_orphan_objects_in_batches_off_the_event_loop(monkeypatch):
+    client = _SlowR2Client()
+    monkeypatch.setattr(r2, "get_s3_client", lambda: client)
+    reconciler = reconcile._Reconciler({"delete_orphan_objects": True, "grace_hours": 1}, {}, None, set())
+    old = datetime.now(timezone.utc) - timedelta(days=1)
+    for i in range(1500):
+        reconciler.orphan_object({"Key": f"audio/{i:04d}.wav", "LastModified": old})
+    reconciler.orphan_object({"Key": "audio/new.wav", "LastModified": datetime.now(timezone.utc)})
+
+    async def main():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.create_task(tick())
+        await reconciler.flush(None, None)  # No documents queued, so MongoDB is not touched
+        ticker.cancel()
+        return ticks
+
+    ticks = asyncio.run(main())
+    assert [size for _, size in client.batches] == [1000, 500]
+    assert threading.get_ident() not in {thread for thread, _ in client.batches}
+    assert ticks > 10
+    assert reconciler.counts["objects_deleted"] == 1500
+    assert reconciler.counts["objects_in_grace_period"] == 1
@@ -0,0 +1,56 @@
+# tests/test_tombstones.py
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta
+
+from app import r2, tombstones
+
+
+class _SlowR2Client:
+    """Stands in for boto3: blocks like a real round trip and fails one key."""
+
+    def __init__(self):
+        self.calls = []
+
+    def delete_objects(self, Bucket, Delete):
+        self.calls.append(threading.get_ident())
+        time.sleep(0.3)
+        keys = [obj["Key"] for obj in Delete["Objects"]]
+        return {
+            "Deleted": [{"Key": key} for key in keys if key != "fails.wav"],
+            "Errors": [{"Key": "fails.wav", "Code": "InternalError", "Message": "try again"}],
+        }
+
+
+def test_purge_keeps_the_event_loop_serving_and_retains_failed_deletes(run_on_replica_set, monkeypatch):
+    client = _SlowR2Client()
+    monkeypatch.setattr(r2, "get_s3_client", lambda: client)
+
+    async def test(db):
+        recordings, revisions = db.audio_recordings, db.transcription_revisions
+        expired = datetime.now(tombstones.ghana_tz) - timedelta(days=30)
+        await recordings.insert_many([
+            {"object_key": "gone.wav", "deleted_at": expired},
+            {"object_key": "fails.wav", "deleted_at": expired},
+            {"object_key": "live.wav", "deleted_at": None},
+        ])
+
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.create_task(tick())
+        deleted, failed = await tombstones.purge_tombstones(recordings, revisions, retention_hours=1, pause_seconds=0)
+        ticker.cancel()
+
+        assert client.calls and threading.get_ident() not in client.calls
+        assert ticks > 10  # The loop kept running during the R2 round trip
+        assert (deleted, failed) == (1, ["fails.wav"])
+        assert sorted(doc["object_key"] for doc in await recordings.find().to_list(None)) == ["fails.wav", "live.wav"]
+
+    run_on_replica_set(test)
@@ -0,0 +1,95 @@
+# tests/test_upload_guard.py
+import pytest
+
+from app import upload_guard
+from app.config import settings
+from app.upload_guard import HEAD_LIMIT, RequestRejected, _BodyInspector, sniff_audio
+
+M4A = b"\x00\x00\x00\x20ftypM4A \x00\x00\x00\x00"
+WAV = b"RIFF\x24\x08\x00\x00WAVEfmt "
+BOUNDARY = b"----guardtest"
+
+
+@pytest.fixture(autouse=True)
+def upload_limits(monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_MAX_BYTES", 1000)
+    monkeypatch.setattr(settings, "UPLOAD_MAX_BYTES_BY_TYPE", {"audio/wav": 5000})
+    monkeypatch.setattr(settings, "UPLOAD_SNIFF_AUDIO", True)
+
+
+def _part(name: str, value: bytes, filename: str = None, content_type: str = None) -> bytes:
+    disposition = f'Content-Disposition: form-data; name="{name}"'
+    if filename:
+        disposition += f'; filename="{filename}"'
+    headers = disposition + (f"\r\nContent-Type: {content_type}" if content_type else "")
+    return b"--" + BOUNDARY + b"\r\n" + headers.encode() + b"\r\n\r\n" + value + b"\r\n"
+
+
+def _body(*parts: bytes) -> bytes:
+    return b"".join(parts) + b"--" + BOUNDARY + b"--\r\n"
+
+
+def _feed(body: bytes, chunk_size: int) -> _BodyInspector:
+    inspector = _BodyInspector(upload_guard.max_bytes_any())
+    for offset in range(0, len(body), chunk_size):
+        inspector.feed(body[offset:offset + chunk_size], more_body=offset + chunk_size < len(body))
+    return inspector
+
+
+@pytest.mark.parametrize("head, kind", [
+    (M4A, "mp4"),
+    (WAV, "wav"),
+    (b"ID3\x04\x00\x00\x00\x00\x00\x00", "mp3"),
+    (b"\xff\xf1\x50\x80\x00\x1f\xfc", "mp3"),  # ADTS AAC
+    (b"OggS\x00\x02", "ogg"),
+    (b"fLaC\x00\x00\x00\x22", "flac"),
+    (b"\x1a\x45\xdf\xa3\x9f\x42", "webm"),
+    (b"caff\x00\x01", "caf"),
+    (b"#!AMR\n", "amr"),
+    (b"%PDF-1.7\n", None),
+    (b"RIFF\x00\x00\x00\x00AVI ", None),
+    (b"", None),
+])
+def test_sniff_audio(head, kind):
+    assert sniff_audio(head) == kind
+
+
+def test_file_part_split_across_chunks_is_sniffed():
+    body = _body(_part("participant_code", b"P1"), _part("file", WAV + b"\x00" * 500, "a.wav", "audio/wav"))
+    inspector = _feed(body, 7)  # Headers and magic bytes arrive in pieces
+    assert inspector.inspected
+    assert inspector.limit == 5000  # The per-type limit replaced the ceiling
+
+
+def test_non_audio_file_part_is_rejected_with_415():
+    body = _body(_part("file", b"%PDF-1.7\n" + b"x" * 100, "a.m4a", "audio/mp4"))
+    with pytest.raises(RequestRejected) as excinfo:
+        _feed(body, 16)
+    assert excinfo.value.status_code == 415
+
+
+def test_limit_follows_the_declared_type_or_else_the_sniffed_one():
+    # Declared type without its own limit: the sniffed container's type decides
+    inspector = _feed(_body(_part("file", WAV + b"\x00" * 100, "a.bin", "application/octet-stream")), 64)
+    assert inspector.limit == 5000
+    # An M4A has only the default limit
+    body = _body(_part("file", M4A + b"\x00" * 1200, "a.m4a", "audio/mp4"))
+    with pytest.raises(RequestRejected) as excinfo:
+        _feed(body, 64)
+    assert excinfo.value.status_code == 413
+    # A WAV of the same size is within its own limit
+    _feed(_body(_part("file", WAV + b"\x00" * 1200, "a.wav", "audio/wav")), 64)
+
+
+def test_file_part_after_the_head_limit_gets_only_the_size_ceiling(monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_MAX_BYTES", HEAD_LIMIT * 2)
+    padding = _part("notes", b"n" * HEAD_LIMIT)
+    body = _body(padding, _part("file", b"not audio at all", "a.m4a", "audio/mp4"))
+    inspector = _feed(body, 4096)  # Not sniffed: the file part starts after the inspected head
+    assert inspector.inspected
+    assert inspector.limit == HEAD_LIMIT * 2  # The largest limit of any type
+
+    monkeypatch.setattr(settings, "UPLOAD_MAX_BYTES", HEAD_LIMIT)
+    with pytest.raises(RequestRejected) as excinfo:
+        _feed(body, 4096)
+    assert excinfo.value.status_code == 413
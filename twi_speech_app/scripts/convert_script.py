@@ -28,8 +28,9 @@ class ScriptConverter:
             # First, extract all the prompt arrays
             script_arrays = {}
 
-            # Find all script arrays (scriptA, scriptB, scriptC, scriptD)
-            for script_name in ['scriptA', 'scriptB', 'scriptC', 'scriptD', 'spontaneousPrompts']:
+            # Find all script arrays (e.g. scriptAU, scriptBU, ..., scriptSpontaneousU)
+            script_names = re.findall(r"const (\w+): ScriptPrompt\[\] = \[", content)
+            for script_name in script_names:
                 # Find the start and end of the array
                 start_pattern = f"const {script_name}: ScriptPrompt[] = ["
                 start_idx = content.find(start_pattern)
@@ -83,7 +84,7 @@ class ScriptConverter:
             if sections_start != -1:
                 sections_content = content[sections_start:]
                 section_matches = re.finditer(
-                    r'\{\s*id:\s*\'([^\']*)\',\s*title:\s*\'([^\']*)\',\s*description:\s*\'([^\']*)\',\s*prompts:\s*(script[A-Z]|spontaneousPrompts)',
+                    r'\{\s*id:\s*\'([^\']*)\',\s*title:\s*\'([^\']*)\',\s*description:\s*\'([^\']*)\',\s*prompts:\s*(\w+)',
                     sections_content
                 )
 
@@ -149,6 +150,35 @@ class ScriptConverter:
         df.to_excel(excel_path, index=False, engine='openpyxl')
         print(f"\nSaved {len(rows)} prompts to {excel_path}")
 
+    def sections_to_json(self, sections: List[Section], json_path: str):
+        """
+        Writes the sections as a JSON prompt catalog (loaded by the backend at startup).
+        """
+        if not json_path.endswith('.json'):
+            json_path = f"{json_path}.json"
+
+        catalog = {
+            'sections': [
+                {
+                    'id': section.id,
+                    'title': section.title,
+                    'description': section.description,
+                    'prompts': section.prompts,
+                }
+                for section in sections
+            ]
+        }
+        total_prompts = sum(len(section.prompts) for section in sections)
+        if not total_prompts:
+            print("Warning: No data was extracted from the TypeScript file")
+            return
+
+        os.makedirs(os.path.dirname(os.path.abspath(json_path)), exist_ok=True)
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(catalog, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"\nSaved {total_prompts} prompts in {len(sections)} sections to {json_path}")
+
     def escape_ts_string(self, value: str) -> str:
         """
         Escape special characters for TypeScript string literals while preserving Unicode characters.
@@ -250,7 +280,10 @@ class ScriptConverter:
                 "};",
                 "",
                 "export const EXPECTED_TOTAL_RECORDINGS = getTotalPrompts();",
-                "export const SPONTANEOUS_PROMPTS_COUNT = 8;",
+                "export const SPONTANEOUS_PROMPTS_COUNT = RECORDING_SECTIONS.reduce(",
+                "  (total, section) => total + section.prompts.filter((prompt) => prompt.type === 'spontaneous').length,",
+                "  0",
+                ");",
                 "",
                 "export const getGlobalPromptIndex = (sectionIndex: number, promptInSectionIndex: number): number => {",
                 "  let globalIndex = 0;",
@@ -271,9 +304,10 @@ class ScriptConverter:
 
 def main():
     parser = argparse.ArgumentParser(description='Convert between TypeScript and Excel formats')
-    parser.add_argument('direction', choices=['to_excel', 'to_ts'], help='Conversion direction')
+    parser.add_argument('direction', choices=['to_excel', 'to_json', 'to_ts'], help='Conversion direction')
     parser.add_argument('--ts-file', default='twi_speech_app/constants/script.ts', help='TypeScript file path')
     parser.add_argument('--excel-file', default='recording_script.xlsx', help='Excel file path')
+    parser.add_argument('--json-file', default='backend/app/data/prompt_catalog.json', help='JSON prompt catalog path (for to_json direction)')
     parser.add_argument('--output-ts-file', help='Output TypeScript file path (for to_ts direction)')
 
     args = parser.parse_args()
@@ -288,6 +322,14 @@ def main():
             else:
                 print("No sections were parsed from the TypeScript file")
 
+        elif args.direction == 'to_json':
+            print(f"Reading TypeScript file: {args.ts_file}")
+            sections = converter.parse_sections_from_ts(args.ts_file)
+            if sections:
+                converter.sections_to_json(sections, args.json_file)
+            else:
+                print("No sections were parsed from the TypeScript file")
+
         else:  # to_ts
             print(f"Reading Excel file: {args.excel_file}")
             output_ts_path = args.output_ts_file or args.ts_file
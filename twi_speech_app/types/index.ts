@@ -14,9 +14,11 @@ export interface RecordingSection {
 
 
 export interface RecordingProgress {
-  total_recordings: number;
+  total_recordings: number; // Distinct prompts recorded (re-takes count once)
   total_required: number;
   is_complete: boolean;
+  total_takes?: number;
+  missing_prompt_ids?: string[];
 }
 
 // NEW: Define structure for participant details
@@ -58,3 +60,18 @@ export interface UploadResponse {
   prompt_id: string;
   progress: RecordingProgress; // Backend sends the updated progress
 }
+
+// Summary of one recording session (GET /sessions/{id}, GET /speakers/{code}/sessions)
+export interface SessionSummary {
+  session_id: string;
+  speaker_id: string;
+  participant_code: string;
+  take_count: number;
+  current_take_count: number;
+  prompt_count: number;
+  total_duration_ms: number;
+  started_at: string;
+  ended_at: string;
+  last_prompt_id?: string | null;
+  completion_ratio: number;
+}